@@ -1,13 +1,23 @@
-from flask import Flask, render_template, redirect, url_for, request, jsonify, flash, send_file
+from flask import Flask, render_template, redirect, url_for, request, jsonify, flash, send_file, stream_with_context, g, session
 from flask_sqlalchemy import SQLAlchemy
 from flask_assets import Environment
 from webassets.bundle import Bundle
+from webassets.filter import Filter, register_filter
 from flask_compress import Compress
+from flask_caching import Cache
 from flask_wtf.csrf import CSRFProtect
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
+from limits.storage import Storage, SlidingWindowCounterSupport
 from flask_talisman import Talisman
+from werkzeug.middleware.proxy_fix import ProxyFix
+from jinja2 import FileSystemBytecodeCache, nodes
+from jinja2.ext import Extension
 from datetime import datetime, timedelta
+from collections import OrderedDict
+from array import array
+from bisect import bisect_left
+from concurrent.futures import Future
 from dateutil.relativedelta import relativedelta
 import math
 import os
@@ -15,17 +25,16 @@ import json
 import sys
 import shutil
 import uuid
-import stripe
-from stripe import error as stripe_error
-
-# Para compatibilidade, criar alias
-SignatureVerificationError = stripe_error.SignatureVerificationError
-
+import hashlib
+import mimetypes
+import threading
+import queue
+import sqlite3
+import atexit
+import time
 import pytz
-import bleach
 from flask_login import UserMixin, LoginManager, login_user, logout_user, login_required, current_user
 from functools import wraps
-from user_agents import parse as parse_ua
 
 # Importar correções de compatibilidade Flask 3.x (módulo opcional)
 try:
@@ -39,12 +48,8 @@ from werkzeug.security import generate_password_hash, check_password_hash
 from urllib.parse import urlparse as url_parse
 from itsdangerous import URLSafeTimedSerializer as Serializer
 import re
-from werkzeug.utils import secure_filename
-from PIL import Image
+from werkzeug.utils import secure_filename, safe_join
 from dotenv import load_dotenv
-import cloudinary
-import cloudinary.uploader
-import cloudinary.api
 
 # Verificar versão do Python e ajustar configurações
 python_version = sys.version_info
@@ -68,6 +73,9 @@ def debug_log(message):
 
 # Configuração da aplicação Flask
 app = Flask(__name__)
+# Atrás do proxy do Render: request.remote_addr passa a ser o endereço que o proxy
+# acrescentou ao X-Forwarded-For (o último), e não o primeiro, que o cliente controla
+app.wsgi_app = ProxyFix(app.wsgi_app, x_for=int(os.environ.get('PROXY_FIX_X_FOR', 1)))
 
 # Usar SECRET_KEY forte - obrigatório em produção
 secret_key = os.environ.get('SECRET_KEY')
@@ -84,7 +92,15 @@ app.config['SESSION_COOKIE_SAMESITE'] = 'Lax'  # Proteção CSRF
 app.config['PERMANENT_SESSION_LIFETIME'] = timedelta(hours=24)  # Sessão expira em 24h
 
 # Configuração do Stripe
-stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+# SDKs pesados (stripe ~0,7s, cloudinary, Pillow, bleach, user_agents) são importados
+# só nas rotas que os usam, para não pesar no import do app em cada worker
+def get_stripe():
+    """SDK do Stripe configurado (importado na primeira rota de pagamento)"""
+    import stripe
+    stripe.api_key = os.environ.get('STRIPE_SECRET_KEY')
+    return stripe
+
+
 app.config['STRIPE_PUBLIC_KEY'] = os.environ.get('STRIPE_PUBLIC_KEY')
 
 # Configuração do Abacate Pay
@@ -92,12 +108,18 @@ app.config['ABACATEPAY_API_KEY'] = os.environ.get('ABACATEPAY_API_KEY')
 app.config['ABACATEPAY_API_URL'] = 'https://api.abacatepay.com/v1'
 
 # Configuração do Cloudinary
-cloudinary.config(
-    cloud_name=os.environ.get('CLOUDINARY_CLOUD_NAME'),
-    api_key=os.environ.get('CLOUDINARY_API_KEY'),
-    api_secret=os.environ.get('CLOUDINARY_API_SECRET'),
-    secure=True
-)
+def get_cloudinary():
+    """SDK do Cloudinary configurado (importado no primeiro upload ou remoção)"""
+    import cloudinary
+    import cloudinary.api
+    import cloudinary.uploader
+    cloudinary.config(
+        cloud_name=os.environ.get('CLOUDINARY_CLOUD_NAME'),
+        api_key=os.environ.get('CLOUDINARY_API_KEY'),
+        api_secret=os.environ.get('CLOUDINARY_API_SECRET'),
+        secure=True
+    )
+    return cloudinary
 
 # Garantir que o diretório instance existe
 os.makedirs(app.instance_path, exist_ok=True)
@@ -111,6 +133,16 @@ if not database_url:
 app.config['SQLALCHEMY_DATABASE_URI'] = database_url
 app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
 
+# Telemetria (visitor_logs, post_stats, admin_activities) em outro arquivo SQLite:
+# as escritas de estatísticas não disputam o lock de escrita com usuários, posts e
+# pagamentos, e os dois arquivos podem ter backup e VACUUM em horários diferentes
+telemetry_database_url = os.environ.get('TELEMETRY_DATABASE_URL')
+if not telemetry_database_url:
+    from sqlalchemy.engine import make_url
+    main_db_dir = os.path.dirname(make_url(database_url).database or '') or app.instance_path
+    telemetry_database_url = f'sqlite:///{os.path.join(main_db_dir, "telemetry.db")}'
+app.config['SQLALCHEMY_BINDS'] = {'telemetry': telemetry_database_url}
+
 print(f"📁 Banco SQLite: Será criado em {database_url}")
 
 # Configurações específicas do SQLite
@@ -119,6 +151,13 @@ app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
     'pool_recycle': 300,
 }
 
+# Modo escritor único (opcional): banco em WAL, leituras em um pool de conexões somente
+# leitura e escritas curtas enviadas a uma thread por processo, que agrupa as transações
+# em um único COMMIT (ver seção ESCRITOR ÚNICO DO SQLITE)
+SQLITE_SINGLE_WRITER = os.environ.get('SQLITE_SINGLE_WRITER', 'false').lower() == 'true'
+SQLITE_READ_POOL_SIZE = int(os.environ.get('SQLITE_READ_POOL_SIZE', 5))
+SQLITE_BUSY_TIMEOUT = 5000  # ms que uma conexão espera pelo lock antes de "database is locked"
+
 # Configuração de Timezone para horário de Brasília
 BRAZIL_TZ = pytz.timezone('America/Sao_Paulo')
 
@@ -134,6 +173,20 @@ ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif'}
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = 5 * 1024 * 1024  # 5MB máximo
 
+# Cache de bytecode dos templates em disco (instance/ fica no disco persistente)
+# Cada worker novo carrega os templates já compilados em vez de recompilar o
+# base.html e os templates grandes do admin na primeira renderização. O Jinja
+# guarda o hash do fonte junto do bytecode e recompila o template se ele mudar.
+# Pré-compilação no build: python precompile_templates.py
+app.config['TEMPLATE_BYTECODE_CACHE'] = os.environ.get('TEMPLATE_BYTECODE_CACHE', 'true').lower() == 'true'
+app.config['TEMPLATE_CACHE_DIR'] = os.environ.get('TEMPLATE_CACHE_DIR') or \
+    os.path.join(app.instance_path, 'jinja_cache')
+if app.config['TEMPLATE_BYTECODE_CACHE']:
+    os.makedirs(app.config['TEMPLATE_CACHE_DIR'], exist_ok=True)
+    # Precisa estar nas opções antes de o app.jinja_env ser criado (pelo Flask-Assets, logo abaixo)
+    app.jinja_options = {**app.jinja_options,
+                         'bytecode_cache': FileSystemBytecodeCache(app.config['TEMPLATE_CACHE_DIR'])}
+
 # Inicializar as extensões
 db = SQLAlchemy(app)
 compress = Compress(app)
@@ -145,13 +198,181 @@ assets = Environment(app)
 app.config['WTF_CSRF_ENABLED'] = False  # Desabilitar CSRF globalmente por enquanto
 
 # Rate Limiting para evitar ataques de força bruta
+class SQLiteLimiterStorage(Storage, SlidingWindowCounterSupport):
+    """
+    Contadores do Flask-Limiter em um arquivo SQLite compartilhado pelos workers do
+    gunicorn no mesmo host (storage_uri="sqlite:///caminho/ratelimit.db"); com
+    "memory://" cada worker tinha os próprios contadores e o limite se multiplicava.
+
+    Janela deslizante aproximada (sliding-window-counter): uma linha por chave com o
+    contador da janela atual e o da anterior, lida e atualizada em uma única
+    transação curta (BEGIN IMMEDIATE) - O(1) por requisição.
+    """
+
+    STORAGE_SCHEME = ['sqlite']
+    CLEANUP_EVERY = 1000  # Acertos entre as limpezas de chaves expiradas
+
+    def __init__(self, uri=None, wrap_exceptions=False, **options):
+        from sqlalchemy.engine import make_url
+        self.path = make_url(uri).database
+        self.local = threading.local()
+        self.hits = 0
+        super().__init__(uri, wrap_exceptions=wrap_exceptions, **options)
+
+        connection = self._connection()
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limit_windows (
+                key TEXT PRIMARY KEY,
+                window_id INTEGER NOT NULL,
+                previous INTEGER NOT NULL,
+                current INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+        connection.execute("""
+            CREATE TABLE IF NOT EXISTS rate_limit_counters (
+                key TEXT PRIMARY KEY,
+                count INTEGER NOT NULL,
+                expires_at REAL NOT NULL
+            )
+        """)
+
+    @property
+    def base_exceptions(self):
+        return sqlite3.Error
+
+    def _connection(self):
+        # Uma conexão por thread e por processo (o gunicorn faz fork depois do import)
+        connection = getattr(self.local, 'connection', None)
+        if connection is None or self.local.pid != os.getpid():
+            connection = sqlite3.connect(self.path, timeout=SQLITE_BUSY_TIMEOUT / 1000, isolation_level=None)
+            connection.execute('PRAGMA journal_mode=WAL')
+            connection.execute('PRAGMA synchronous=OFF')  # Contadores podem se perder numa queda de energia
+            self.local.connection, self.local.pid = connection, os.getpid()
+        return connection
+
+    def _cleanup(self, connection, now):
+        self.hits += 1
+        if self.hits % self.CLEANUP_EVERY == 0:
+            connection.execute('DELETE FROM rate_limit_windows WHERE expires_at <= ?', (now,))
+            connection.execute('DELETE FROM rate_limit_counters WHERE expires_at <= ?', (now,))
+
+    # Janela deslizante (estratégia usada pelo limiter)
+    def _sliding_window(self, connection, key, expiry, now):
+        window_id = int(now // expiry)
+        row = connection.execute(
+            'SELECT window_id, previous, current FROM rate_limit_windows WHERE key = ?', (key,)
+        ).fetchone()
+        previous = current = 0
+        if row and row[0] == window_id:
+            previous, current = row[1], row[2]
+        elif row and row[0] == window_id - 1:
+            previous = row[2]  # A janela atual da linha virou a anterior
+        return window_id, previous, current
+
+    def acquire_sliding_window_entry(self, key, limit, expiry, amount=1):
+        if amount > limit:
+            return False
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            window_id, previous, current = self._sliding_window(connection, key, expiry, now)
+            previous_weight = 1 - (now % expiry) / expiry
+            if math.floor(previous * previous_weight + current) + amount > limit:
+                return False
+            connection.execute("""
+                INSERT INTO rate_limit_windows (key, window_id, previous, current, expires_at)
+                VALUES (?, ?, ?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    window_id = excluded.window_id, previous = excluded.previous,
+                    current = excluded.current, expires_at = excluded.expires_at
+            """, (key, window_id, previous, current + amount, (window_id + 2) * expiry))
+            self._cleanup(connection, now)
+        return True
+
+    def get_sliding_window(self, key, expiry):
+        now = time.time()
+        _, previous, current = self._sliding_window(self._connection(), key, expiry, now)
+        remaining = (1 - (now % expiry) / expiry) * expiry
+        return previous, remaining if previous else 0.0, current, remaining + expiry
+
+    def clear_sliding_window(self, key, expiry):
+        self._connection().execute('DELETE FROM rate_limit_windows WHERE key = ?', (key,))
+
+    # Janela fixa (interface obrigatória do Storage)
+    def incr(self, key, expiry, amount=1):
+        now = time.time()
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            connection.execute("""
+                INSERT INTO rate_limit_counters (key, count, expires_at) VALUES (?, ?, ?)
+                ON CONFLICT(key) DO UPDATE SET
+                    count = CASE WHEN expires_at <= ? THEN excluded.count ELSE count + excluded.count END,
+                    expires_at = CASE WHEN expires_at <= ? THEN excluded.expires_at ELSE expires_at END
+            """, (key, amount, now + expiry, now, now))
+            self._cleanup(connection, now)
+            return connection.execute('SELECT count FROM rate_limit_counters WHERE key = ?', (key,)).fetchone()[0]
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT count FROM rate_limit_counters WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else 0
+
+    def get_expiry(self, key):
+        row = self._connection().execute(
+            'SELECT expires_at FROM rate_limit_counters WHERE key = ?', (key,)
+        ).fetchone()
+        return row[0] if row else time.time()
+
+    def check(self):
+        try:
+            self._connection().execute('SELECT 1').fetchone()
+            return True
+        except sqlite3.Error:
+            return False
+
+    def reset(self):
+        connection = self._connection()
+        with connection:
+            connection.execute('BEGIN IMMEDIATE')
+            removed = connection.execute('DELETE FROM rate_limit_windows').rowcount
+            removed += connection.execute('DELETE FROM rate_limit_counters').rowcount
+        return removed
+
+    def clear(self, key):
+        connection = self._connection()
+        connection.execute('DELETE FROM rate_limit_windows WHERE key = ?', (key,))
+        connection.execute('DELETE FROM rate_limit_counters WHERE key = ?', (key,))
+
+
+def rate_limit_key():
+    """
+    IP real do cliente atrás do proxy (com os contadores compartilhados, o IP do proxy
+    seria um balde só). Vem do ProxyFix: um X-Forwarded-For forjado não troca o balde.
+    """
+    return get_remote_address()
+
+
+RATELIMIT_STORAGE_URI = os.environ.get('RATELIMIT_STORAGE_URI') or \
+    f'sqlite:///{os.path.join(app.instance_path, "ratelimit.db")}'
+
 limiter = Limiter(
     app=app,
-    key_func=get_remote_address,
+    key_func=rate_limit_key,
     default_limits=["200 per day", "50 per hour"],
-    storage_uri="memory://"
+    storage_uri=RATELIMIT_STORAGE_URI,
+    strategy='sliding-window-counter'
 )
 
+# Classes de limite por rota: um limite declarado na rota substitui o balde global
+# (default_limits), que fica só para as páginas. Arquivos estáticos já ficam fora do
+# limiter e /img/ é isento.
+POLLING_LIMIT = "120 per minute"  # Consultas baratas repetidas pelo front-end (status, favoritos, cota)
+TYPEAHEAD_LIMIT = "60 per minute"  # Sugestões de busca enquanto o usuário digita
+
 # Headers de Segurança HTTP (Talisman)
 # DESABILITADO: CSP estava bloqueando recursos externos
 # TODO: Reconfigurar CSP adequadamente no futuro
@@ -162,11 +383,84 @@ limiter = Limiter(
 #              content_security_policy=csp,
 #              content_security_policy_nonce_in=['script-src'])
 
-# Bundles de CSS e JS para otimização
-css = Bundle('css/style.css', 'css/additional.css', 'css/social.css', filters='cssmin', output='gen/style.min.css')
-js = Bundle('js/main.js', filters='jsmin', output='gen/script.min.js')
-assets.register('css_all', css)
-assets.register('js_all', js)
+# Bundles de CSS e JS por tipo de página (public, admin, auth)
+# O build (python build_assets.py) concatena e minifica cada bundle, grava o
+# arquivo com o hash do conteúdo no nome (gen/public.3f2a9c1b.css) e as cópias
+# .gz e .br ao lado. Os templates usam {% assets 'public_css' %} e a URL sai do
+# manifest, sem ler os arquivos fonte em produção. Sem manifest (build não
+# executado) ou em desenvolvimento, os bundles são gerados na primeira requisição.
+ASSET_OUTPUT_DIR = 'gen'
+ASSET_MANIFEST_PATH = os.path.join(app.static_folder, ASSET_OUTPUT_DIR, 'manifest.json')
+ASSET_MAX_AGE = 31536000  # 1 ano: o nome muda quando o conteúdo muda
+app.config['ASSETS_VERSIONS'] = 'hash'
+app.config['ASSETS_MANIFEST'] = f'json:{ASSET_OUTPUT_DIR}/manifest.json'
+app.config['ASSETS_URL_EXPIRE'] = False  # O hash já está no nome do arquivo
+app.config['ASSETS_AUTO_BUILD'] = DEBUG_MODE or not os.path.exists(ASSET_MANIFEST_PATH)
+
+
+class JSConcat(Filter):
+    """Junta os arquivos JS com ';' (um arquivo sem ponto e vírgula no fim não quebra o seguinte)"""
+    name = 'jsconcat'
+
+    def concat(self, out, hunks, **kwargs):
+        out.write(';\n'.join(hunk.data() for hunk, _ in hunks))
+
+
+register_filter(JSConcat)
+
+ASSET_BUNDLES = {
+    # Site público (base.html). Os CSS de página entram todos no bundle principal
+    'public_css': ['css/style.css', 'css/social.css', 'css/click-effects.css', 'css/faq.css', 'css/contact.css',
+                   'css/about.css', 'css/category.css', 'css/post-detail.css', 'css/plans.css'],
+    'profile_css': ['css/profile-page.css', 'css/admin.css'],  # Só na página de perfil
+    'public_js': ['js/password-toggle.js', 'js/navbar.js', 'js/dropdown-delay.js', 'js/main.js',
+                  'js/stats-counter.js', 'js/profile-images.js', 'js/faq.js', 'js/feature-modals.js',
+                  'js/search-validation.js'],
+    'public_late_js': ['js/search-suggestions.js', 'js/dynamic-loading.js', 'js/particles.js',
+                       'js/download-control.js'],
+    # Painel administrativo (admin/base.html)
+    'admin_css': ['css/admin.css', 'css/admin-extras.css', 'css/admin-sidebar.css', 'css/admin-profile.css',
+                  'css/modern-forms.css', 'css/dashboard-responsive.css'],
+    'admin_js': ['js/admin.js', 'js/modern-forms.js', 'js/sidebar.js', 'js/profile-images.js'],
+    # Login, cadastro, recuperação de senha e páginas legais
+    'auth_js': ['js/form-validation.js', 'js/auth-particles.js'],
+}
+
+for bundle_name, bundle_files in ASSET_BUNDLES.items():
+    base_name, kind = bundle_name.rsplit('_', 1)
+    filters = 'cssrewrite,rcssmin' if kind == 'css' else 'jsconcat,rjsmin'
+    assets.register(bundle_name, Bundle(*bundle_files, filters=filters,
+                                        output=f'{ASSET_OUTPUT_DIR}/{base_name}.%(version)s.{kind}'))
+
+
+def send_static_asset(filename):
+    """
+    Arquivos de static/. Os bundles (gen/) têm o hash no nome: saem com cache
+    imutável de 1 ano e, quando o navegador aceita, na versão .br ou .gz gerada
+    no build (o Flask-Compress não recomprime respostas com Content-Encoding).
+    """
+    if not filename.startswith(f'{ASSET_OUTPUT_DIR}/') or filename.endswith(('.gz', '.br')):
+        return app.send_static_file(filename)
+
+    path = safe_join(app.static_folder, filename)
+    response = None
+    if path and os.path.isfile(path):
+        for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+            if request.accept_encodings[encoding] and os.path.isfile(path + suffix):
+                response = send_file(path + suffix, mimetype=mimetypes.guess_type(path)[0], max_age=ASSET_MAX_AGE)
+                response.headers['Content-Encoding'] = encoding
+                break
+    if response is None:
+        response = app.send_static_file(filename)
+    response.vary.add('Accept-Encoding')
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = ASSET_MAX_AGE
+    response.cache_control.immutable = True
+    return response
+
+
+app.view_functions['static'] = send_static_asset
 
 # Modelos adicionais para maior flexibilidade
 class Category(db.Model):
@@ -438,6 +732,7 @@ def validate_comment_data(data) -> tuple[bool, str | None, dict | None]:
 
 def sanitize_input(text):
     """Remove HTML e scripts perigosos de inputs de texto"""
+    import bleach
     if not text:
         return text
     # Remove tags HTML e normaliza espaços
@@ -447,6 +742,7 @@ def sanitize_input(text):
 
 def sanitize_html(html_content):
     """Sanitiza conteúdo HTML permitindo apenas tags seguras"""
+    import bleach
     if not html_content:
         return html_content
 
@@ -517,6 +813,8 @@ def delete_old_image(image_path, protected_images=None):
     if protected_images is None:
         protected_images = ['default.jpg', 'admin-avatar.jpg']
 
+    original_path = image_path
+
     try:
         # Verificar se não é uma imagem protegida
         filename = os.path.basename(image_path)
@@ -541,8 +839,8 @@ def delete_old_image(image_path, protected_images=None):
             # Assume que é uma imagem de perfil
             full_path = os.path.join(app.root_path, 'static', 'uploads', 'profiles', image_path)
 
-        # Deletar se existir
-        if os.path.exists(full_path):
+        # Deletar se existir (e se nenhum outro registro usar a mesma imagem)
+        if os.path.exists(full_path) and release_shared_image(original_path):
             os.remove(full_path)
             print(f"✓ Imagem antiga deletada: {full_path}")
             return True
@@ -553,6 +851,298 @@ def delete_old_image(image_path, protected_images=None):
         print(f"✗ Erro ao deletar imagem {image_path}: {e}")
         return False
 
+# ==========================================
+# REDIMENSIONAMENTO DE IMAGENS SOB DEMANDA
+# ==========================================
+# Variantes geradas ficam em cache no disco (LRU limitado por tamanho)
+IMAGE_CACHE_DIR = os.path.join(app.instance_path, 'image_cache')
+app.config['IMAGE_CACHE_MAX_BYTES'] = int(os.environ.get('IMAGE_CACHE_MAX_BYTES', 256 * 1024 * 1024))
+
+# Larguras permitidas (evita gerar uma variante para cada valor arbitrário de ?w=)
+IMAGE_WIDTHS = (160, 320, 480, 640, 960, 1280)
+IMAGE_SRCSET_WIDTHS = (320, 640, 960)
+
+# Formato de saída -> (formato do Pillow, mimetype)
+IMAGE_FORMATS = {
+    'webp': ('WEBP', 'image/webp'),
+    'avif': ('AVIF', 'image/avif'),
+    'jpeg': ('JPEG', 'image/jpeg'),
+    'png': ('PNG', 'image/png'),
+}
+
+# Variantes que as URLs do site geram (resized_image_url). Outras combinações de
+# ?fmt= e ?q= dão 404: a rota não tem limite de requisições, então não pode gerar
+# (e guardar no cache) um arquivo para cada combinação que um cliente inventar
+IMAGE_URL_FORMATS = ('webp',)
+IMAGE_QUALITY = 80
+
+# Apenas imagens dentro destas pastas de static/ podem ser redimensionadas
+IMAGE_SOURCE_ROOTS = ('images/', 'uploads/')
+IMAGE_SOURCE_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'webp'}
+
+
+class ImageDiskCache:
+    """Cache LRU em disco para variantes de imagens, limitado por tamanho total.
+
+    A ordem de uso é mantida pelo mtime dos arquivos (atualizado a cada acesso),
+    então o cache sobrevive a reinícios e é compartilhado entre os workers.
+    """
+
+    def __init__(self, directory, max_bytes):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._total_bytes = None  # Calculado sob demanda na primeira escrita
+
+    def _path(self, key, extension):
+        # Subpastas por prefixo para não acumular milhares de arquivos num diretório só
+        return os.path.join(self.directory, key[:2], f"{key}.{extension}")
+
+    def get(self, key, extension):
+        """Retorna o caminho da variante em cache (ou None) e marca como usada"""
+        path = self._path(key, extension)
+        try:
+            os.utime(path, None)
+        except OSError:
+            return None
+        return path
+
+    def put(self, key, extension, data):
+        """Grava uma variante no cache e remove as menos usadas se passar do limite"""
+        path = self._path(key, extension)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # Escrita atômica: outro worker pode estar gerando a mesma variante
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        with self._lock:
+            if self._total_bytes is None:
+                self._total_bytes = self._scan()[1]
+            else:
+                self._total_bytes += len(data)
+            if self._total_bytes > self.max_bytes:
+                self._evict()
+        return path
+
+    def _scan(self):
+        """Lista (mtime, tamanho, caminho) de todas as variantes e o tamanho total"""
+        entries = []
+        total = 0
+        for root, _, files in os.walk(self.directory):
+            for name in files:
+                file_path = os.path.join(root, name)
+                try:
+                    stat = os.stat(file_path)
+                except OSError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, file_path))
+                total += stat.st_size
+        return entries, total
+
+    def _evict(self):
+        """Remove as variantes menos usadas até ficar em 90% do limite"""
+        entries, total = self._scan()
+        target = int(self.max_bytes * 0.9)
+        removed = 0
+        for _, size, file_path in sorted(entries):
+            if total <= target:
+                break
+            try:
+                os.remove(file_path)
+                total -= size
+                removed += 1
+            except OSError:
+                pass
+        self._total_bytes = total
+        debug_log(f"Cache de imagens: {removed} variantes removidas, {total} bytes em uso")
+
+
+image_cache = ImageDiskCache(IMAGE_CACHE_DIR, app.config['IMAGE_CACHE_MAX_BYTES'])
+
+
+def resolve_static_image(image_path, folder='profiles'):
+    """
+    Encontra uma imagem local e retorna seu caminho relativo a static/.
+
+    Args:
+        image_path: Valor salvo no banco (ex: 'posts/abc.jpg', 'foto_123.jpg')
+        folder: Pasta de origem (profiles, posts)
+
+    Returns:
+        str: Caminho relativo (ex: 'images/posts/abc.jpg') ou None se não existir
+    """
+    if not image_path or image_path.startswith(('http://', 'https://')):
+        return None
+
+    image_path = image_path.lstrip('/')
+    if image_path.startswith('static/'):
+        image_path = image_path[7:]
+
+    if image_path.startswith(IMAGE_SOURCE_ROOTS):
+        candidates = [image_path]
+    elif image_path.startswith('posts/'):
+        candidates = [f'images/{image_path}']
+    else:
+        candidates = [
+            f'uploads/{folder}/{image_path}',
+            f'images/{folder}/{image_path}',
+            f'images/{image_path}',
+        ]
+
+    for candidate in candidates:
+        if os.path.isfile(os.path.join(app.static_folder, candidate)):
+            return candidate
+    return None
+
+
+def cloudinary_resized_url(image_url, width):
+    """Insere uma transformação de largura em uma URL do Cloudinary"""
+    if '/image/upload/' not in image_url:
+        return image_url
+    return image_url.replace('/image/upload/', f'/image/upload/w_{width},c_limit,f_auto,q_auto/', 1)
+
+
+def resized_image_url(image_path, folder='profiles', width=None, fmt='webp'):
+    """
+    Retorna a URL de uma variante redimensionada da imagem, ou None se a
+    imagem não puder ser redimensionada (SVG, arquivo inexistente, etc.).
+    """
+    if not image_path or fmt not in IMAGE_URL_FORMATS:
+        return None
+
+    if 'cloudinary.com' in image_path:
+        return cloudinary_resized_url(image_path, width) if width else image_path
+
+    relative_path = resolve_static_image(image_path, folder)
+    if not relative_path or relative_path.rsplit('.', 1)[-1].lower() not in IMAGE_SOURCE_EXTENSIONS:
+        return None
+
+    # A versão (mtime) muda a URL quando o arquivo original muda, permitindo cache imutável
+    try:
+        version = int(os.path.getmtime(os.path.join(app.static_folder, relative_path)))
+    except OSError:
+        return None
+
+    params = {'filename': relative_path, 'fmt': fmt, 'v': version}
+    if width:
+        params['w'] = width
+    return url_for('resized_image', **params)
+
+
+def build_image_srcset(image_path, folder='profiles', widths=IMAGE_SRCSET_WIDTHS, fmt='webp'):
+    """Monta o atributo srcset com variantes redimensionadas da imagem"""
+    if not image_path or image_path == 'default.jpg':
+        return ''
+
+    entries = []
+    for width in widths:
+        url = resized_image_url(image_path, folder, width, fmt)
+        if not url or url == image_path:
+            return ''
+        entries.append(f'{url} {width}w')
+    return ', '.join(entries)
+
+
+def render_image_variant(source_path, width, pil_format, quality):
+    """Gera os bytes da variante redimensionada de uma imagem"""
+    from PIL import Image, ImageOps
+    with Image.open(source_path) as img:
+        img = ImageOps.exif_transpose(img)
+
+        if width and img.width > width:
+            height = max(1, round(img.height * width / img.width))
+            img = img.resize((width, height), Image.Resampling.LANCZOS)
+
+        # JPEG não suporta transparência
+        if pil_format == 'JPEG':
+            img = img.convert('RGB')
+        elif img.mode not in ('RGB', 'RGBA'):
+            img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+
+        from io import BytesIO
+        buffer = BytesIO()
+        save_options = {'optimize': True} if pil_format in ('JPEG', 'PNG') else {}
+        if pil_format != 'PNG':
+            save_options['quality'] = quality
+        img.save(buffer, format=pil_format, **save_options)
+        return buffer.getvalue()
+
+
+def image_source_path(filename):
+    """
+    Caminho real de uma imagem de static/images ou static/uploads, ou None.
+
+    No Render essas pastas são links simbólicos para o disco persistente, então
+    o caminho resolvido é comparado com o destino real da própria pasta (e não
+    com static/), o que ainda bloqueia '..' e links que apontem para fora dela.
+    """
+    root = next((root for root in IMAGE_SOURCE_ROOTS if filename.startswith(root)), None)
+    if not root:
+        return None
+    root_path = os.path.realpath(os.path.join(app.static_folder, root))
+    source_path = os.path.realpath(os.path.join(app.static_folder, filename))
+    if not source_path.startswith(root_path + os.sep) or not os.path.isfile(source_path):
+        return None
+    return source_path
+
+
+@app.route('/img/<path:filename>')
+@limiter.exempt
+def resized_image(filename):
+    """Serve uma variante redimensionada (largura, formato e qualidade) de uma imagem local"""
+    filename = filename.replace('\\', '/')
+    if not filename.startswith(IMAGE_SOURCE_ROOTS) or '..' in filename.split('/'):
+        return jsonify({'error': 'Imagem não encontrada'}), 404
+
+    source_path = image_source_path(filename)
+    if not source_path:
+        return jsonify({'error': 'Imagem não encontrada'}), 404
+
+    # Formatos não suportados (ex: SVG) são servidos sem alteração
+    if filename.rsplit('.', 1)[-1].lower() not in IMAGE_SOURCE_EXTENSIONS:
+        return redirect(url_for('static', filename=filename))
+
+    # Normalizar parâmetros para limitar o número de variantes possíveis
+    requested_width = request.args.get('w', type=int)
+    width = IMAGE_WIDTHS[-1]
+    if requested_width:
+        width = next((w for w in IMAGE_WIDTHS if w >= requested_width), IMAGE_WIDTHS[-1])
+
+    fmt = request.args.get('fmt', IMAGE_URL_FORMATS[0]).lower()
+    quality = request.args.get('q', IMAGE_QUALITY, type=int)
+    if fmt not in IMAGE_URL_FORMATS or quality != IMAGE_QUALITY:
+        return jsonify({'error': 'Variante não disponível'}), 404
+    pil_format, mimetype = IMAGE_FORMATS[fmt]
+
+    stat = os.stat(source_path)
+    cache_key = hashlib.sha1(
+        f"{filename}|{stat.st_mtime_ns}|{stat.st_size}|{width}|{fmt}|{quality}".encode('utf-8')
+    ).hexdigest()
+
+    # Revalidação: o navegador já tem esta variante
+    if request.if_none_match.contains(cache_key):
+        response = app.response_class(status=304)
+    else:
+        cached_path = image_cache.get(cache_key, fmt)
+        if not cached_path:
+            try:
+                data = render_image_variant(source_path, width, pil_format, quality)
+            except Exception as e:
+                print(f"Erro ao redimensionar imagem {filename}: {e}")
+                return redirect(url_for('static', filename=filename))
+            cached_path = image_cache.put(cache_key, fmt, data)
+        response = send_file(cached_path, mimetype=mimetype, conditional=False, etag=False, max_age=31536000)
+
+    response.set_etag(cache_key)
+    response.cache_control.no_cache = None
+    response.cache_control.public = True
+    response.cache_control.max_age = 31536000
+    response.cache_control.immutable = True
+    return response
+
 # ==========================================
 # DADOS PADRÃO DAS CATEGORIAS
 # ==========================================
@@ -694,6 +1284,12 @@ def create_full_backup():
             if os.path.exists(db_path):
                 zipf.write(db_path, 'database/site.db')
 
+            # Banco de telemetria (arquivo separado)
+            from sqlalchemy.engine import make_url
+            telemetry_path = make_url(telemetry_database_url).database
+            if telemetry_path and os.path.exists(telemetry_path):
+                zipf.write(telemetry_path, 'database/telemetry.db')
+
             # Adicionar arquivos
             dirs_to_backup = [
                 'static/uploads',
@@ -723,50 +1319,367 @@ def create_full_backup():
     except Exception as e:
         return {'success': False, 'error': str(e)}
 
-def log_admin_activity(user_id, action, description=None, metadata=None):
-    """Registra atividade administrativa"""
+def request_client_ip():
+    """IP do cliente (endereço acrescentado pelo proxy ao X-Forwarded-For, via ProxyFix)"""
+    return request.remote_addr
+
+
+# ==========================================
+# ESCRITOR ÚNICO DO SQLITE
+# ==========================================
+SQLITE_WRITER_BATCH_SIZE = 200  # Transações agrupadas em um COMMIT
+SQLITE_WRITER_WINDOW = 0.002  # Segundos que o escritor espera por mais transações antes do COMMIT
+
+
+def _configure_sqlite_connection(dbapi_connection, connection_record):
+    """WAL: leitores não bloqueiam o escritor (e vice-versa); busy_timeout para disputas entre processos"""
+    cursor = dbapi_connection.cursor()
+    cursor.execute('PRAGMA journal_mode=WAL')
+    cursor.execute(f'PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT}')
+    cursor.execute('PRAGMA synchronous=NORMAL')
+    cursor.close()
+
+
+def _configure_sqlite_reader(dbapi_connection, connection_record):
+    _configure_sqlite_connection(dbapi_connection, connection_record)
+    dbapi_connection.execute('PRAGMA query_only=ON')
+
+
+def _configure_sqlite_writer(dbapi_connection, connection_record):
+    _configure_sqlite_connection(dbapi_connection, connection_record)
+    # BEGIN/SAVEPOINT emitidos pelo SQLAlchemy (o pysqlite não abre transações sozinho)
+    dbapi_connection.isolation_level = None
+
+
+def _begin_immediate(connection):
+    # Pega o lock de escrita já no BEGIN, sem upgrade de leitura para escrita no meio da transação
+    connection.exec_driver_sql('BEGIN IMMEDIATE')
+
+
+_sqlite_engines = {}
+_sqlite_engines_lock = threading.Lock()
+
+
+def sqlite_engine(role, bind_key=None):
+    """
+    Engine auxiliar do modo escritor único, no mesmo arquivo do bind:
+    'reader' (pool de conexões somente leitura) ou 'writer' (conexão única da thread de escrita).
+    """
+    key = (role, bind_key)
+    engine = _sqlite_engines.get(key)
+    if engine is None:
+        with _sqlite_engines_lock:
+            engine = _sqlite_engines.get(key)
+            if engine is None:
+                url = db.engines[bind_key].url
+                if role == 'reader':
+                    engine = db.create_engine(url, pool_size=SQLITE_READ_POOL_SIZE, max_overflow=0, pool_recycle=300)
+                    db.event.listen(engine, 'connect', _configure_sqlite_reader)
+                else:
+                    engine = db.create_engine(url, pool_size=1, max_overflow=0)
+                    db.event.listen(engine, 'connect', _configure_sqlite_writer)
+                    db.event.listen(engine, 'begin', _begin_immediate)
+                _sqlite_engines[key] = engine
+    return engine
+
+
+def _route_read_to_pool(orm_execute_state):
+    """SELECTs do banco principal vão para o pool de leitura enquanto a transação da sessão não escreveu nada"""
+    session = orm_execute_state.session
+    if not orm_execute_state.is_select:
+        session.info['sqlite_has_writes'] = True
+        return None
+    if session.info.get('sqlite_has_writes'):
+        return None  # Ler as próprias escritas ainda não commitadas
+    mapper = orm_execute_state.bind_mapper
+    if mapper is not None and mapper.local_table.metadata.info.get('bind_key') is not None:
+        return None  # Telemetria usa a própria engine
+    return orm_execute_state.invoke_statement(bind_arguments={'bind': sqlite_engine('reader')})
+
+
+def _mark_session_writes(session, flush_context):
+    session.info['sqlite_has_writes'] = True
+
+
+def _clear_session_writes(session):
+    session.info.pop('sqlite_has_writes', None)
+
+
+class SQLiteWriter:
+    """
+    Thread única de escrita por processo para um arquivo SQLite. As tarefas são
+    funções fn(connection, ...) com SQL Core; as que chegam juntas rodam na mesma
+    transação, cada uma em seu SAVEPOINT (uma falha não desfaz as outras), e o
+    grupo inteiro tem um só COMMIT. submit() devolve um Future com o retorno da
+    função, resolvido depois do COMMIT.
+    """
+
+    def __init__(self, bind_key=None, batch_size=SQLITE_WRITER_BATCH_SIZE, window=SQLITE_WRITER_WINDOW):
+        self.bind_key = bind_key
+        self.queue = queue.Queue()
+        self.batch_size = batch_size
+        self.window = window
+        self.start_lock = threading.Lock()
+        self.thread_pid = None
+
+    def submit(self, fn, *args, **kwargs):
+        future = Future()
+        self._ensure_thread()
+        self.queue.put((future, fn, args, kwargs))
+        return future
+
+    def _ensure_thread(self):
+        # Iniciada na primeira escrita de cada processo (depois do fork do gunicorn)
+        if self.thread_pid == os.getpid():
+            return
+        with self.start_lock:
+            if self.thread_pid != os.getpid():
+                self.thread_pid = os.getpid()
+                threading.Thread(target=self._run, daemon=True,
+                                 name=f"sqlite-writer-{self.bind_key or 'main'}").start()
+
+    def _run(self):
+        while True:
+            batch = [self.queue.get()]
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self.queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            self._commit(batch)
+
+    def drain(self):
+        """Grava na thread atual o que ainda está na fila (saída do processo)"""
+        while True:
+            batch = []
+            try:
+                while len(batch) < self.batch_size:
+                    batch.append(self.queue.get_nowait())
+            except queue.Empty:
+                pass
+            if not batch:
+                return
+            self._commit(batch)
+
+    def _commit(self, batch):
+        jobs = [job for job in batch if job[0].set_running_or_notify_cancel()]
+        results = []
+        try:
+            with app.app_context():
+                engine = sqlite_engine('writer', self.bind_key)
+            with engine.begin() as connection:
+                for future, fn, args, kwargs in jobs:
+                    try:
+                        with connection.begin_nested():
+                            results.append((future, fn(connection, *args, **kwargs), None))
+                    except Exception as e:
+                        results.append((future, None, e))
+        except Exception as e:
+            # O COMMIT do grupo falhou: nenhuma tarefa foi gravada
+            print(f"Erro ao gravar grupo de {len(jobs)} escritas: {e}")
+            for future, *_ in jobs:
+                future.set_exception(e)
+            return
+
+        for future, result, error in results:
+            if error is not None:
+                print(f"Erro na escrita em grupo: {error}")
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+sqlite_writers = {bind_key: SQLiteWriter(bind_key) for bind_key in (None, 'telemetry')}
+
+
+def _reset_connections_after_fork():
+    # Com o preload do gunicorn o app é importado no master: conexões abertas lá não podem ser usadas pelos workers
+    with app.app_context():
+        engines = list(db.engines.values())
+    for engine in engines + list(_sqlite_engines.values()):
+        engine.dispose(close=False)
+
+
+os.register_at_fork(after_in_child=_reset_connections_after_fork)
+
+if SQLITE_SINGLE_WRITER:
+    with app.app_context():
+        for engine in db.engines.values():
+            db.event.listen(engine, 'connect', _configure_sqlite_connection)
+    db.event.listen(db.session, 'do_orm_execute', _route_read_to_pool)
+    db.event.listen(db.session, 'after_flush', _mark_session_writes)
+    db.event.listen(db.session, 'after_commit', _clear_session_writes)
+    db.event.listen(db.session, 'after_rollback', _clear_session_writes)
+    for writer in sqlite_writers.values():
+        atexit.register(writer.drain)
+
+
+def db_write(fn, *args, bind_key=None, **kwargs):
+    """
+    Executa fn(connection, *args, **kwargs) numa transação de escrita e devolve um Future.
+
+    No modo escritor único a tarefa entra na fila do escritor do bind (group commit);
+    fora dele roda na hora, numa transação própria, e o Future já volta resolvido.
+    """
+    if SQLITE_SINGLE_WRITER:
+        return sqlite_writers[bind_key].submit(fn, *args, **kwargs)
+
+    future = Future()
     try:
-        # Pegar informações da requisição
-        ip_address = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-        if ip_address and ',' in ip_address:
-            ip_address = ip_address.split(',')[0].strip()
+        with db.engines[bind_key].begin() as connection:
+            future.set_result(fn(connection, *args, **kwargs))
+    except Exception as e:
+        print(f"Erro na escrita ({fn.__name__}): {e}")
+        future.set_exception(e)
+    return future
 
-        user_agent = request.headers.get('User-Agent', '')
 
-        # Converter metadata para JSON se necessário
-        metadata_json = None
-        if metadata:
+def touch_last_login(connection, user_id, when):
+    """Atualiza users.last_login (tarefa de db_write)"""
+    users = User.__table__
+    connection.execute(users.update().where(users.c.id == user_id).values(
+        last_login=when,
+        last_updated=users.c.last_updated  # Não é uma alteração do perfil
+    ))
+
+
+def insert_visitor_log(connection, row):
+    """Insere uma linha em visitor_logs (tarefa de db_write, bind de telemetria)"""
+    connection.execute(VisitorLog.__table__.insert(), row)
+
+
+# ==========================================
+# LOG DE AUDITORIA ASSÍNCRONO
+# ==========================================
+AUDIT_LOG_ASYNC = os.environ.get('AUDIT_LOG_ASYNC', 'true').lower() == 'true'
+AUDIT_QUEUE_SIZE = int(os.environ.get('AUDIT_QUEUE_SIZE', 10000))
+AUDIT_BATCH_SIZE = 500
+AUDIT_FLUSH_INTERVAL = 2  # Segundos máximos que um evento espera na fila
+AUDIT_PUT_TIMEOUT = 1  # Segundos que a requisição espera por espaço na fila depois de esvaziá-la
+
+
+class AuditLogWriter:
+    """
+    Fila em memória para os registros de admin_activities. As requisições só
+    enfileiram o evento; uma thread em segundo plano converte o metadata para
+    JSON e grava em lotes (um commit por lote).
+
+    Com a fila cheia, a própria requisição esvazia e grava a fila (contrapressão).
+    Se outras threads voltarem a enchê-la antes de o evento entrar, ele é
+    descartado com um aviso (contado em dropped): a ação do admin não falha por
+    causa da auditoria. O que estiver pendente é gravado na saída do processo.
+    """
+
+    def __init__(self, maxsize=AUDIT_QUEUE_SIZE, batch_size=AUDIT_BATCH_SIZE, flush_interval=AUDIT_FLUSH_INTERVAL):
+        self.queue = queue.Queue(maxsize=maxsize)
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.wakeup = threading.Event()
+        self.write_lock = threading.Lock()
+        self.start_lock = threading.Lock()
+        self.thread_pid = None
+        self.dropped = 0
+
+    def log(self, event):
+        self._ensure_thread()
+        try:
+            self.queue.put_nowait(event)
+        except queue.Full:
+            self.flush()
+            try:
+                self.queue.put(event, timeout=AUDIT_PUT_TIMEOUT)
+            except queue.Full:
+                self.dropped += 1
+                app.logger.warning(f"Fila de auditoria cheia, evento '{event.get('action')}' descartado "
+                                   f"({self.dropped} descartados)")
+        if self.queue.qsize() >= self.batch_size:
+            self.wakeup.set()
+
+    def _ensure_thread(self):
+        # Iniciada no primeiro evento de cada processo (depois do fork do gunicorn)
+        if self.thread_pid == os.getpid():
+            return
+        with self.start_lock:
+            if self.thread_pid != os.getpid():
+                self.thread_pid = os.getpid()
+                threading.Thread(target=self._run, daemon=True, name='audit-log-writer').start()
+
+    def _run(self):
+        while True:
+            self.wakeup.wait(self.flush_interval)
+            self.wakeup.clear()
+            self.flush()
+
+    def flush(self):
+        """Grava tudo o que está na fila (os eventos só saem da fila dentro do lock de escrita)"""
+        with self.write_lock:
+            while True:
+                events = []
+                try:
+                    while len(events) < self.batch_size:
+                        events.append(self.queue.get_nowait())
+                except queue.Empty:
+                    pass
+                if not events:
+                    return
+                self._write(events)
+
+    def _write(self, events):
+        rows = []
+        for event in events:
+            metadata = event.pop('metadata', None)
+            # Todas as linhas precisam das mesmas colunas no executemany
+            event['activity_metadata'] = None
+            if metadata:
+                try:
+                    event['activity_metadata'] = json.dumps(metadata)
+                except (TypeError, ValueError):
+                    event['activity_metadata'] = str(metadata)
+            rows.append(event)
+
+        for attempt in range(3):
             try:
-                metadata_json = json.dumps(metadata)
-            except (TypeError, ValueError):
-                metadata_json = str(metadata)
+                with app.app_context():
+                    db.session.execute(AdminActivity.__table__.insert(), rows)
+                    db.session.commit()
+                return
+            except Exception as e:
+                error = e
+                time.sleep(0.5 * (attempt + 1))
+        print(f"Erro ao gravar {len(rows)} atividades administrativas: {error}")
 
-        activity = AdminActivity(
-            user_id=user_id,
-            action=action,
-            description=description,
-            activity_metadata=metadata_json,
-            ip_address=ip_address,
-            user_agent=user_agent
-        )
 
-        db.session.add(activity)
-        db.session.commit()
+audit_log_writer = AuditLogWriter()
+atexit.register(audit_log_writer.flush)
+
+
+def log_admin_activity(user_id, action, description=None, metadata=None):
+    """Registra atividade administrativa (gravada em lote pelo AuditLogWriter)"""
+    try:
+        event = {
+            'user_id': user_id,
+            'action': action,
+            'description': description,
+            'metadata': metadata,
+            'ip_address': request_client_ip(),
+            'user_agent': request.headers.get('User-Agent', ''),
+            'created_at': datetime.utcnow(),
+        }
+
+        if AUDIT_LOG_ASYNC:
+            audit_log_writer.log(event)
+        else:
+            audit_log_writer._write([event])
 
     except Exception as e:
         print(f"Erro ao registrar atividade administrativa: {e}")
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
 
 def log_visitor():
     """Registra informações do visitante para analytics"""
     try:
         # Pegar informações da requisição
-        ip_address = request.environ.get('HTTP_X_FORWARDED_FOR', request.remote_addr)
-        if ip_address and ',' in ip_address:
-            ip_address = ip_address.split(',')[0].strip()
+        ip_address = request_client_ip()
 
         user_agent = request.headers.get('User-Agent', '')
         referrer = request.headers.get('Referer', '')
@@ -781,16 +1694,14 @@ def log_visitor():
 
         # Só criar novo log se não houver um recente
         if not recent_log:
-            visitor_log = VisitorLog(
-                ip_address=ip_address,
-                user_agent=user_agent[:500] if user_agent else '',  # Limitar tamanho
-                referrer=referrer[:500] if referrer else '',  # Limitar tamanho
-                device_type=device_type,
-                browser=browser,
-                visit_time=datetime.utcnow()
-            )
-            db.session.add(visitor_log)
-            db.session.commit()
+            db_write(insert_visitor_log, {
+                'ip_address': ip_address,
+                'user_agent': user_agent[:500] if user_agent else '',  # Limitar tamanho
+                'referrer': referrer[:500] if referrer else '',  # Limitar tamanho
+                'device_type': device_type,
+                'browser': browser,
+                'visit_time': datetime.utcnow(),
+            }, bind_key='telemetry')
     except Exception as e:
         # Em caso de erro, apenas logar mas não interromper a aplicação
         print(f"Erro ao registrar visitante: {e}")
@@ -825,32 +1736,6 @@ def increment_post_views(post_id):
         except Exception:
             pass
 
-def increment_post_downloads(post_id):
-    """Incrementa os downloads de um post"""
-    try:
-        post = Post.query.get(post_id)
-        if post:
-            post.downloads = (post.downloads or 0) + 1
-            db.session.commit()
-
-        # Também registrar em PostStats para estatísticas diárias
-        today = datetime.utcnow().date()
-        post_stat = PostStats.query.filter_by(post_id=post_id, date=today).first()
-
-        if post_stat:
-            post_stat.downloads += 1
-        else:
-            post_stat = PostStats(post_id=post_id, date=today, views=0, downloads=1)
-            db.session.add(post_stat)
-
-        db.session.commit()
-    except Exception as e:
-        print(f"Erro ao incrementar downloads do post {post_id}: {e}")
-        try:
-            db.session.rollback()
-        except Exception:
-            pass
-
 @app.before_request
 def before_request():
     """Executado antes de cada requisição"""
@@ -859,12 +1744,11 @@ def before_request():
         # Atualizar a cada request, mas apenas se passou mais de 5 minutos desde a última atualização
         # para evitar sobrecarga no banco de dados
         if current_user.last_login is None or (datetime.utcnow() - current_user.last_login).total_seconds() > 300:
-            try:
-                current_user.last_login = datetime.utcnow()
-                db.session.commit()
-            except Exception as e:
-                db.session.rollback()
-                print(f"Erro ao atualizar last_login: {e}")
+            # Fora da sessão (a requisição não espera o COMMIT no modo escritor único)
+            from sqlalchemy.orm.attributes import set_committed_value
+            now = datetime.utcnow()
+            db_write(touch_last_login, current_user.id, now)
+            set_committed_value(current_user._get_current_object(), 'last_login', now)
 
     # Verificar modo de manutenção
     try:
@@ -883,11 +1767,16 @@ def before_request():
 @app.context_processor
 def utility_processor():
     """Funções utilitárias para templates"""
-    def get_image_url(image_path, default='default.jpg'):
-        """Retorna URL correta da imagem (Cloudinary ou local)"""
+    def get_image_url(image_path, default='default.jpg', width=None):
+        """Retorna URL correta da imagem (Cloudinary ou local), opcionalmente redimensionada"""
         if not image_path:
             return url_for('static', filename=f'images/profiles/{default}')
 
+        if width:
+            resized_url = resized_image_url(image_path, 'profiles', width)
+            if resized_url:
+                return resized_url
+
         # Se já for URL do Cloudinary, retornar diretamente
         if 'cloudinary.com' in image_path or image_path.startswith('http'):
             return image_path
@@ -898,7 +1787,11 @@ def utility_processor():
 
         return url_for('static', filename=f'uploads/profiles/{image_path}')
 
-    return dict(get_image_url=get_image_url)
+    def get_image_srcset(image_path, widths=IMAGE_SRCSET_WIDTHS):
+        """Retorna o srcset com variantes redimensionadas da imagem"""
+        return build_image_srcset(image_path, 'profiles', widths)
+
+    return dict(get_image_url=get_image_url, get_image_srcset=get_image_srcset)
 
 @app.context_processor
 def inject_admin_data():
@@ -1002,6 +1895,9 @@ class User(db.Model, UserMixin):
     custom_daily_limit = db.Column(db.Integer, nullable=True)  # Limite diário personalizado (None = usar padrão do plano)
     custom_weekly_limit = db.Column(db.Integer, nullable=True)  # Limite semanal personalizado (None = usar padrão do plano)
 
+    # Incrementado a cada alteração nos favoritos (invalida o cache de favoritos em todos os workers)
+    favorites_version = db.Column(db.Integer, default=0, nullable=False, server_default='0')
+
     def set_password(self, password):
         """Gera hash da senha fornecida"""
         self.password_hash = generate_password_hash(password)
@@ -1077,11 +1973,14 @@ class User(db.Model, UserMixin):
         return f"User('{self.username}', '{self.email}', '{self.role}')"
 
 class Download(db.Model):
-    """Modelo para rastrear downloads de usuários"""
+    """Log de downloads (só recebe inserts); fonte dos contadores de download"""
     id = db.Column(db.Integer, primary_key=True)
     user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
     post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
     timestamp = db.Column(db.DateTime, default=datetime.utcnow)
+    # Dados da requisição, usados para gerar o registro em admin_activities
+    ip_address = db.Column(db.String(45), nullable=True)
+    user_agent = db.Column(db.String(500), nullable=True)
 
     # Relacionamentos
     user = db.relationship('User', backref=db.backref('download_records', lazy=True, cascade="all, delete"))
@@ -1090,6 +1989,24 @@ class Download(db.Model):
     # Constraint para evitar duplicatas no mesmo momento
     __table_args__ = (db.UniqueConstraint('user_id', 'post_id', 'timestamp', name='unique_user_post_download_time'),)
 
+
+class UserDownloadLatest(db.Model):
+    """
+    Histórico de downloads do usuário: último download de cada post, mantido
+    por upsert a cada download (evita o GROUP BY sobre o log em cada leitura)
+    """
+    __tablename__ = 'user_download_latest'
+    __table_args__ = (db.Index('ix_user_download_latest_user_last_at', 'user_id', 'last_at'),)
+
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), primary_key=True)
+    last_at = db.Column(db.DateTime, nullable=False)
+    count = db.Column(db.Integer, nullable=False, default=1)
+    last_download_id = db.Column(db.Integer, nullable=False)  # Download.id mais recente (remoção pela API)
+
+    user = db.relationship('User', backref=db.backref('download_latest', lazy=True, cascade="all, delete"))
+    post = db.relationship('Post', backref=db.backref('download_latest', lazy=True, cascade="all, delete"))
+
 # Modelo de Favoritos
 class Favorite(db.Model):
     __tablename__ = 'favorites'
@@ -1103,45 +2020,293 @@ class Favorite(db.Model):
     user = db.relationship('User', backref=db.backref('favorites', lazy=True, cascade="all, delete"))
     post = db.relationship('Post', backref=db.backref('favorited_by', lazy=True, cascade="all, delete"))
 
-    # Constraint para evitar duplicatas
-    __table_args__ = (db.UniqueConstraint('user_id', 'post_id', name='unique_user_post_favorite'),)
+    # Constraint para evitar duplicatas; índice para a listagem paginada (mais recentes primeiro)
+    __table_args__ = (
+        db.UniqueConstraint('user_id', 'post_id', name='unique_user_post_favorite'),
+        db.Index('ix_favorites_user_date', 'user_id', 'date_added', 'id'),
+    )
 
     def __repr__(self):
         return f"Favorite(user_id={self.user_id}, post_id={self.post_id})"
 
-# Modelo de Transações de Pagamento
-class Transaction(db.Model):
-    __tablename__ = 'transactions'
 
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+def bump_favorites_version(user_id, connection=None):
+    """Marca os favoritos do usuário como alterados (na mesma transação da alteração)"""
+    users = User.__table__
+    statement = users.update().where(users.c.id == user_id).values(
+        favorites_version=db.func.coalesce(users.c.favorites_version, 0) + 1,
+        last_updated=users.c.last_updated  # Não é uma alteração do perfil
+    )
+    (connection or db.session).execute(statement)
 
-    # Gateway de pagamento ('stripe' ou 'abacatepay')
-    payment_gateway = db.Column(db.String(20), default='stripe', nullable=False)
 
-    # Dados do Stripe
-    stripe_session_id = db.Column(db.String(255), unique=True, nullable=True)  # checkout.session.id
-    stripe_customer_id = db.Column(db.String(255), nullable=True)  # customer ID do Stripe
-    stripe_subscription_id = db.Column(db.String(255), nullable=True)  # subscription ID do Stripe
-    stripe_payment_intent_id = db.Column(db.String(255), nullable=True)  # payment_intent ID
+@db.event.listens_for(Favorite, 'after_insert')
+@db.event.listens_for(Favorite, 'after_delete')
+def _bump_favorites_version(mapper, connection, target):
+    bump_favorites_version(target.user_id, connection)
 
-    # Dados do Abacate Pay
-    abacatepay_billing_id = db.Column(db.String(255), unique=True, nullable=True)  # ID da cobrança
-    abacatepay_payment_url = db.Column(db.Text, nullable=True)  # URL de pagamento
-    abacatepay_qr_code = db.Column(db.Text, nullable=True)  # QR Code PIX em base64
-    abacatepay_pix_code = db.Column(db.Text, nullable=True)  # Código PIX copia-e-cola
 
-    # Dados da transação
-    plan_type = db.Column(db.String(20), nullable=False)  # 'premium' ou 'vip'
-    amount = db.Column(db.Integer, nullable=False)  # Valor em centavos
-    currency = db.Column(db.String(3), default='brl')  # Moeda
-    status = db.Column(db.String(20), default='pending')  # 'pending', 'completed', 'failed', 'refunded'
+class FavoriteIds:
+    """Conjunto compacto de post_ids: array ordenado de inteiros com busca binária"""
 
-    # Datas
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    paid_at = db.Column(db.DateTime, nullable=True)  # Quando o pagamento foi confirmado
+    __slots__ = ('_ids',)
 
-    # Relacionamento
+    def __init__(self, post_ids=()):
+        self._ids = array('I', sorted(post_ids))
+
+    def __contains__(self, post_id):
+        index = bisect_left(self._ids, post_id)
+        return index < len(self._ids) and self._ids[index] == post_id
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return len(self._ids)
+
+
+EMPTY_FAVORITE_IDS = FavoriteIds()
+
+
+class FavoriteSetCache:
+    """Cache LRU, por processo, dos IDs de posts favoritos de cada usuário.
+
+    Cada entrada guarda a User.favorites_version com que foi montada. A versão
+    chega junto com o current_user (carregado em toda requisição) e é
+    incrementada no banco a cada alteração, então todos os workers descartam
+    a entrada antiga sem precisar se comunicar.
+    """
+
+    def __init__(self, max_users=2048):
+        self.max_users = max_users
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, user):
+        """Retorna os post_ids favoritos do usuário (FavoriteIds)"""
+        version = user.favorites_version or 0
+        with self._lock:
+            entry = self._entries.get(user.id)
+            if entry and entry[0] == version:
+                self._entries.move_to_end(user.id)
+                return entry[1]
+
+        post_ids = FavoriteIds(db.session.execute(
+            db.select(Favorite.post_id).where(Favorite.user_id == user.id)
+        ).scalars())
+
+        with self._lock:
+            self._entries[user.id] = (version, post_ids)
+            self._entries.move_to_end(user.id)
+            while len(self._entries) > self.max_users:
+                self._entries.popitem(last=False)
+        return post_ids
+
+
+favorite_set_cache = FavoriteSetCache(int(os.environ.get('FAVORITE_CACHE_USERS', 2048)))
+
+
+FAVORITES_PAGE_SIZE = 6
+FAVORITES_MAX_PAGE_SIZE = 48
+FAVORITE_CONTENT_PREFIX_CHARS = 4000  # HTML lido do banco para montar o resumo do card
+FAVORITE_EXCERPT_CHARS = 150  # Tamanho do resumo em texto puro
+
+
+def html_excerpt(html, length):
+    """
+    Resumo em texto puro de um trecho de HTML que pode ter sido cortado no meio
+    de uma tag ou entidade (descarta o pedaço incompleto antes de remover as tags).
+    """
+    from markupsafe import Markup
+
+    html = re.sub(r'<[^>]*$|&#?\w*$', '', html or '')
+    text = Markup(html).striptags()
+    return text if len(text) <= length else text[:length].rstrip() + '...'
+
+
+def encode_favorite_cursor(row):
+    """Cursor estável (date_added, id do favorito) do último item de uma página"""
+    return f"{row.date_added:%Y%m%d%H%M%S%f}-{row.favorite_id}"
+
+
+def decode_favorite_cursor(cursor):
+    try:
+        date_part, id_part = cursor.split('-', 1)
+        return datetime.strptime(date_part, '%Y%m%d%H%M%S%f'), int(id_part)
+    except (AttributeError, ValueError):
+        return None
+
+
+def count_user_favorites(user_id):
+    """Total de favoritos (de posts ativos) usando o índice de favorites.user_id"""
+    return db.session.execute(
+        db.select(db.func.count(Favorite.id))
+        .join(Post, Post.id == Favorite.post_id)
+        .where(Favorite.user_id == user_id, Post.is_active == True)
+    ).scalar() or 0
+
+
+def fetch_favorites_page(user_id, cursor=None, limit=FAVORITES_PAGE_SIZE):
+    """
+    Uma página de favoritos em uma única consulta, apenas com os campos do card.
+
+    Returns:
+        tuple: (cards com atributos de Post + excerpt/date_added/favorite_id, próximo cursor ou None)
+    """
+    from types import SimpleNamespace
+
+    query = db.select(
+        Favorite.id.label('favorite_id'),
+        Favorite.date_added,
+        Post.id,
+        Post.title,
+        Post.slug,
+        db.func.substr(Post.content, 1, FAVORITE_CONTENT_PREFIX_CHARS).label('content_prefix'),
+        Post.image_url,
+        Post.category_str,
+        Category.slug.label('category_slug'),
+        Post.download_link,
+        Post.date_posted,
+        Post.views,
+        Post.downloads,
+        Post.featured,
+    ).join(Post, Post.id == Favorite.post_id).outerjoin(
+        Category, Category.id == Post.category_id
+    ).where(Favorite.user_id == user_id, Post.is_active == True)
+
+    if cursor:
+        cursor_date, cursor_id = cursor
+        query = query.where(db.or_(
+            Favorite.date_added < cursor_date,
+            db.and_(Favorite.date_added == cursor_date, Favorite.id < cursor_id)
+        ))
+    query = query.order_by(Favorite.date_added.desc(), Favorite.id.desc()).limit(limit + 1)
+
+    rows = db.session.execute(query).all()
+    next_cursor = encode_favorite_cursor(rows[limit - 1]) if len(rows) > limit else None
+
+    cards = []
+    for row in rows[:limit]:
+        fields = row._asdict()
+        # O resumo é montado depois de remover as tags: cortar o HTML cru deixaria tags pela metade
+        fields['excerpt'] = html_excerpt(fields.pop('content_prefix'), FAVORITE_EXCERPT_CHARS)
+        cards.append(SimpleNamespace(**fields))
+    return cards, next_cursor
+
+
+def serialize_favorite_row(row):
+    return {
+        'id': row.id,
+        'title': row.title,
+        'slug': row.slug,
+        'excerpt': row.excerpt,
+        'image_url': row.image_url,
+        'category_str': row.category_str or 'Geral',
+        'category_slug': row.category_slug,
+        'download_link': row.download_link,
+        'date_posted': row.date_posted.strftime('%d/%m/%Y') if row.date_posted else '',
+        'views': row.views or 0,
+        'downloads': row.downloads or 0,
+        'featured': row.featured or False,
+    }
+
+
+def get_favorite_post_ids():
+    """IDs dos posts favoritos do usuário logado, sem consulta quando o cache está válido"""
+    if not current_user.is_authenticated:
+        return EMPTY_FAVORITE_IDS
+    return favorite_set_cache.get(current_user)
+
+
+# ====================
+# HISTÓRICO DE DOWNLOADS
+# ====================
+def record_latest_download(download):
+    """Upsert do último download do post em user_download_latest (sem commit)"""
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    latest = UserDownloadLatest.__table__
+    statement = sqlite_insert(latest).values(
+        user_id=download.user_id,
+        post_id=download.post_id,
+        last_at=download.timestamp,
+        count=1,
+        last_download_id=download.id
+    )
+    db.session.execute(statement.on_conflict_do_update(
+        index_elements=['user_id', 'post_id'],
+        set_={
+            'last_at': statement.excluded.last_at,
+            'count': latest.c.count + 1,
+            'last_download_id': statement.excluded.last_download_id,
+        }
+    ))
+
+
+def fetch_download_history(user_id, limit=None):
+    """
+    Último download de cada post do usuário, mais recentes primeiro: uma leitura
+    pelo índice (user_id, last_at) com post e categoria no mesmo JOIN
+    """
+    # Data formatada pelo próprio SQLite, já no horário de Brasília (sem horário
+    # de verão desde 2019, então um único deslocamento vale para todas as linhas)
+    offset_minutes = int(BRAZIL_TZ.utcoffset(datetime.utcnow()).total_seconds() // 60)
+    query = (
+        db.select(
+            UserDownloadLatest.last_download_id.label('id'),
+            UserDownloadLatest.post_id,
+            Post.title.label('post_title'),
+            Post.slug.label('post_slug'),
+            Post.image_url.label('post_image'),
+            Post.download_link,
+            Category.name.label('category_name'),
+            Category.slug.label('category_slug'),
+            UserDownloadLatest.count,
+            db.func.strftime('%d/%m/%Y às %H:%M', UserDownloadLatest.last_at,
+                             f'{offset_minutes:+d} minutes').label('timestamp'),
+        )
+        .join(Post, Post.id == UserDownloadLatest.post_id)
+        .outerjoin(Category, Category.id == Post.category_id)
+        .where(UserDownloadLatest.user_id == user_id)
+        .order_by(UserDownloadLatest.last_at.desc())
+    )
+    if limit:
+        query = query.limit(limit)
+    return [dict(row) for row in db.session.execute(query).mappings()]
+
+# Modelo de Transações de Pagamento
+class Transaction(db.Model):
+    __tablename__ = 'transactions'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+
+    # Gateway de pagamento ('stripe' ou 'abacatepay')
+    payment_gateway = db.Column(db.String(20), default='stripe', nullable=False)
+
+    # Dados do Stripe
+    stripe_session_id = db.Column(db.String(255), unique=True, nullable=True)  # checkout.session.id
+    stripe_customer_id = db.Column(db.String(255), nullable=True)  # customer ID do Stripe
+    stripe_subscription_id = db.Column(db.String(255), nullable=True)  # subscription ID do Stripe
+    stripe_payment_intent_id = db.Column(db.String(255), nullable=True)  # payment_intent ID
+
+    # Dados do Abacate Pay
+    abacatepay_billing_id = db.Column(db.String(255), unique=True, nullable=True)  # ID da cobrança
+    abacatepay_payment_url = db.Column(db.Text, nullable=True)  # URL de pagamento
+    abacatepay_qr_code = db.Column(db.Text, nullable=True)  # QR Code PIX em base64
+    abacatepay_pix_code = db.Column(db.Text, nullable=True)  # Código PIX copia-e-cola
+
+    # Dados da transação
+    plan_type = db.Column(db.String(20), nullable=False)  # 'premium' ou 'vip'
+    amount = db.Column(db.Integer, nullable=False)  # Valor em centavos
+    currency = db.Column(db.String(3), default='brl')  # Moeda
+    status = db.Column(db.String(20), default='pending')  # 'pending', 'completed', 'failed', 'refunded'
+
+    # Datas
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    paid_at = db.Column(db.DateTime, nullable=True)  # Quando o pagamento foi confirmado
+
+    # Relacionamento
     user = db.relationship('User', backref=db.backref('transactions', lazy=True, cascade="all, delete"))
 
     def __repr__(self):
@@ -1178,6 +2343,11 @@ class Comment(db.Model):
     # Relacionamento com Post
     post = db.relationship('Post', backref='comments')
 
+    # Listagem paginada dos comentários aprovados de um post (mais novos primeiro)
+    __table_args__ = (
+        db.Index('ix_comments_post_approved_date', 'post_id', 'is_approved', 'date_posted', 'id'),
+    )
+
     @property
     def status(self):
         """Retorna o status do comentário baseado em is_approved"""
@@ -1317,189 +2487,1769 @@ class SiteConfig(db.Model):
                 if key not in config_dict:
                     config_dict[key] = default_value
 
-            return config_dict
+            return config_dict
+
+        except Exception:
+            # Em caso de erro, retorna configurações básicas
+            return {
+                'site_name': 'Mundo da Informática',
+                'site_description': 'Portal de tecnologia e informática',
+                'contact_email': 'contato@mundodainformatica.com',
+                'social_facebook': '#',
+                'social_twitter': '#',
+                'social_instagram': '#',
+                'social_youtube': '#',
+                'phone': '(11) 99999-9999',
+                'whatsapp': '5511999999999',
+                'address': 'São Paulo - SP'
+            }
+
+    @staticmethod
+    def set_value(key, value, value_type='string', description=None, is_public=True):
+        """Define o valor de uma configuração"""
+        # Converter o valor para string conforme o tipo
+        if value_type == 'json' and not isinstance(value, str):
+            value = json.dumps(value)
+        elif value is not None and not isinstance(value, str):
+            value = str(value)
+
+        config = SiteConfig.query.filter_by(key=key).first()
+        if config:
+            config.value = value
+            if description:
+                config.description = description
+            if value_type:
+                config.value_type = value_type
+            config.is_public = is_public
+        else:
+            config = SiteConfig(
+                key=key, value=value, value_type=value_type,
+                description=description, is_public=is_public
+            )
+            db.session.add(config)
+
+        db.session.commit()
+        return config
+
+# Modelo para tracking de atividades administrativas
+class AdminActivity(db.Model):
+    __tablename__ = 'admin_activities'
+    __bind_key__ = 'telemetry'
+
+    id = db.Column(db.Integer, primary_key=True)
+    user_id = db.Column(db.Integer, nullable=False)  # Sem FK: a tabela user fica no banco principal
+    action = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.String(500), nullable=True)
+    activity_metadata = db.Column(db.Text, nullable=True)  # JSON data
+    ip_address = db.Column(db.String(45), nullable=True)
+    user_agent = db.Column(db.String(500), nullable=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relacionamento com User
+    user = db.relationship('User', primaryjoin='foreign(AdminActivity.user_id) == User.id',
+                           backref=db.backref('admin_activities', lazy=True))
+
+    def __repr__(self):
+        return f"AdminActivity('{self.action}', '{self.user.username}', '{self.created_at}')"
+
+# Modelo para tracking de visitantes e analytics
+class VisitorLog(db.Model):
+    __tablename__ = 'visitor_logs'
+    __bind_key__ = 'telemetry'
+
+    id = db.Column(db.Integer, primary_key=True)
+    ip_address = db.Column(db.String(45), nullable=False)
+    user_agent = db.Column(db.Text)
+    referrer = db.Column(db.String(500))
+    page_visited = db.Column(db.String(200))
+    visit_time = db.Column(db.DateTime, default=datetime.utcnow)
+    session_id = db.Column(db.String(100))
+    country = db.Column(db.String(50))
+    device_type = db.Column(db.String(50))  # mobile, desktop, tablet
+    browser = db.Column(db.String(50))
+    user_id = db.Column(db.Integer, nullable=True)  # Sem FK: a tabela user fica no banco principal
+
+class Subscriber(db.Model):
+    __tablename__ = 'subscribers'
+
+    id = db.Column(db.Integer, primary_key=True)
+    email = db.Column(db.String(120), nullable=False, unique=True)
+    name = db.Column(db.String(100))
+    subscribed_date = db.Column(db.DateTime, default=datetime.utcnow)
+    is_active = db.Column(db.Boolean, default=True)
+    confirm_token = db.Column(db.String(100), unique=True)
+    confirmed = db.Column(db.Boolean, default=False)
+
+    # Relacionamento com grupos
+    groups = db.relationship('NewsletterGroup', secondary='subscriber_groups', back_populates='subscribers')
+
+    def get_groups_names(self):
+        """Retorna nomes dos grupos separados por vírgula"""
+        try:
+            # Verificar se o relacionamento existe e foi carregado
+            if hasattr(self, 'groups'):
+                # Forçar carregamento do relacionamento
+                groups_query = db.session.query(NewsletterGroup).join(
+                    subscriber_groups, NewsletterGroup.id == subscriber_groups.c.group_id
+                ).filter(subscriber_groups.c.subscriber_id == self.id).all()
+
+                if groups_query:
+                    return ', '.join([group.name for group in groups_query])
+            return 'Geral'
+        except (AttributeError, TypeError, Exception):
+            return 'Geral'
+
+# Modelo para grupos de newsletter
+class NewsletterGroup(db.Model):
+    __tablename__ = 'newsletter_groups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    is_active = db.Column(db.Boolean, default=True)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    # Relacionamento com assinantes
+    subscribers = db.relationship('Subscriber', secondary='subscriber_groups', back_populates='groups')
+
+    def __repr__(self):
+        return f"NewsletterGroup('{self.name}')"
+
+# Tabela de associação para many-to-many entre Subscriber e NewsletterGroup
+subscriber_groups = db.Table('subscriber_groups',
+    db.Column('subscriber_id', db.Integer, db.ForeignKey('subscribers.id'), primary_key=True),
+    db.Column('group_id', db.Integer, db.ForeignKey('newsletter_groups.id'), primary_key=True)
+)
+
+# Modelo para backups
+class Backup(db.Model):
+    __tablename__ = 'backups'
+
+    id = db.Column(db.Integer, primary_key=True)
+    filename = db.Column(db.String(255), nullable=False)
+    file_path = db.Column(db.String(500), nullable=False)
+    backup_type = db.Column(db.String(50), nullable=False)  # 'database', 'files', 'full'
+    file_size = db.Column(db.BigInteger, nullable=False)  # tamanho em bytes
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    description = db.Column(db.Text, nullable=True)
+    is_automatic = db.Column(db.Boolean, default=False)
+    status = db.Column(db.String(20), default='completed')  # 'pending', 'in_progress', 'completed', 'failed'
+
+    # Relacionamento com usuário
+    user = db.relationship('User', backref=db.backref('backups', lazy=True))
+
+    def get_file_size_formatted(self):
+        """Retorna o tamanho do arquivo formatado"""
+        size = self.file_size
+        for unit in ['B', 'KB', 'MB', 'GB']:
+            if size < 1024.0:
+                return f"{size:.1f} {unit}"
+            size /= 1024.0
+        return f"{size:.1f} TB"
+
+    def __repr__(self):
+        return f"Backup('{self.filename}', '{self.backup_type}')"
+
+# Modelo para estatísticas de posts
+class PostStats(db.Model):
+    __tablename__ = 'post_stats'
+    __bind_key__ = 'telemetry'
+
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, nullable=False)  # Sem FK: a tabela posts fica no banco principal
+    date = db.Column(db.Date, default=datetime.utcnow, index=True)
+    views = db.Column(db.Integer, default=0)
+    downloads = db.Column(db.Integer, default=0)
+
+
+class PostTrending(db.Model):
+    """
+    Pontuação "em alta" de cada post (decaimento exponencial sobre post_stats).
+
+    Usa decaimento "para frente": cada dia entra com peso exp(λ·(dia - época)),
+    então a ordem entre posts não muda com o passar do tempo e só os posts
+    com estatísticas novas precisam ser atualizados.
+    """
+    __tablename__ = 'post_trending'
+
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), primary_key=True)
+    base = db.Column(db.Float, nullable=False, default=0)  # Dias completos já consolidados
+    score = db.Column(db.Float, nullable=False, default=0, index=True)  # base + dia atual
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+# Adicionar modelo Contact para mensagens de contato
+class Contact(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    email = db.Column(db.String(120), nullable=False)
+    subject = db.Column(db.String(200), nullable=True)
+    message = db.Column(db.Text, nullable=False)
+    date_sent = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
+    is_read = db.Column(db.Boolean, default=False)
+
+    def __repr__(self):
+        return f"Contact('{self.email}', '{self.subject}')"
+
+# Registro de imagens enviadas (deduplicação por hash de conteúdo e hash perceptual)
+class ImageAsset(db.Model):
+    __tablename__ = 'image_registry'
+
+    id = db.Column(db.Integer, primary_key=True)
+    content_hash = db.Column(db.String(64), nullable=False, index=True)  # SHA-256 do arquivo original
+    phash = db.Column(db.String(16), nullable=True)  # dHash de 64 bits em hexadecimal
+
+    # Faixas de 16 bits do dHash: duas imagens a até 3 bits de distância
+    # compartilham pelo menos uma faixa, então basta buscar por igualdade
+    phash_band0 = db.Column(db.Integer, nullable=True, index=True)
+    phash_band1 = db.Column(db.Integer, nullable=True, index=True)
+    phash_band2 = db.Column(db.Integer, nullable=True, index=True)
+    phash_band3 = db.Column(db.Integer, nullable=True, index=True)
+
+    url = db.Column(db.String(500), nullable=False, index=True)  # URL do Cloudinary ou nome do arquivo local
+    folder = db.Column(db.String(50), nullable=False, default='profiles')
+    file_size = db.Column(db.Integer, nullable=True)
+    width = db.Column(db.Integer, nullable=True)
+    height = db.Column(db.Integer, nullable=True)
+    reuse_count = db.Column(db.Integer, default=0)  # Quantas vezes o upload foi evitado
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"ImageAsset('{self.url}', '{self.content_hash[:12]}')"
+
+
+class RelatedPost(db.Model):
+    __tablename__ = 'related_posts'
+    __table_args__ = (
+        db.Index('ix_related_posts_post_rank', 'post_id', 'rank'),
+        db.Index('ix_related_posts_related_post_id', 'related_post_id'),
+    )
+
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
+    related_post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
+    rank = db.Column(db.Integer, nullable=False)  # 0 = mais parecido
+    score = db.Column(db.Float, nullable=False)  # Similaridade do cosseno (TF-IDF)
+    computed_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        return f"RelatedPost({self.post_id} -> {self.related_post_id}, {self.score:.3f})"
+
+
+class CoDownloadPair(db.Model):
+    """Contagem esparsa de usuários distintos que baixaram os dois posts (post_a <= post_b)"""
+    __tablename__ = 'co_download_pairs'
+
+    post_a = db.Column(db.Integer, primary_key=True)
+    post_b = db.Column(db.Integer, primary_key=True)  # post_a == post_b guarda o total de usuários do post
+    count = db.Column(db.Integer, nullable=False, default=0)
+
+
+class CoDownloadNeighbor(db.Model):
+    """Top-N de "quem baixou este também baixou" por post"""
+    __tablename__ = 'co_download_neighbors'
+    __table_args__ = (db.Index('ix_co_download_neighbors_post_rank', 'post_id', 'rank'),)
+
+    id = db.Column(db.Integer, primary_key=True)
+    post_id = db.Column(db.Integer, nullable=False)
+    neighbor_post_id = db.Column(db.Integer, nullable=False)
+    rank = db.Column(db.Integer, nullable=False)
+    score = db.Column(db.Float, nullable=False)  # Similaridade do cosseno entre os conjuntos de usuários
+    users = db.Column(db.Integer, nullable=False)  # Usuários em comum
+
+
+class ContentVersion(db.Model):
+    """Contadores de versão do conteúdo público (invalidam o cache de páginas)"""
+    __tablename__ = 'content_versions'
+
+    name = db.Column(db.String(30), primary_key=True)  # post, category, comment, siteconfig
+    version = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+class JobCheckpoint(db.Model):
+    """Último registro processado por jobs incrementais"""
+    __tablename__ = 'job_checkpoints'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+    @staticmethod
+    def get_last_id(name):
+        checkpoint = db.session.get(JobCheckpoint, name)
+        return checkpoint.last_id if checkpoint else 0
+
+    @staticmethod
+    def set_last_id(name, last_id):
+        checkpoint = db.session.get(JobCheckpoint, name)
+        if not checkpoint:
+            checkpoint = JobCheckpoint(name=name)
+            db.session.add(checkpoint)
+        checkpoint.last_id = last_id
+        checkpoint.updated_at = datetime.utcnow()
+
+
+class TelemetryCheckpoint(db.Model):
+    """Checkpoints dos jobs que gravam no banco de telemetria (avançam na mesma transação)"""
+    __tablename__ = 'telemetry_checkpoints'
+    __bind_key__ = 'telemetry'
+
+    name = db.Column(db.String(50), primary_key=True)
+    last_id = db.Column(db.Integer, nullable=False, default=0)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow)
+
+
+# ==========================================
+# POSTS RELACIONADOS (TF-IDF)
+# ==========================================
+RELATED_POSTS_K = 6  # Vizinhos guardados por post
+RELATED_MAX_FEATURES = 4096  # Termos mais frequentes usados no vocabulário
+RELATED_BATCH_SIZE = 64  # Linhas de similaridade por vez (64 x N floats)
+RELATED_SCORE_CHUNK = 4_000_000  # Produtos (floats) por bloco no cálculo da similaridade (16 MB)
+RELATED_MODEL_CHECKPOINT = 'related_model'  # Versão do modelo gravado em RELATED_MODEL_PATH
+app.config['RELATED_MODEL_PATH'] = os.environ.get(
+    'RELATED_MODEL_PATH', os.path.join(app.instance_path, 'related_tfidf.npz')
+)
+_related_model_cache = {}  # Modelo carregado neste processo (validado pela versão)
+RELATED_STOPWORDS = frozenset(
+    'a ao aos as com da das de do dos e em na nas no nos o os ou para pela pelas pelo pelos por que '
+    'se sem um uma uns umas the and for with of to in on is are this that download baixar gratis '
+    'versao como mais muito seu sua'.split()
+)
+
+
+def related_post_tokens(title, tags, content):
+    """Tokens de um post (título com peso 3, tags com peso 2, conteúdo sem HTML)"""
+    import unicodedata
+
+    def tokenize(text):
+        if not text:
+            return []
+        text = re.sub(r'<[^>]+>', ' ', text)
+        text = unicodedata.normalize('NFKD', text).encode('ascii', 'ignore').decode('ascii').lower()
+        return [token for token in re.findall(r'[a-z0-9]{2,}', text) if token not in RELATED_STOPWORDS]
+
+    return tokenize(title) * 3 + tokenize((tags or '').replace(',', ' ')) * 2 + tokenize(content)
+
+
+class SparseTfidf:
+    """
+    Matriz TF-IDF esparsa (formato CSR em arrays numpy), com as linhas já normalizadas.
+
+    Guarda só os termos presentes em cada post (alguns KB por post em vez de
+    RELATED_MAX_FEATURES floats). Os produtos escalares são calculados com numpy
+    por blocos de linhas, sem laço por post.
+    """
+
+    def __init__(self, indptr, indices, data, n_features):
+        self.indptr = indptr
+        self.indices = indices
+        self.data = data
+        self.n_features = n_features
+        self.n_rows = len(indptr) - 1
+
+    @staticmethod
+    def concat_ranges(starts, lengths):
+        """Concatenação de arange(start, start + length) para cada par (vetorizada)"""
+        import numpy as np
+
+        offsets = np.arange(int(lengths.sum()), dtype=np.int64) - np.repeat(np.cumsum(lengths) - lengths, lengths)
+        return np.repeat(starts, lengths) + offsets
+
+    def take_rows(self, rows):
+        """(indptr, indices, data) só com as linhas pedidas, na ordem pedida"""
+        import numpy as np
+
+        rows = np.asarray(rows, dtype=np.int64)
+        lengths = self.indptr[rows + 1] - self.indptr[rows]
+        positions = self.concat_ranges(self.indptr[rows], lengths)
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=indptr[1:])
+        return indptr, self.indices[positions], self.data[positions]
+
+    def scores(self, rows):
+        """Similaridade de cosseno das linhas pedidas com todas as linhas (len(rows) x N)"""
+        import numpy as np
+
+        rows = np.asarray(rows, dtype=np.int64)
+        # Linhas pedidas em forma densa (len(rows) x n_features, poucos MB)
+        query = np.zeros((len(rows), self.n_features), dtype=np.float32)
+        lengths = self.indptr[rows + 1] - self.indptr[rows]
+        positions = self.concat_ranges(self.indptr[rows], lengths)
+        query[np.repeat(np.arange(len(rows)), lengths), self.indices[positions]] = self.data[positions]
+
+        # Produto com a matriz inteira em blocos de linhas de até RELATED_SCORE_CHUNK produtos
+        scores = np.zeros((len(rows), self.n_rows), dtype=np.float32)
+        step = max(1, RELATED_SCORE_CHUNK // max(1, len(rows)))
+        row = 0
+        while row < self.n_rows:
+            first = self.indptr[row]
+            end = min(self.n_rows, max(row + 1, int(np.searchsorted(self.indptr, first + step, side='right')) - 1))
+            filled = np.flatnonzero(np.diff(self.indptr[row:end + 1]))
+            if len(filled):
+                block = slice(first, self.indptr[end])
+                products = query[:, self.indices[block]] * self.data[block]
+                scores[:, row + filled] = np.add.reduceat(products, self.indptr[row + filled] - first, axis=1)
+            row = end
+        return scores
+
+
+def related_post_vector(counts, columns, idf):
+    """Linha TF-IDF normalizada de um post: (colunas, pesos) ordenados pela coluna"""
+    row = sorted((columns[term], (1 + math.log(count)) * idf[columns[term]])
+                 for term, count in counts.items() if term in columns)
+    norm = math.sqrt(sum(weight * weight for _, weight in row)) or 1
+    return [column for column, _ in row], [weight / norm for _, weight in row]
+
+
+def build_related_tfidf():
+    """
+    Monta o modelo TF-IDF (matriz normalizada e esparsa) de todos os posts ativos.
+    Lê e tokeniza o catálogo inteiro: usado na reconstrução completa.
+
+    Returns:
+        dict: post_ids, matrix (SparseTfidf), vocabulary e idf
+    """
+    import numpy as np
+    from collections import Counter
+
+    post_ids = []
+    term_counts = []
+    document_frequency = Counter()
+    query = db.select(Post.id, Post.title, Post.tags, Post.content).where(Post.is_active == True)
+    for post_id, title, tags, content in db.session.execute(query.execution_options(yield_per=1000)):
+        counts = Counter(related_post_tokens(title, tags, content))
+        post_ids.append(post_id)
+        term_counts.append(counts)
+        document_frequency.update(counts.keys())
+
+    total = len(post_ids)
+    # Termos que aparecem em um só post não aproximam ninguém
+    min_df = 2 if total > 2 else 1
+    vocabulary = [term for term, df in document_frequency.most_common(RELATED_MAX_FEATURES) if df >= min_df]
+    columns = {term: index for index, term in enumerate(vocabulary)}
+    idf = [math.log((1 + total) / (1 + document_frequency[term])) + 1 for term in vocabulary]
+
+    indptr = [0]
+    indices = array('i')
+    data = array('f')
+    for counts in term_counts:
+        row_columns, row_weights = related_post_vector(counts, columns, idf)
+        indices.extend(row_columns)
+        data.extend(row_weights)
+        indptr.append(len(indices))
+
+    matrix = SparseTfidf(np.asarray(indptr, dtype=np.int64), np.frombuffer(indices, dtype=np.int32).astype(np.int64),
+                         np.frombuffer(data, dtype=np.float32), len(vocabulary))
+    return {'post_ids': post_ids, 'matrix': matrix, 'vocabulary': vocabulary, 'idf': idf}
+
+
+def update_related_model(model, post_ids):
+    """
+    Modelo com os vetores dos posts informados recalculados (ou removidos, se
+    inativos/apagados) usando o vocabulário e o IDF já gravados. Só esses posts
+    são lidos e tokenizados; o IDF é recalibrado na próxima reconstrução completa.
+    """
+    import numpy as np
+    from collections import Counter
+
+    post_ids = set(post_ids)
+    columns = {term: index for index, term in enumerate(model['vocabulary'])}
+    fresh_ids, fresh_lengths = [], []
+    fresh_columns = array('i')
+    fresh_weights = array('f')
+    id_list = list(post_ids)
+    for start in range(0, len(id_list), 500):
+        for post_id, title, tags, content in db.session.execute(
+            db.select(Post.id, Post.title, Post.tags, Post.content)
+            .where(Post.id.in_(id_list[start:start + 500]), Post.is_active == True)
+        ):
+            row_columns, row_weights = related_post_vector(
+                Counter(related_post_tokens(title, tags, content)), columns, model['idf']
+            )
+            fresh_ids.append(post_id)
+            fresh_lengths.append(len(row_columns))
+            fresh_columns.extend(row_columns)
+            fresh_weights.extend(row_weights)
+
+    matrix = model['matrix']
+    kept = [row for row, post_id in enumerate(model['post_ids']) if post_id not in post_ids]
+    indptr, indices, data = matrix.take_rows(kept)
+    indptr = np.concatenate([indptr, indptr[-1] + np.cumsum(np.asarray(fresh_lengths, dtype=np.int64))])
+    indices = np.concatenate([indices, np.frombuffer(fresh_columns, dtype=np.int32).astype(np.int64)])
+    data = np.concatenate([data, np.frombuffer(fresh_weights, dtype=np.float32)])
+
+    return {
+        'post_ids': [model['post_ids'][row] for row in kept] + fresh_ids,
+        'matrix': SparseTfidf(indptr, indices, data, matrix.n_features),
+        'vocabulary': model['vocabulary'],
+        'idf': model['idf'],
+    }
+
+
+def save_related_model(model, version):
+    """Grava o modelo em um arquivo temporário (movido para RELATED_MODEL_PATH após o commit)"""
+    import numpy as np
+
+    path = app.config['RELATED_MODEL_PATH']
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+    matrix = model['matrix']
+    with open(tmp_path, 'wb') as f:
+        np.savez(
+            f,
+            version=np.int64(version),
+            post_ids=np.asarray(model['post_ids'], dtype=np.int64),
+            indptr=matrix.indptr,
+            indices=matrix.indices,
+            data=matrix.data,
+            vocabulary=np.asarray(model['vocabulary'], dtype=str),
+            idf=np.asarray(model['idf'], dtype=np.float64),
+        )
+    return tmp_path
+
+
+def load_related_model(version):
+    """Modelo gravado na versão informada (memorizado por processo); None se ausente ou desatualizado"""
+    import numpy as np
+
+    if not version:
+        return None
+    cached = _related_model_cache.get('model')
+    if cached and cached['version'] == version:
+        return cached
+
+    try:
+        with np.load(app.config['RELATED_MODEL_PATH'], allow_pickle=False) as f:
+            if int(f['version']) != version:
+                return None
+            vocabulary = f['vocabulary'].tolist()
+            model = {
+                'version': version,
+                'post_ids': f['post_ids'].tolist(),
+                'matrix': SparseTfidf(f['indptr'], f['indices'], f['data'], len(vocabulary)),
+                'vocabulary': vocabulary,
+                'idf': f['idf'].tolist(),
+            }
+    except (OSError, KeyError, ValueError):
+        return None
+
+    _related_model_cache['model'] = model
+    return model
+
+
+def related_top_k(matrix, rows, k=RELATED_POSTS_K):
+    """Calcula os k vizinhos mais próximos das linhas pedidas, em lotes"""
+    import numpy as np
+
+    rows = np.asarray(sorted(rows), dtype=np.int64)
+    k = min(k, matrix.n_rows - 1)
+    if k <= 0:
+        return {}
+
+    neighbours = {}
+    for start in range(0, len(rows), RELATED_BATCH_SIZE):
+        batch = rows[start:start + RELATED_BATCH_SIZE]
+        scores = matrix.scores(batch)
+        scores[np.arange(len(batch)), batch] = -1  # Ignorar o próprio post
+        top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+        top_scores = np.take_along_axis(scores, top, axis=1)
+        order = np.argsort(-top_scores, axis=1)
+        for i, row in enumerate(batch):
+            neighbours[int(row)] = [
+                (int(top[i, j]), float(top_scores[i, j])) for j in order[i] if top_scores[i, j] > 0
+            ]
+    return neighbours
+
+
+def refresh_related_posts(post_ids=None, rebuild_missing=True):
+    """
+    Recalcula a tabela related_posts.
+
+    A reconstrução completa tokeniza o catálogo inteiro e grava o modelo TF-IDF
+    (RELATED_MODEL_PATH); o recálculo incremental parte do modelo gravado e só lê
+    os posts informados. A versão do modelo fica em job_checkpoints e avança na
+    mesma transação da tabela: se outro processo gravou uma versão nova nesse meio
+    tempo, o recálculo é refeito sobre ela.
+
+    Args:
+        post_ids: None para reconstruir tudo; ou ids de posts criados, alterados
+            ou removidos (também são recalculados os posts cuja lista muda por causa deles).
+        rebuild_missing: sem modelo gravado, reconstrói tudo (False nos workers web,
+            que não devem tokenizar o catálogo: o recálculo fica para o build_related_posts.py).
+
+    Returns:
+        int: quantidade de posts recalculados
+    """
+    import numpy as np
+
+    table = RelatedPost.__table__
+    if post_ids is not None:
+        post_ids = set(post_ids)
+    for _ in range(3):
+        version = read_checkpoint(JobCheckpoint, RELATED_MODEL_CHECKPOINT)
+        model = None if post_ids is None else load_related_model(version)
+        full = model is None
+        if full and post_ids is not None and not rebuild_missing:
+            debug_log("Modelo de posts relacionados ausente, rode: python build_related_posts.py --full")
+            return 0
+        model = build_related_tfidf() if full else update_related_model(model, post_ids)
+        ids = model['post_ids']
+        matrix = model['matrix']
+
+        position = {post_id: index for index, post_id in enumerate(ids)}
+
+        if full:
+            targets = set(range(len(ids)))
+            stale_ids = None
+        else:
+            changed = sorted(position[post_id] for post_id in post_ids if post_id in position)
+            targets = set(changed)
+
+            # Posts que apontavam para algum dos alterados/removidos
+            referencing = db.session.execute(
+                db.select(RelatedPost.post_id).where(RelatedPost.related_post_id.in_(post_ids)).distinct()
+            ).scalars()
+            targets.update(position[post_id] for post_id in referencing if post_id in position)
+
+            # Posts em que um alterado passaria a entrar no top-k
+            if changed:
+                weakest = dict(db.session.execute(
+                    db.select(RelatedPost.post_id, db.func.min(RelatedPost.score))
+                    .group_by(RelatedPost.post_id)
+                    .having(db.func.count(RelatedPost.id) >= RELATED_POSTS_K)
+                ).all())
+                threshold = np.array([weakest.get(post_id, 0.0) for post_id in ids], dtype=np.float32)
+                for start in range(0, len(changed), RELATED_BATCH_SIZE):
+                    scores = matrix.scores(changed[start:start + RELATED_BATCH_SIZE])
+                    targets.update(int(row) for row in np.nonzero((scores > threshold).any(axis=0))[0])
+
+            stale_ids = post_ids | {ids[row] for row in targets}
+
+        neighbours = related_top_k(matrix, targets)
+        now = datetime.utcnow()
+        rows = [
+            {'post_id': ids[row], 'related_post_id': ids[other], 'rank': rank, 'score': score, 'computed_at': now}
+            for row, items in neighbours.items()
+            for rank, (other, score) in enumerate(items)
+        ]
+
+        new_version = (version or 0) + 1
+        tmp_path = save_related_model(model, new_version)
+        try:
+            if not claim_checkpoint(JobCheckpoint, RELATED_MODEL_CHECKPOINT, version, new_version):
+                # Outro processo gravou o modelo primeiro: refazer sobre a versão nova
+                db.session.rollback()
+                os.remove(tmp_path)
+                continue
+            if stale_ids is None:
+                db.session.execute(table.delete())
+            else:
+                stale_ids = list(stale_ids)
+                for start in range(0, len(stale_ids), 500):
+                    db.session.execute(table.delete().where(table.c.post_id.in_(stale_ids[start:start + 500])))
+            if rows:
+                db.session.execute(table.insert(), rows)
+            db.session.commit()
+            os.replace(tmp_path, app.config['RELATED_MODEL_PATH'])
+        except Exception:
+            db.session.rollback()
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+        model['version'] = new_version
+        _related_model_cache['model'] = model
+        return len(targets)
+
+    raise RuntimeError("Modelo de posts relacionados alterado por outro processo durante o recálculo")
+
+
+def get_related_posts(post, limit=3):
+    """Posts relacionados pré-calculados (uma consulta pelo índice), com fallback por categoria"""
+    related = Post.query.join(RelatedPost, RelatedPost.related_post_id == Post.id).filter(
+        RelatedPost.post_id == post.id,
+        Post.is_active == True
+    ).order_by(RelatedPost.rank).limit(limit).all()
+
+    if related:
+        return related
+
+    # Tabela ainda não calculada para este post
+    return Post.query.filter(
+        Post.category_str == post.category_str,
+        Post.id != post.id
+    ).order_by(Post.views.desc()).limit(limit).all()
+
+
+# Posts alterados são recalculados em segundo plano, agrupados por alguns segundos
+RELATED_REFRESH_DELAY = 5
+RELATED_CONTENT_FIELDS = ('title', 'content', 'tags', 'is_active')
+_related_pending = set()
+_related_lock = threading.Lock()
+_related_timer = None
+
+
+def schedule_related_posts_refresh(post_ids):
+    """Agenda o recálculo incremental dos posts relacionados"""
+    global _related_timer
+
+    with _related_lock:
+        _related_pending.update(post_ids)
+        if _related_timer is None:
+            _related_timer = threading.Timer(RELATED_REFRESH_DELAY, _run_related_posts_refresh)
+            _related_timer.daemon = True
+            _related_timer.start()
+
+
+def _run_related_posts_refresh():
+    global _related_timer
+
+    with _related_lock:
+        post_ids = set(_related_pending)
+        _related_pending.clear()
+        _related_timer = None
+
+    try:
+        with app.app_context():
+            refreshed = refresh_related_posts(post_ids, rebuild_missing=False)
+            debug_log(f"Posts relacionados recalculados: {refreshed} posts")
+    except ImportError:
+        debug_log("NumPy não instalado, posts relacionados não recalculados")
+    except Exception as e:
+        print(f"Erro ao recalcular posts relacionados: {e}")
+
+
+@db.event.listens_for(Post, 'after_insert')
+@db.event.listens_for(Post, 'after_delete')
+def _mark_post_related_dirty(mapper, connection, target):
+    db.inspect(target).session.info.setdefault('related_dirty', set()).add(target.id)
+
+
+@db.event.listens_for(Post, 'after_update')
+def _mark_post_related_dirty_on_update(mapper, connection, target):
+    # Ignorar atualizações de contadores (views, downloads)
+    state = db.inspect(target)
+    if any(state.attrs[field].history.has_changes() for field in RELATED_CONTENT_FIELDS):
+        state.session.info.setdefault('related_dirty', set()).add(target.id)
+
+
+@db.event.listens_for(db.orm.Session, 'after_commit')
+def _schedule_related_after_commit(session):
+    dirty = session.info.pop('related_dirty', None)
+    if dirty:
+        schedule_related_posts_refresh(dirty)
+
+
+@db.event.listens_for(db.orm.Session, 'after_rollback')
+def _discard_related_after_rollback(session):
+    session.info.pop('related_dirty', None)
+
+
+# ==========================================
+# RECOMENDAÇÕES POR CO-DOWNLOAD
+# ==========================================
+CO_DOWNLOAD_TOP_N = 10  # Vizinhos guardados por post
+CO_DOWNLOAD_BATCH_SIZE = 5000  # Downloads lidos por execução do lote
+CO_DOWNLOAD_CHECKPOINT = 'co_downloads'
+
+
+def update_co_download_index(batch_size=CO_DOWNLOAD_BATCH_SIZE):
+    """
+    Processa os downloads novos (id maior que o checkpoint) e atualiza a
+    matriz de co-ocorrência e o top-N dos posts afetados.
+
+    Roda junto com a consolidação dos downloads (_run_download_rollup) e pelo
+    build_recommendations.py. O checkpoint é reservado com claim_checkpoint na
+    mesma transação dos incrementos: com vários workers, cada lote é somado uma vez.
+
+    Returns:
+        tuple: (downloads processados, posts recalculados)
+    """
+    from collections import Counter, defaultdict
+    from itertools import combinations
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    last_id = read_checkpoint(JobCheckpoint, CO_DOWNLOAD_CHECKPOINT)
+    new_rows = db.session.execute(
+        db.select(Download.id, Download.user_id, Download.post_id)
+        .where(Download.id > (last_id or 0))
+        .order_by(Download.id)
+        .limit(batch_size)
+    ).all()
+    if not new_rows:
+        return 0, 0
+
+    max_id = new_rows[-1].id
+    new_by_user = defaultdict(set)
+    for row in new_rows:
+        new_by_user[row.user_id].add(row.post_id)
+
+    # Posts que cada usuário já tinha baixado antes deste lote
+    previous_by_user = defaultdict(set)
+    user_ids = list(new_by_user)
+    for start in range(0, len(user_ids), 500):
+        for user_id, post_id in db.session.execute(
+            db.select(Download.user_id, Download.post_id).distinct()
+            .where(Download.user_id.in_(user_ids[start:start + 500]), Download.id <= (last_id or 0))
+        ):
+            previous_by_user[user_id].add(post_id)
+
+    increments = Counter()
+    for user_id, posts in new_by_user.items():
+        previous = previous_by_user[user_id]
+        added = posts - previous
+        for post_id in added:
+            increments[(post_id, post_id)] += 1  # Usuários distintos do post
+            for other in previous:
+                increments[(min(post_id, other), max(post_id, other))] += 1
+        for post_a, post_b in combinations(sorted(added), 2):
+            increments[(post_a, post_b)] += 1
+
+    try:
+        if not claim_checkpoint(JobCheckpoint, CO_DOWNLOAD_CHECKPOINT, last_id, max_id):
+            # Outro worker processou este lote
+            db.session.rollback()
+            return 0, 0
+
+        if increments:
+            statement = sqlite_insert(CoDownloadPair.__table__)
+            statement = statement.on_conflict_do_update(
+                index_elements=['post_a', 'post_b'],
+                set_={'count': CoDownloadPair.__table__.c.count + statement.excluded.count}
+            )
+            db.session.execute(statement, [
+                {'post_a': post_a, 'post_b': post_b, 'count': count}
+                for (post_a, post_b), count in increments.items()
+            ])
+
+        touched = {post_id for pair in increments for post_id in pair}
+        rebuild_co_download_neighbors(touched)
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(new_rows), len(touched)
+
+
+def rebuild_co_download_neighbors(post_ids):
+    """Recalcula o top-N dos posts informados a partir da matriz de co-ocorrência (sem commit)"""
+    if not post_ids:
+        return
+
+    pairs = CoDownloadPair.__table__
+    neighbors = CoDownloadNeighbor.__table__
+    post_ids = list(post_ids)
+
+    for start in range(0, len(post_ids), 500):
+        chunk = post_ids[start:start + 500]
+        rows = db.session.execute(
+            db.select(pairs.c.post_a, pairs.c.post_b, pairs.c.count)
+            .where(db.or_(pairs.c.post_a.in_(chunk), pairs.c.post_b.in_(chunk)))
+        ).all()
+
+        candidates = {}
+        for post_a, post_b, count in rows:
+            if post_a != post_b:
+                candidates.setdefault(post_a, []).append((post_b, count))
+                candidates.setdefault(post_b, []).append((post_a, count))
+
+        # Total de usuários de cada post envolvido (diagonal da matriz)
+        involved = {other for items in candidates.values() for other, _ in items} | set(chunk)
+        totals = {}
+        involved = list(involved)
+        for i in range(0, len(involved), 500):
+            totals.update(db.session.execute(
+                db.select(pairs.c.post_a, pairs.c.count)
+                .where(pairs.c.post_a == pairs.c.post_b, pairs.c.post_a.in_(involved[i:i + 500]))
+            ).all())
+
+        new_rows = []
+        for post_id in chunk:
+            scored = []
+            for other, count in candidates.get(post_id, []):
+                denominator = math.sqrt((totals.get(post_id) or 1) * (totals.get(other) or 1))
+                scored.append((count / denominator, count, other))
+            scored.sort(reverse=True)
+            for rank, (score, count, other) in enumerate(scored[:CO_DOWNLOAD_TOP_N]):
+                new_rows.append({'post_id': post_id, 'neighbor_post_id': other, 'rank': rank,
+                                 'score': score, 'users': count})
+
+        db.session.execute(neighbors.delete().where(neighbors.c.post_id.in_(chunk)))
+        if new_rows:
+            db.session.execute(neighbors.insert(), new_rows)
+
+
+def get_co_download_recommendations(post_id, limit=4):
+    """Posts baixados pelos mesmos usuários (consulta pelo índice post_id, rank)"""
+    return Post.query.join(CoDownloadNeighbor, CoDownloadNeighbor.neighbor_post_id == Post.id).filter(
+        CoDownloadNeighbor.post_id == post_id,
+        Post.is_active == True
+    ).order_by(CoDownloadNeighbor.rank).limit(limit).all()
+
+
+def get_user_recommendations(user_id, limit=6, seeds=5):
+    """
+    Recomendações para o perfil: vizinhos dos últimos posts baixados pelo
+    usuário, sem repetir o que ele já baixou.
+    """
+    seed_ids = db.session.execute(
+        db.select(Download.post_id)
+        .where(Download.user_id == user_id)
+        .group_by(Download.post_id)
+        .order_by(db.func.max(Download.id).desc())
+        .limit(seeds)
+    ).scalars().all()
+    if not seed_ids:
+        return []
+
+    already_downloaded = db.select(Download.post_id).where(Download.user_id == user_id)
+    best_score = db.func.max(CoDownloadNeighbor.score)
+    return Post.query.join(CoDownloadNeighbor, CoDownloadNeighbor.neighbor_post_id == Post.id).filter(
+        CoDownloadNeighbor.post_id.in_(seed_ids),
+        Post.is_active == True,
+        Post.id.notin_(already_downloaded)
+    ).group_by(Post.id).order_by(best_score.desc()).limit(limit).all()
+
+
+# ==========================================
+# POSTS EM ALTA (DECAIMENTO EXPONENCIAL)
+# ==========================================
+TRENDING_HALF_LIFE_DAYS = float(os.environ.get('TRENDING_HALF_LIFE_DAYS', 3))
+TRENDING_DECAY = math.log(2) / TRENDING_HALF_LIFE_DAYS  # λ por dia
+TRENDING_DOWNLOAD_WEIGHT = 5  # Um download vale 5 visualizações
+TRENDING_REFRESH_SECONDS = 600
+TRENDING_EPOCH_CHECKPOINT = 'trending_epoch'  # Dia de referência (ordinal) dos pesos
+TRENDING_FOLD_CHECKPOINT = 'trending_folded'  # Último dia completo consolidado (ordinal)
+TRENDING_MAX_EXPONENT = 500  # Rebase da época antes de estourar o float
+
+
+def _trending_weight(day_ordinal, epoch):
+    return math.exp(TRENDING_DECAY * (day_ordinal - epoch))
+
+
+def update_trending_scores(today=None):
+    """
+    Atualiza a tabela post_trending de forma incremental.
+
+    1. Dias completos ainda não consolidados entram em `base` (uma vez só);
+    2. o dia atual (que ainda recebe visitas) é somado por cima em `score`.
+
+    Returns:
+        int: quantidade de posts atualizados
+    """
+    from collections import defaultdict
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    today = today or datetime.utcnow().date()
+    today_ordinal = today.toordinal()
+    checkpoints = JobCheckpoint.__table__
+    trending = PostTrending.__table__
+
+    epoch = JobCheckpoint.get_last_id(TRENDING_EPOCH_CHECKPOINT)
+    folded = JobCheckpoint.get_last_id(TRENDING_FOLD_CHECKPOINT)
+    if not epoch:
+        epoch = today_ordinal
+        JobCheckpoint.set_last_id(TRENDING_EPOCH_CHECKPOINT, epoch)
+
+    try:
+        # Rebase: trazer a época para perto de hoje e reescalar as pontuações
+        if TRENDING_DECAY * (today_ordinal - epoch) > TRENDING_MAX_EXPONENT:
+            factor = _trending_weight(epoch, today_ordinal)
+            db.session.execute(trending.update().values(base=trending.c.base * factor,
+                                                        score=trending.c.score * factor))
+            epoch = today_ordinal
+            JobCheckpoint.set_last_id(TRENDING_EPOCH_CHECKPOINT, epoch)
+
+        contributions = defaultdict(lambda: [0.0, 0.0])  # post_id -> [base, hoje]
+        last_complete = today_ordinal - 1
+        if folded < last_complete:
+            # Reservar a consolidação: outro worker que tente ao mesmo tempo não casa o WHERE
+            claimed = db.session.execute(
+                checkpoints.update()
+                .where(checkpoints.c.name == TRENDING_FOLD_CHECKPOINT, checkpoints.c.last_id == folded)
+                .values(last_id=last_complete, updated_at=datetime.utcnow())
+            ).rowcount
+            if not claimed:
+                if folded:
+                    db.session.rollback()
+                    return 0
+                JobCheckpoint.set_last_id(TRENDING_FOLD_CHECKPOINT, last_complete)
+
+            first_day = datetime.fromordinal(folded + 1).date() if folded else None
+            query = db.select(PostStats.post_id, PostStats.date, PostStats.views, PostStats.downloads).where(
+                PostStats.date <= datetime.fromordinal(last_complete).date()
+            )
+            if first_day:
+                query = query.where(PostStats.date >= first_day)
+            for post_id, day, views, downloads in db.session.execute(query.execution_options(yield_per=5000)):
+                points = (views or 0) + TRENDING_DOWNLOAD_WEIGHT * (downloads or 0)
+                contributions[post_id][0] += points * _trending_weight(day.toordinal(), epoch)
+
+        today_weight = _trending_weight(today_ordinal, epoch)
+        for post_id, views, downloads in db.session.execute(
+            db.select(PostStats.post_id, PostStats.views, PostStats.downloads).where(PostStats.date == today)
+        ):
+            points = (views or 0) + TRENDING_DOWNLOAD_WEIGHT * (downloads or 0)
+            contributions[post_id][1] += points * today_weight
+
+        if contributions:
+            now = datetime.utcnow()
+            statement = sqlite_insert(trending)
+            statement = statement.on_conflict_do_update(
+                index_elements=['post_id'],
+                set_={
+                    'base': trending.c.base + statement.excluded.base,
+                    # Pontuação = base consolidada + parcial de hoje (recalculada a cada execução)
+                    'score': trending.c.base + statement.excluded.score,
+                    'updated_at': statement.excluded.updated_at,
+                }
+            )
+            db.session.execute(statement, [
+                {'post_id': post_id, 'base': base, 'score': base + partial, 'updated_at': now}
+                for post_id, (base, partial) in contributions.items()
+            ])
+
+        # Posts consolidados que não tiveram visitas hoje: descartar a parcial antiga
+        if folded < last_complete:
+            # post_stats está no banco de telemetria: ler os ids antes (sem JOIN entre arquivos)
+            today_posts = db.session.execute(
+                db.select(PostStats.post_id).where(PostStats.date == today)
+            ).scalars().all()
+            db.session.execute(trending.update().where(
+                trending.c.score != trending.c.base, trending.c.post_id.notin_(today_posts)
+            ).values(score=trending.c.base))
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(contributions)
+
+
+def trending_posts_query(category_str=None):
+    """
+    Posts ordenados pela pontuação "em alta" (lida do índice de post_trending).
+    Posts sem linha no índice (novos ou sem visitas na janela) entram com pontuação 0.
+    """
+    query = Post.query.outerjoin(PostTrending, PostTrending.post_id == Post.id).filter(Post.is_active == True)
+    if category_str:
+        query = query.filter(Post.category_str == category_str)
+    return query.order_by(db.func.coalesce(PostTrending.score, 0).desc(), Post.id.desc())
+
+
+def trending_score_now(stored_score):
+    """Converte a pontuação armazenada para o valor com decaimento até hoje"""
+    epoch = JobCheckpoint.get_last_id(TRENDING_EPOCH_CHECKPOINT)
+    if not stored_score or not epoch:
+        return 0.0
+    return stored_score * _trending_weight(epoch, datetime.utcnow().date().toordinal())
+
+
+_trending_thread_started = False
+_trending_thread_lock = threading.Lock()
+
+
+def _trending_refresh_loop():
+    while True:
+        try:
+            with app.app_context():
+                updated = update_trending_scores()
+                debug_log(f"Posts em alta atualizados: {updated} posts")
+        except Exception as e:
+            print(f"Erro ao atualizar posts em alta: {e}")
+        time.sleep(TRENDING_REFRESH_SECONDS)
+
+
+@app.before_request
+def start_trending_refresh():
+    """Inicia (uma vez por processo) a atualização periódica dos posts em alta"""
+    global _trending_thread_started
+    if _trending_thread_started or app.config.get('TESTING'):
+        return
+    with _trending_thread_lock:
+        if not _trending_thread_started:
+            _trending_thread_started = True
+            threading.Thread(target=_trending_refresh_loop, daemon=True, name='trending-refresh').start()
+
+# ==========================================
+# CACHE DE PÁGINAS PARA VISITANTES ANÔNIMOS
+# ==========================================
+# Arquivos em disco: compartilhado entre os workers do gunicorn
+page_cache = Cache(app, config={
+    'CACHE_TYPE': os.environ.get('PAGE_CACHE_TYPE', 'FileSystemCache'),
+    'CACHE_DIR': os.path.join(app.instance_path, 'page_cache'),
+    'CACHE_THRESHOLD': int(os.environ.get('PAGE_CACHE_THRESHOLD', 2000)),
+    'CACHE_DEFAULT_TIMEOUT': 300,
+}, with_jinja2_ext=False)  # A tag {% cache %} é a do cache de fragmentos (abaixo)
+app.config['PAGE_CACHE_ENABLED'] = os.environ.get('PAGE_CACHE_ENABLED', 'true').lower() == 'true'
+
+# endpoint -> (TTL em segundos, versões de conteúdo de que a página depende)
+PAGE_CACHE_ROUTES = {
+    'home': (60, ('post', 'category', 'siteconfig')),
+    'all_categories': (300, ('category', 'siteconfig')),
+    'category': (120, ('post', 'category', 'siteconfig')),
+    'post_by_slug': (300, ('post', 'category', 'comment', 'siteconfig')),
+    'faq': (3600, ('siteconfig',)),
+    'about': (3600, ('siteconfig',)),
+    'posts': (120, ('post', 'category', 'siteconfig')),
+}
+PAGE_CACHE_QUERY_ARGS = ('page', 'sort')  # Demais parâmetros (utm_*, etc.) não mudam a página
+CONTENT_VERSION_MODELS = {'Post': 'post', 'Category': 'category', 'Comment': 'comment', 'SiteConfig': 'siteconfig'}
+POST_COUNTER_FIELDS = {'views', 'downloads'}
+COMMENT_AUTHOR_FIELDS = {'username', 'profile_image'}  # Dados do User exibidos em cada comentário
+
+
+def get_content_state():
+    """
+    Versão e data da última alteração de cada conteúdo (uma consulta à tabela
+    pequena content_versions, memorizada durante a requisição).
+    """
+    if 'content_state' in g:
+        return g.content_state
+    try:
+        rows = db.session.execute(
+            db.select(ContentVersion.name, ContentVersion.version, ContentVersion.updated_at)
+        ).all()
+        state = {name: (version, updated_at) for name, version, updated_at in rows}
+    except Exception:
+        db.session.rollback()
+        state = {}
+    g.content_state = state
+    return state
+
+
+def get_content_versions():
+    """Versões atuais do conteúdo"""
+    return {name: version for name, (version, _) in get_content_state().items()}
+
+
+def content_last_modified(names):
+    """Data da alteração mais recente entre os conteúdos informados"""
+    state = get_content_state()
+    dates = [state[name][1] for name in names if name in state and state[name][1]]
+    return max(dates) if dates else None
+
+
+def _content_version_statement():
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    table = ContentVersion.__table__
+    statement = sqlite_insert(table).values(name=db.bindparam('name'), version=1, updated_at=datetime.utcnow())
+    return statement.on_conflict_do_update(index_elements=['name'], set_={
+        'version': table.c.version + 1,
+        'updated_at': statement.excluded.updated_at,
+    })
+
+
+def bump_content_version(*names):
+    """Invalida as páginas em cache que dependem destes conteúdos (para escritas fora do ORM)"""
+    db.session.execute(_content_version_statement(), [{'name': name} for name in names])
+    db.session.commit()
+
+
+@db.event.listens_for(db.orm.Session, 'after_flush')
+def _bump_content_versions(session, flush_context):
+    """Incrementa as versões na mesma transação em que o conteúdo é alterado"""
+    names = set()
+    for obj in list(session.new) + list(session.deleted):
+        name = CONTENT_VERSION_MODELS.get(type(obj).__name__)
+        if name:
+            names.add(name)
+    for obj in session.dirty:
+        if isinstance(obj, User) and 'comment' not in names:
+            # Nome e foto do autor estão nos comentários já renderizados/em cache
+            state = db.inspect(obj)
+            if any(state.attrs[field].history.has_changes() for field in COMMENT_AUTHOR_FIELDS):
+                names.add('comment')
+            continue
+        name = CONTENT_VERSION_MODELS.get(type(obj).__name__)
+        if not name or name in names:
+            continue
+        state = db.inspect(obj)
+        changed = {attr.key for attr in state.attrs if attr.history.has_changes()}
+        # Contadores de views/downloads não mudam o conteúdo da página
+        if name == 'post' and changed <= POST_COUNTER_FIELDS:
+            continue
+        if changed:
+            names.add(name)
+
+    if names:
+        session.connection().execute(_content_version_statement(), [{'name': name} for name in sorted(names)])
+
+
+# ==========================================
+# CACHE DE FRAGMENTOS DE TEMPLATE
+# ==========================================
+# Uso nos templates (o bloco é renderizado uma vez por chave e por worker):
+#     {% cache 'footer', content_version('siteconfig') %} ... {% endcache %}
+# O primeiro argumento é o nome do fragmento (usado nas estatísticas); os
+# demais formam a chave. content_version() devolve as versões atuais do
+# conteúdo (content_versions), então alterar uma categoria troca a chave do
+# menu de categorias em todos os workers, sem precisar invalidar nada.
+app.config['FRAGMENT_CACHE_SIZE'] = int(os.environ.get('FRAGMENT_CACHE_SIZE', 512))
+
+
+class FragmentCache:
+    """Cache LRU, por processo, de trechos de template já renderizados.
+
+    Guarda também, por fragmento, acertos, renderizações e o tempo gasto
+    renderizando; o tempo economizado é estimado pelo custo médio de uma
+    renderização multiplicado pelos acertos.
+    """
+
+    def __init__(self, max_entries=512):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._stats = {}
+        self._lock = threading.Lock()
+
+    def _fragment_stats(self, name):
+        return self._stats.setdefault(name, {'hits': 0, 'misses': 0, 'render_seconds': 0.0})
+
+    def render(self, name, key, render):
+        """Retorna o fragmento em cache ou chama render() e guarda o resultado"""
+        cache_key = (name, key)
+        with self._lock:
+            html = self._entries.get(cache_key)
+            if html is not None:
+                self._entries.move_to_end(cache_key)
+                self._fragment_stats(name)['hits'] += 1
+                return html
+
+        started = time.perf_counter()
+        html = render()
+        elapsed = time.perf_counter() - started
+
+        with self._lock:
+            stats = self._fragment_stats(name)
+            stats['misses'] += 1
+            stats['render_seconds'] += elapsed
+            self._entries[cache_key] = html
+            self._entries.move_to_end(cache_key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return html
+
+    def stats(self):
+        """Estatísticas por fragmento (deste worker)"""
+        with self._lock:
+            fragments = {}
+            for name, stats in sorted(self._stats.items()):
+                requests_count = stats['hits'] + stats['misses']
+                average = stats['render_seconds'] / stats['misses'] if stats['misses'] else 0.0
+                fragments[name] = {
+                    'hits': stats['hits'],
+                    'misses': stats['misses'],
+                    'hit_rate': round(stats['hits'] / requests_count, 4) if requests_count else 0.0,
+                    'avg_render_ms': round(average * 1000, 3),
+                    'saved_ms': round(average * stats['hits'] * 1000, 1),
+                }
+            return {'entries': len(self._entries), 'max_entries': self.max_entries, 'fragments': fragments}
+
+
+fragment_cache = FragmentCache(app.config['FRAGMENT_CACHE_SIZE'])
+
+
+class FragmentCacheExtension(Extension):
+    """Tag {% cache nome, chave... %}...{% endcache %} ligada ao fragment_cache"""
+    tags = {'cache'}
+
+    def parse(self, parser):
+        lineno = next(parser.stream).lineno
+        name = parser.parse_expression()
+        key = []
+        while parser.stream.skip_if('comma'):
+            key.append(parser.parse_expression())
+        body = parser.parse_statements(['name:endcache'], drop_needle=True)
+        call = self.call_method('_render_fragment', [name, nodes.Tuple(key, 'load')])
+        return nodes.CallBlock(call, [], [], body).set_lineno(lineno)
+
+    def _render_fragment(self, name, key, caller):
+        return fragment_cache.render(name, key, caller)
+
+
+app.jinja_env.add_extension(FragmentCacheExtension)
+
+
+@app.template_global()
+def content_version(*names):
+    """Versões atuais dos conteúdos informados, para compor chaves de {% cache %}"""
+    versions = get_content_versions()
+    return tuple(versions.get(name, 0) for name in names)
+
+
+@app.route("/admin/fragment-cache/stats", methods=['GET'])
+@login_required
+@admin_required
+def admin_fragment_cache_stats():
+    """Acertos e tempo economizado pelo cache de fragmentos (do worker que atendeu)"""
+    return jsonify({'success': True, 'pid': os.getpid(), **fragment_cache.stats()})
+
+
+class PostViewBuffer:
+    """
+    Acumula visualizações de posts em memória e grava em lote a cada poucos
+    segundos, para que acessos servidos pelo cache continuem sendo contados.
+    """
+
+    def __init__(self, flush_interval=10):
+        self.flush_interval = flush_interval
+        self.counts = {}
+        self.lock = threading.Lock()
+        self.timer = None
+
+    def add(self, post_id):
+        with self.lock:
+            self.counts[post_id] = self.counts.get(post_id, 0) + 1
+            self._schedule()
+
+    def _schedule(self):
+        # Chamado com self.lock adquirido
+        if self.timer is None:
+            self.timer = threading.Timer(self.flush_interval, self.flush)
+            self.timer.daemon = True
+            self.timer.start()
+
+    def flush(self):
+        with self.lock:
+            counts, self.counts = self.counts, {}
+            self.timer = None
+        if not counts:
+            return
+
+        with app.app_context():
+            try:
+                posts = Post.__table__
+                stats = PostStats.__table__
+                today = datetime.utcnow().date()
+
+                db.session.execute(
+                    posts.update().where(posts.c.id == db.bindparam('b_id'))
+                    .values(views=db.func.coalesce(posts.c.views, 0) + db.bindparam('b_count')),
+                    [{'b_id': post_id, 'b_count': count} for post_id, count in counts.items()]
+                )
+
+                existing = set(db.session.execute(
+                    db.select(PostStats.post_id).where(PostStats.date == today, PostStats.post_id.in_(list(counts)))
+                ).scalars())
+                updates = [{'b_id': post_id, 'b_count': count} for post_id, count in counts.items() if post_id in existing]
+                inserts = [{'post_id': post_id, 'date': today, 'views': count, 'downloads': 0}
+                           for post_id, count in counts.items() if post_id not in existing]
+                if updates:
+                    db.session.execute(
+                        stats.update().where(stats.c.post_id == db.bindparam('b_id'), stats.c.date == today)
+                        .values(views=stats.c.views + db.bindparam('b_count')),
+                        updates
+                    )
+                if inserts:
+                    db.session.execute(stats.insert(), inserts)
+                db.session.commit()
+            except Exception as e:
+                db.session.rollback()
+                app.logger.error(f"Erro ao gravar {sum(counts.values())} visualizações em lote: {e}")
+                # Devolver ao buffer para a próxima gravação tentar de novo
+                with self.lock:
+                    for post_id, count in counts.items():
+                        self.counts[post_id] = self.counts.get(post_id, 0) + count
+                    self._schedule()
+
+
+post_view_buffer = PostViewBuffer()
+atexit.register(post_view_buffer.flush)
+
+
+def record_post_view(post_id):
+    """Conta uma visualização de post (gravada em lote pelo PostViewBuffer)"""
+    post_view_buffer.add(post_id)
+    g.page_cache_post_id = post_id
+
+
+# ==========================================
+# LOG DE DOWNLOADS E CONTADORES DERIVADOS
+# ==========================================
+DOWNLOAD_ROLLUP_CHECKPOINT = 'download_rollup'  # Último Download.id consolidado
+DOWNLOAD_ROLLUP_BATCH_SIZE = 5000
+DOWNLOAD_ROLLUP_DELAY = 10  # Segundos agrupando downloads antes de consolidar
+
+
+def read_checkpoint(model, name):
+    """last_id do checkpoint (JobCheckpoint ou TelemetryCheckpoint); None se ainda não existe"""
+    return db.session.execute(db.select(model.last_id).where(model.name == name)).scalar()
+
+
+def claim_checkpoint(model, name, last_id, new_id):
+    """
+    Avança o checkpoint de last_id para new_id na transação atual.
+    Retorna False se outro worker já avançou (UPDATE ... WHERE last_id = :anterior).
+    """
+    from sqlalchemy.dialects.sqlite import insert as sqlite_insert
+
+    table = model.__table__
+    if last_id is None:
+        statement = sqlite_insert(table).values(
+            name=name, last_id=new_id, updated_at=datetime.utcnow()
+        ).on_conflict_do_nothing()
+    else:
+        statement = table.update().where(table.c.name == name, table.c.last_id == last_id).values(
+            last_id=new_id, updated_at=datetime.utcnow()
+        )
+    return db.session.execute(statement).rowcount == 1
+
+
+def _pending_downloads(last_id, batch_size):
+    return db.session.execute(
+        db.select(Download.id, Download.user_id, Download.post_id, Download.timestamp,
+                  Download.ip_address, Download.user_agent, Post.title, Post.download_link)
+        .outerjoin(Post, Post.id == Download.post_id)
+        .where(Download.id > (last_id or 0))
+        .order_by(Download.id)
+        .limit(batch_size)
+    ).all()
+
+
+def _rollup_download_counters(batch_size):
+    """posts.downloads (banco principal, checkpoint em job_checkpoints)"""
+    from collections import Counter
+
+    last_id = read_checkpoint(JobCheckpoint, DOWNLOAD_ROLLUP_CHECKPOINT)
+    rows = _pending_downloads(last_id, batch_size)
+    if not rows:
+        return 0
+
+    try:
+        if not claim_checkpoint(JobCheckpoint, DOWNLOAD_ROLLUP_CHECKPOINT, last_id, rows[-1].id):
+            # Outro worker consolidou este lote
+            db.session.rollback()
+            return 0
+
+        posts = Post.__table__
+        per_post = Counter(row.post_id for row in rows)
+        db.session.execute(
+            posts.update().where(posts.c.id == db.bindparam('b_id'))
+            .values(downloads=db.func.coalesce(posts.c.downloads, 0) + db.bindparam('b_count')),
+            [{'b_id': post_id, 'b_count': count} for post_id, count in per_post.items()]
+        )
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(rows)
+
+
+def _rollup_download_telemetry(batch_size):
+    """post_stats.downloads e admin_activities (banco de telemetria, checkpoint em telemetry_checkpoints)"""
+    from collections import Counter
+
+    last_id = read_checkpoint(TelemetryCheckpoint, DOWNLOAD_ROLLUP_CHECKPOINT)
+    rows = _pending_downloads(last_id, batch_size)
+    if not rows:
+        return 0
+
+    try:
+        if not claim_checkpoint(TelemetryCheckpoint, DOWNLOAD_ROLLUP_CHECKPOINT, last_id, rows[-1].id):
+            db.session.rollback()
+            return 0
+
+        stats = PostStats.__table__
+        per_day = Counter((row.post_id, row.timestamp.date()) for row in rows)
+        days = {day for _, day in per_day}
+        existing = set(db.session.execute(
+            db.select(PostStats.post_id, PostStats.date)
+            .where(PostStats.post_id.in_({post_id for post_id, _ in per_day}), PostStats.date.in_(days))
+        ).tuples())
+        updates = [{'b_id': post_id, 'b_date': day, 'b_count': count}
+                   for (post_id, day), count in per_day.items() if (post_id, day) in existing]
+        inserts = [{'post_id': post_id, 'date': day, 'views': 0, 'downloads': count}
+                   for (post_id, day), count in per_day.items() if (post_id, day) not in existing]
+        if updates:
+            db.session.execute(
+                stats.update().where(stats.c.post_id == db.bindparam('b_id'), stats.c.date == db.bindparam('b_date'))
+                .values(downloads=db.func.coalesce(stats.c.downloads, 0) + db.bindparam('b_count')),
+                updates
+            )
+        if inserts:
+            db.session.execute(stats.insert(), inserts)
+
+        db.session.execute(AdminActivity.__table__.insert(), [{
+            'user_id': row.user_id,
+            'action': 'file_downloaded',
+            'description': f"Download do arquivo: {row.title}",
+            'activity_metadata': json.dumps({
+                'post_id': row.post_id,
+                'post_title': row.title,
+                'download_url': row.download_link,
+            }),
+            'ip_address': row.ip_address,
+            'user_agent': row.user_agent,
+            'created_at': row.timestamp,
+        } for row in rows])
+
+        db.session.commit()
+    except Exception:
+        db.session.rollback()
+        raise
+
+    return len(rows)
+
+
+def rollup_downloads(batch_size=DOWNLOAD_ROLLUP_BATCH_SIZE):
+    """
+    Consolida os downloads novos do log (id maior que o checkpoint) em
+    posts.downloads, post_stats.downloads e no registro "file_downloaded" de
+    admin_activities.
+
+    Cada banco (principal e telemetria) tem o seu checkpoint, reservado com
+    UPDATE ... WHERE last_id = :anterior e avançado na mesma transação dos seus
+    contadores: cada download é contado uma única vez em cada banco, mesmo com
+    vários workers, e o que ficar pendente após um reinício é consolidado na
+    próxima execução.
+
+    Returns:
+        int: maior quantidade de downloads consolidados entre os dois bancos
+    """
+    return max(_rollup_download_counters(batch_size), _rollup_download_telemetry(batch_size))
+
+
+_download_rollup_lock = threading.Lock()
+_download_rollup_timer = None
+
+
+def schedule_download_rollup():
+    """Agenda a consolidação dos downloads, agrupando os cliques de alguns segundos"""
+    global _download_rollup_timer
+
+    with _download_rollup_lock:
+        if _download_rollup_timer is None:
+            _download_rollup_timer = threading.Timer(DOWNLOAD_ROLLUP_DELAY, _run_download_rollup)
+            _download_rollup_timer.daemon = True
+            _download_rollup_timer.start()
+
+
+def _run_download_rollup():
+    global _download_rollup_timer
+
+    with _download_rollup_lock:
+        _download_rollup_timer = None
 
-        except Exception:
-            # Em caso de erro, retorna configurações básicas
-            return {
-                'site_name': 'Mundo da Informática',
-                'site_description': 'Portal de tecnologia e informática',
-                'contact_email': 'contato@mundodainformatica.com',
-                'social_facebook': '#',
-                'social_twitter': '#',
-                'social_instagram': '#',
-                'social_youtube': '#',
-                'phone': '(11) 99999-9999',
-                'whatsapp': '5511999999999',
-                'address': 'São Paulo - SP'
-            }
+    try:
+        with app.app_context():
+            while rollup_downloads() == DOWNLOAD_ROLLUP_BATCH_SIZE:
+                pass
+    except Exception as e:
+        print(f"Erro ao consolidar downloads: {e}")
 
-    @staticmethod
-    def set_value(key, value, value_type='string', description=None, is_public=True):
-        """Define o valor de uma configuração"""
-        # Converter o valor para string conforme o tipo
-        if value_type == 'json' and not isinstance(value, str):
-            value = json.dumps(value)
-        elif value is not None and not isinstance(value, str):
-            value = str(value)
+    # Recomendações "quem baixou também baixou" a partir dos mesmos downloads
+    try:
+        with app.app_context():
+            while update_co_download_index()[0] == CO_DOWNLOAD_BATCH_SIZE:
+                pass
+    except Exception as e:
+        print(f"Erro ao atualizar recomendações por co-download: {e}")
 
-        config = SiteConfig.query.filter_by(key=key).first()
-        if config:
-            config.value = value
-            if description:
-                config.description = description
-            if value_type:
-                config.value_type = value_type
-            config.is_public = is_public
-        else:
-            config = SiteConfig(
-                key=key, value=value, value_type=value_type,
-                description=description, is_public=is_public
-            )
-            db.session.add(config)
 
-        db.session.commit()
-        return config
+@atexit.register
+def _flush_download_rollup():
+    """Consolida na saída do processo o que ainda estava agendado"""
+    with _download_rollup_lock:
+        timer = _download_rollup_timer
+    if timer is not None:
+        timer.cancel()
+        _run_download_rollup()
 
-# Modelo para tracking de atividades administrativas
-class AdminActivity(db.Model):
-    __tablename__ = 'admin_activities'
 
-    id = db.Column(db.Integer, primary_key=True)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    action = db.Column(db.String(100), nullable=False)
-    description = db.Column(db.String(500), nullable=True)
-    activity_metadata = db.Column(db.Text, nullable=True)  # JSON data
-    ip_address = db.Column(db.String(45), nullable=True)
-    user_agent = db.Column(db.String(500), nullable=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+def page_cache_key():
+    """
+    Chave da versão atual da página pública, ou None se a requisição não se
+    aplica (usuário logado, mensagens flash, método diferente de GET).
+    Também serve de base para o ETag das páginas públicas.
+    """
+    if request.method != 'GET':
+        return None
+    route = PAGE_CACHE_ROUTES.get(request.endpoint)
+    if not route or current_user.is_authenticated or session.get('_flashes'):
+        return None
 
-    # Relacionamento com User
-    user = db.relationship('User', backref=db.backref('admin_activities', lazy=True))
+    versions = get_content_versions()
+    version_key = '.'.join(str(versions.get(name, 0)) for name in route[1])
+    args = '&'.join(f'{name}={request.args[name]}' for name in PAGE_CACHE_QUERY_ARGS if name in request.args)
+    return f'page:{request.path}?{args}:v{version_key}'
 
-    def __repr__(self):
-        return f"AdminActivity('{self.action}', '{self.user.username}', '{self.created_at}')"
 
-# Modelo para tracking de visitantes e analytics
-class VisitorLog(db.Model):
-    __tablename__ = 'visitor_logs'
+@app.before_request
+def serve_cached_page():
+    """
+    Responde visitantes anônimos antes de executar a view: 304 se o navegador
+    já tem a versão guardada da página, ou o HTML guardado no cache.
+    Registrado por último entre os before_request.
 
-    id = db.Column(db.Integer, primary_key=True)
-    ip_address = db.Column(db.String(45), nullable=False)
-    user_agent = db.Column(db.Text)
-    referrer = db.Column(db.String(500))
-    page_visited = db.Column(db.String(200))
-    visit_time = db.Column(db.DateTime, default=datetime.utcnow)
-    session_id = db.Column(db.String(100))
-    country = db.Column(db.String(50))
-    device_type = db.Column(db.String(50))  # mobile, desktop, tablet
-    browser = db.Column(db.String(50))
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=True)
+    Os validadores saem do próprio HTML (hash do corpo e hora da renderização),
+    porque a página também depende de dados fora de content_versions (ordem
+    "em alta", contadores de views/downloads, estatísticas da home).
+    """
+    key = page_cache_key()
+    if not key:
+        return None
 
-class Subscriber(db.Model):
-    __tablename__ = 'subscribers'
+    entry = page_cache.get(key) if app.config['PAGE_CACHE_ENABLED'] else None
+    if entry is None or 'etag' not in entry:
+        # Renderizar; os validadores são calculados sobre o HTML gerado (store_cached_page)
+        g.page_cache_key = key
+        return None
 
-    id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(120), nullable=False, unique=True)
-    name = db.Column(db.String(100))
-    subscribed_date = db.Column(db.DateTime, default=datetime.utcnow)
-    is_active = db.Column(db.Boolean, default=True)
-    confirm_token = db.Column(db.String(100), unique=True)
-    confirmed = db.Column(db.Boolean, default=False)
+    etag, last_modified = entry['etag'], entry['rendered_at']
+    if entry.get('post_id'):
+        post_view_buffer.add(entry['post_id'])
+    if request_not_modified(etag, last_modified):
+        return not_modified_response(etag, last_modified)
 
-    # Relacionamento com grupos
-    groups = db.relationship('NewsletterGroup', secondary='subscriber_groups', back_populates='subscribers')
+    response = app.response_class(entry['body'], status=200, mimetype=entry['mimetype'])
+    apply_validators(response, etag, last_modified)
+    response.headers['X-Page-Cache'] = 'HIT'
+    return response
 
-    def get_groups_names(self):
-        """Retorna nomes dos grupos separados por vírgula"""
-        try:
-            # Verificar se o relacionamento existe e foi carregado
-            if hasattr(self, 'groups'):
-                # Forçar carregamento do relacionamento
-                groups_query = db.session.query(NewsletterGroup).join(
-                    subscriber_groups, NewsletterGroup.id == subscriber_groups.c.group_id
-                ).filter(subscriber_groups.c.subscriber_id == self.id).all()
 
-                if groups_query:
-                    return ', '.join([group.name for group in groups_query])
-            return 'Geral'
-        except (AttributeError, TypeError, Exception):
-            return 'Geral'
+@app.after_request
+def store_cached_page(response):
+    key = g.pop('page_cache_key', None)
+    cacheable = (response.status_code == 200 and not response.direct_passthrough
+                 and response.mimetype == 'text/html' and not session.get('_flashes'))
+    if not key or not cacheable:
+        return response
 
-# Modelo para grupos de newsletter
-class NewsletterGroup(db.Model):
-    __tablename__ = 'newsletter_groups'
+    body = response.get_data()
+    etag = make_etag(key, hashlib.sha1(body).hexdigest())
+    rendered_at = datetime.utcnow().replace(microsecond=0)
+    if app.config['PAGE_CACHE_ENABLED']:
+        ttl = PAGE_CACHE_ROUTES[request.endpoint][0]
+        page_cache.set(key, {
+            'body': body,
+            'mimetype': response.mimetype,
+            'post_id': g.get('page_cache_post_id'),
+            'etag': etag,
+            'rendered_at': rendered_at,
+        }, timeout=ttl)
+        response.headers['X-Page-Cache'] = 'MISS'
+
+    if request_not_modified(etag):
+        return not_modified_response(etag, rendered_at)
+    return apply_validators(response, etag, rendered_at)
 
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    description = db.Column(db.Text, nullable=True)
-    is_active = db.Column(db.Boolean, default=True)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
-    # Relacionamento com assinantes
-    subscribers = db.relationship('Subscriber', secondary='subscriber_groups', back_populates='groups')
+# ==========================================
+# VALIDADORES HTTP (ETag / Last-Modified)
+# ==========================================
+def make_etag(*parts):
+    """ETag curto a partir de valores baratos que mudam junto com a resposta"""
+    return hashlib.sha1(repr(parts).encode('utf-8')).hexdigest()[:32]
 
-    def __repr__(self):
-        return f"NewsletterGroup('{self.name}')"
 
-# Tabela de associação para many-to-many entre Subscriber e NewsletterGroup
-subscriber_groups = db.Table('subscriber_groups',
-    db.Column('subscriber_id', db.Integer, db.ForeignKey('subscribers.id'), primary_key=True),
-    db.Column('group_id', db.Integer, db.ForeignKey('newsletter_groups.id'), primary_key=True)
-)
+def request_not_modified(etag, last_modified=None):
+    """Verifica If-None-Match / If-Modified-Since contra os validadores atuais"""
+    if request.if_none_match:
+        if request.if_none_match.star_tag:
+            return True
+        # Flask-Compress acrescenta ":gzip"/":br" ao ETag das respostas comprimidas
+        return any(candidate.split(':', 1)[0] == etag
+                   for candidate in request.if_none_match.as_set(include_weak=True))
+    if last_modified and request.if_modified_since:
+        return last_modified.replace(microsecond=0) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def apply_validators(response, etag, last_modified=None):
+    """Adiciona ETag/Last-Modified e obriga o navegador a revalidar"""
+    response.set_etag(etag, weak=True)
+    if last_modified:
+        response.last_modified = last_modified
+    response.cache_control.no_cache = True
+    if current_user.is_authenticated:
+        response.cache_control.private = True
+    response.vary.add('Cookie')
+    return response
 
-# Modelo para backups
-class Backup(db.Model):
-    __tablename__ = 'backups'
 
-    id = db.Column(db.Integer, primary_key=True)
-    filename = db.Column(db.String(255), nullable=False)
-    file_path = db.Column(db.String(500), nullable=False)
-    backup_type = db.Column(db.String(50), nullable=False)  # 'database', 'files', 'full'
-    file_size = db.Column(db.BigInteger, nullable=False)  # tamanho em bytes
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
-    description = db.Column(db.Text, nullable=True)
-    is_automatic = db.Column(db.Boolean, default=False)
-    status = db.Column(db.String(20), default='completed')  # 'pending', 'in_progress', 'completed', 'failed'
+def not_modified_response(etag, last_modified=None):
+    return apply_validators(app.response_class(status=304), etag, last_modified)
 
-    # Relacionamento com usuário
-    user = db.relationship('User', backref=db.backref('backups', lazy=True))
 
-    def get_file_size_formatted(self):
-        """Retorna o tamanho do arquivo formatado"""
-        size = self.file_size
-        for unit in ['B', 'KB', 'MB', 'GB']:
-            if size < 1024.0:
-                return f"{size:.1f} {unit}"
-            size /= 1024.0
-        return f"{size:.1f} TB"
+def conditional_view(validator):
+    """
+    Responde 304 antes de executar a view quando o cliente já tem a versão atual.
 
-    def __repr__(self):
-        return f"Backup('{self.filename}', '{self.backup_type}')"
+    O validador recebe os mesmos argumentos da view e retorna uma tupla
+    (partes do ETag, last_modified) calculada com consultas baratas, ou None
+    para não validar a requisição.
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapped(*args, **kwargs):
+            validators = validator(*args, **kwargs) if request.method == 'GET' else None
+            if validators is None:
+                return view(*args, **kwargs)
+
+            parts, last_modified = validators
+            etag = make_etag(request.path, sorted(request.args.items(multi=True)), parts)
+            if request_not_modified(etag, last_modified):
+                return not_modified_response(etag, last_modified)
+
+            response = app.make_response(view(*args, **kwargs))
+            if response.status_code == 200:
+                apply_validators(response, etag, last_modified)
+            return response
+        return wrapped
+    return decorator
+
+
+def _post_rows_validator(query):
+    """Partes do ETag de uma lista de posts: só as colunas que mudam sem versão de conteúdo"""
+    rows = db.session.execute(query).all()
+    dates = [row.date_updated or row.date_posted for row in rows]
+    dates.append(content_last_modified(('post', 'category')))
+    dates = [date for date in dates if date]
+    last_modified = max(dates) if dates else None
+    versions = get_content_versions()
+    parts = (versions.get('post', 0), versions.get('category', 0),
+             [tuple(row) for row in rows], datetime.utcnow().date().toordinal())
+    return parts, last_modified
+
+
+def api_posts_validator():
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    category = request.args.get('category')
+    columns = (Post.id, Post.views, Post.downloads, Post.date_posted, Post.date_updated)
+
+    if request.args.get('sort', 'recent') == 'trending':
+        query = db.select(*columns, PostTrending.score).outerjoin(
+            PostTrending, PostTrending.post_id == Post.id
+        ).where(Post.is_active == True).order_by(db.func.coalesce(PostTrending.score, 0).desc(), Post.id.desc())
+    else:
+        query = db.select(*columns).order_by(Post.date_posted.desc())
+    if category:
+        query = query.where(Post.category_str == category)
+    return _post_rows_validator(query.limit(limit))
 
-# Modelo para estatísticas de posts
-class PostStats(db.Model):
-    __tablename__ = 'post_stats'
 
-    id = db.Column(db.Integer, primary_key=True)
-    post_id = db.Column(db.Integer, db.ForeignKey('posts.id'), nullable=False)
-    date = db.Column(db.Date, default=datetime.utcnow)
-    views = db.Column(db.Integer, default=0)
-    downloads = db.Column(db.Integer, default=0)
+def api_post_validator(post_id):
+    return _post_rows_validator(
+        db.select(Post.id, Post.views, Post.downloads, Post.date_posted, Post.date_updated).where(Post.id == post_id)
+    )
 
-# Adicionar modelo Contact para mensagens de contato
-class Contact(db.Model):
-    id = db.Column(db.Integer, primary_key=True)
-    name = db.Column(db.String(100), nullable=False)
-    email = db.Column(db.String(120), nullable=False)
-    subject = db.Column(db.String(200), nullable=True)
-    message = db.Column(db.Text, nullable=False)
-    date_sent = db.Column(db.DateTime, nullable=False, default=datetime.utcnow)
-    is_read = db.Column(db.Boolean, default=False)
 
-    def __repr__(self):
-        return f"Contact('{self.email}', '{self.subject}')"
+def post_comments_validator(category, slug):
+    post_id = db.session.execute(db.select(Post.id).where(Post.slug == slug)).scalar()
+    if post_id is None:
+        return None
+    stats = db.session.execute(
+        db.select(db.func.count(Comment.id), db.func.max(Comment.id), db.func.max(Comment.date_edited))
+        .where(Comment.post_id == post_id, Comment.is_approved == True)
+    ).one()
+    # Aprovar/remover comentários incrementa a versão 'comment'
+    return (post_id, get_content_versions().get('comment', 0), tuple(stats)), content_last_modified(('comment',))
 
 # Contexto global mais completo para templates
 @app.context_processor
@@ -1512,7 +4262,7 @@ def inject_global_data():
         return url_for('post', post_id=post.id)
 
     # Função helper para gerar URL de imagem (local ou Cloudinary)
-    def get_image_url(image_path, folder='profiles', default='default.jpg'):
+    def get_image_url(image_path, folder='profiles', default='default.jpg', width=None):
         """
         Retorna a URL correta da imagem (Cloudinary ou local)
 
@@ -1520,6 +4270,7 @@ def inject_global_data():
             image_path: Caminho da imagem (pode ser URL do Cloudinary ou nome do arquivo)
             folder: Pasta local caso seja arquivo local
             default: Imagem padrão se não houver imagem
+            width: Largura desejada; se informada, retorna a variante redimensionada
 
         Returns:
             str: URL completa da imagem
@@ -1527,6 +4278,11 @@ def inject_global_data():
         if not image_path or image_path == 'default.jpg':
             return url_for('static', filename=f'images/{folder}/{default}')
 
+        if width:
+            resized_url = resized_image_url(image_path, folder, width)
+            if resized_url:
+                return resized_url
+
         # Se já é uma URL do Cloudinary, retornar diretamente
         if image_path.startswith('http://') or image_path.startswith('https://'):
             return image_path
@@ -1534,6 +4290,11 @@ def inject_global_data():
         # Caso contrário, é um arquivo local
         return url_for('static', filename=f'uploads/{folder}/{image_path}')
 
+    # Função helper para gerar srcset com variantes redimensionadas
+    def get_image_srcset(image_path, folder='profiles', widths=IMAGE_SRCSET_WIDTHS):
+        """Retorna o srcset (ex: '/img/...?w=320 320w, ...') ou string vazia"""
+        return build_image_srcset(image_path, folder, widths)
+
     # Categorias
     categories = Category.query.filter_by(is_active=True).order_by(Category.order).all()
 
@@ -1569,6 +4330,7 @@ def inject_global_data():
         featured_posts=featured_posts,
         post_url=post_url,
         get_image_url=get_image_url,  # Adicionar helper de imagens
+        get_image_srcset=get_image_srcset,
         config=config,
         site_configs=config,  # Adicionar alias para compatibilidade
         stats=stats,
@@ -1663,17 +4425,17 @@ def format_date_pt(date_value, format_string='%d de %B de %Y'):
 def home():
     try:
         page = request.args.get('page', 1, type=int)
-        posts_query = Post.query.filter_by(is_active=True).order_by(Post.date_posted.desc())
+        sort = request.args.get('sort', 'recent')
+        if sort == 'trending':
+            posts_query = trending_posts_query()
+        else:
+            posts_query = Post.query.filter_by(is_active=True).order_by(Post.date_posted.desc())
         posts_paginated = posts_query.paginate(page=page, per_page=6, error_out=False)
         posts = posts_paginated.items
         featured = Post.query.filter_by(featured=True).limit(4).all()
 
         # Lista de IDs de posts favoritados pelo usuário atual
-        favorite_post_ids = []
-        if current_user.is_authenticated:
-            # Forçar refresh da sessão para evitar cache
-            db.session.expire_all()
-            favorite_post_ids = [f.post_id for f in Favorite.query.filter_by(user_id=current_user.id).all()]
+        favorite_post_ids = get_favorite_post_ids()
 
         # Estatísticas reais para a página inicial
         stats = {
@@ -1683,7 +4445,7 @@ def home():
             'total_subscribers': Subscriber.query.filter_by(is_active=True).count()
         }
 
-        return render_template('index.html', posts=posts, posts_pagination=posts_paginated, featured=featured, stats=stats, favorite_post_ids=favorite_post_ids, title='Início')
+        return render_template('index.html', posts=posts, posts_pagination=posts_paginated, featured=featured, stats=stats, favorite_post_ids=favorite_post_ids, sort=sort, title='Início')
     except Exception as e:
         print(f"Erro ao acessar a página inicial: {e}")
         # Tentar inicializar o banco de dados novamente (já estamos no contexto da rota)
@@ -1736,19 +4498,21 @@ def all_categories():
 @app.route('/categoria/<string:category>')
 def category(category):
     page = request.args.get('page', 1, type=int)
+    sort = request.args.get('sort', 'recent')
     # Alterar category para category_str na consulta
-    posts = Post.query.filter_by(category_str=category).order_by(Post.date_posted.desc()).paginate(page=page, per_page=12)
+    if sort == 'trending':
+        posts = trending_posts_query(category).paginate(page=page, per_page=12)
+    else:
+        posts = Post.query.filter_by(category_str=category).order_by(Post.date_posted.desc()).paginate(page=page, per_page=12)
 
     # Obter subcategorias disponíveis - alterar category para category_str
     subcategories = db.session.query(Post.subcategory).filter(Post.category_str == category, Post.subcategory != None).distinct().all()
     subcategories = [subcategory[0] for subcategory in subcategories if subcategory[0]]
 
     # Obter IDs dos posts favoritados do usuário logado
-    favorite_post_ids = set()
-    if current_user.is_authenticated:
-        favorite_post_ids = {f.post_id for f in Favorite.query.filter_by(user_id=current_user.id).all()}
+    favorite_post_ids = get_favorite_post_ids()
 
-    return render_template('category.html', posts=posts, category=category, subcategories=subcategories, favorite_post_ids=favorite_post_ids, title=f'Categoria - {category}')
+    return render_template('category.html', posts=posts, category=category, subcategories=subcategories, favorite_post_ids=favorite_post_ids, sort=sort, title=f'Categoria - {category}')
 
 @app.route('/subcategoria/<string:subcategory>')
 def subcategory(subcategory):
@@ -1768,7 +4532,7 @@ def post(post_id):
 
     # Se não tiver slug, continuar com a rota antiga
     increment_post_views(post_id)
-    related_posts = Post.query.filter(Post.category_str == post.category_str, Post.id != post.id).order_by(Post.views.desc()).limit(3).all()
+    related_posts = get_related_posts(post)
     return render_template('post.html', post=post, related_posts=related_posts, title=post.title)
 
 @app.route('/<string:category>/<string:slug>')
@@ -1776,29 +4540,24 @@ def post_by_slug(category, slug):
     """Nova rota com URL amigável: /categoria/nome-do-post"""
     post = Post.query.filter_by(slug=slug).first_or_404()
 
-    # Incrementar visualizações
-    increment_post_views(post.id)
+    # Incrementar visualizações (em lote, também contadas em acessos servidos pelo cache)
+    record_post_view(post.id)
 
-    # Obter posts relacionados baseados na categoria
-    related_posts = Post.query.filter(
-        Post.category_str == post.category_str,
-        Post.id != post.id
-    ).order_by(Post.views.desc()).limit(3).all()
+    # Obter posts relacionados (pré-calculados por similaridade de conteúdo)
+    related_posts = get_related_posts(post)
 
-    # Obter comentários aprovados
-    comments = Comment.query.filter_by(
-        post_id=post.id,
-        is_approved=True
-    ).order_by(Comment.date_posted.desc()).all()
+    # Quem baixou este post também baixou
+    also_downloaded = get_co_download_recommendations(post.id)
+
+    # Comentários são carregados pela API paginada; aqui só o total
+    comment_count = count_approved_comments(post.id)
 
     # Obter IDs dos posts favoritos do usuário atual
-    favorite_post_ids = []
-    if current_user.is_authenticated:
-        favorites = Favorite.query.filter_by(user_id=current_user.id).all()
-        favorite_post_ids = [fav.post_id for fav in favorites]
+    favorite_post_ids = get_favorite_post_ids()
 
-    return render_template('post.html', post=post, related_posts=related_posts, comments=comments,
-                         favorite_post_ids=favorite_post_ids, title=post.title)
+    return render_template('post.html', post=post, related_posts=related_posts, comment_count=comment_count,
+                         favorite_post_ids=favorite_post_ids, also_downloaded=also_downloaded,
+                         title=post.title)
 
 def check_download_limit_legacy(user):
     """[DEPRECATED] Verifica se o usuário pode fazer download baseado no plano - Use check_user_download_limit()"""
@@ -1905,37 +4664,33 @@ def download_post(post_id):
             flash(message, 'warning')
             return redirect(url_for('post', post_id=post_id))
 
-    # Registrar download (isso incrementa o contador para próxima verificação)
-    new_download = Download(user_id=user.id, post_id=post.id, timestamp=datetime.utcnow())
-    db.session.add(new_download)
-
-    # Incrementar contador correto baseado no plano
-    if user.plan == 'premium':
-        user.weekly_downloads = (user.weekly_downloads or 0) + 1
-        debug_log(f"Download registrado para {user.username} - Total esta semana: {user.weekly_downloads}")
-    else:
-        user.daily_downloads = (user.daily_downloads or 0) + 1
-        debug_log(f"Download registrado para {user.username} - Total hoje: {user.daily_downloads}")
+    # Reservar o download na cota (UPDATE atômico) e registrar na mesma transação
+    if not consume_download_quota(user):
+        # Outra requisição simultânea usou o último download disponível
+        db.session.rollback()
+        message = "Você atingiu o limite de downloads do seu plano."
+        debug_log(f"Download negado para {user.username} (cota consumida em outra requisição)")
+        if request.headers.get('X-Requested-With') == 'XMLHttpRequest':
+            return jsonify({'success': False, 'message': message, 'can_download': False, 'remaining': 0,
+                            'limit': int(limit) if limit != float('inf') else 'unlimited'}), 403
+        flash(message, 'warning')
+        return redirect(url_for('post', post_id=post_id))
 
+    # Uma única transação: cota + evento no log de downloads + histórico. Os contadores do
+    # post, as estatísticas diárias e o registro de atividade são derivados do log
+    download = Download(
+        user_id=user.id,
+        post_id=post.id,
+        timestamp=datetime.utcnow(),
+        ip_address=request_client_ip(),
+        user_agent=request.headers.get('User-Agent', '')[:500]
+    )
+    db.session.add(download)
+    db.session.flush()
+    record_latest_download(download)
     db.session.commit()
-
-    # Incrementar downloads do post
-    increment_post_downloads(post_id)
-
-    # Log da atividade de download
-    try:
-        log_admin_activity(
-            user_id=current_user.id if current_user.is_authenticated else None,
-            action="file_downloaded",
-            description=f"Download do arquivo: {post.title}",
-            metadata={
-                'post_id': post_id,
-                'post_title': post.title,
-                'download_url': post.download_link
-            }
-        )
-    except Exception:
-        pass  # Não interromper o download se o log falhar
+    schedule_download_rollup()
+    debug_log(f"Download registrado para {user.username}")
 
     # Redirecionar para o link de download real
     if post.download_link:
@@ -1945,55 +4700,134 @@ def download_post(post_id):
         return redirect(url_for('post', post_id=post_id))
 
 
+# ====================
+# COMENTÁRIOS PAGINADOS
+# ====================
+COMMENTS_PAGE_SIZE = 20
+COMMENTS_MAX_PAGE_SIZE = 50
+COMMENTS_FIRST_PAGE_TTL = 300
+
+
+def encode_comment_cursor(comment):
+    """Cursor estável (date_posted, id) do último comentário de uma página"""
+    return f"{comment.date_posted:%Y%m%d%H%M%S%f}-{comment.id}"
+
+
+def decode_comment_cursor(cursor):
+    """Converte o cursor em (date_posted, id); retorna None se for inválido"""
+    try:
+        date_part, id_part = cursor.split('-', 1)
+        return datetime.strptime(date_part, '%Y%m%d%H%M%S%f'), int(id_part)
+    except (AttributeError, ValueError):
+        return None
+
+
+def serialize_comment(comment):
+    """Dados de um comentário para a API (o usuário já vem carregado pelo JOIN)"""
+    if comment.user_id and comment.user:
+        author_name = comment.user.username
+        profile_image = comment.user.profile_image
+    else:
+        author_name = comment.author_name
+        profile_image = None
+
+    data = {
+        'id': comment.id,
+        'author': author_name,
+        'content': comment.content,
+        'date': comment.date_posted.strftime('%d/%m/%Y %H:%M'),
+        'profile_image': profile_image,
+        'user_id': comment.user_id,
+        'is_edited': bool(comment.is_edited),
+        'cursor': encode_comment_cursor(comment),
+    }
+    if comment.is_edited and comment.date_edited:
+        data['date_edited'] = comment.date_edited.strftime('%d/%m/%Y %H:%M')
+    return data
+
+
+def count_approved_comments(post_id):
+    """Total de comentários aprovados sem carregar as linhas"""
+    return db.session.execute(
+        db.select(db.func.count(Comment.id)).where(Comment.post_id == post_id, Comment.is_approved == True)
+    ).scalar() or 0
+
+
+def fetch_comments_page(post_id, cursor=None, limit=COMMENTS_PAGE_SIZE):
+    """
+    Uma página de comentários aprovados, do mais novo para o mais antigo.
+
+    Returns:
+        tuple: (lista de comentários serializados, cursor da próxima página ou None)
+    """
+    from sqlalchemy.orm import joinedload
+
+    query = db.select(Comment).options(joinedload(Comment.user)).where(
+        Comment.post_id == post_id, Comment.is_approved == True
+    )
+    if cursor:
+        cursor_date, cursor_id = cursor
+        query = query.where(db.or_(
+            Comment.date_posted < cursor_date,
+            db.and_(Comment.date_posted == cursor_date, Comment.id < cursor_id)
+        ))
+    query = query.order_by(Comment.date_posted.desc(), Comment.id.desc()).limit(limit + 1)
+
+    comments = db.session.execute(query).scalars().all()
+    next_cursor = encode_comment_cursor(comments[limit - 1]) if len(comments) > limit else None
+    return [serialize_comment(comment) for comment in comments[:limit]], next_cursor
+
+
+def comments_first_page_key(post_id):
+    # A versão 'comment' muda com qualquer comentário e com o nome/foto dos autores
+    return f"comments:first:{post_id}:{get_content_versions().get('comment', 0)}"
+
+
+def get_comments_first_page(post_id):
+    """Primeira página + total de comentários, em cache até a versão 'comment' mudar"""
+    key = comments_first_page_key(post_id)
+    data = page_cache.get(key)
+    if data is None:
+        comments, next_cursor = fetch_comments_page(post_id)
+        data = {'comments': comments, 'next_cursor': next_cursor, 'count': count_approved_comments(post_id)}
+        page_cache.set(key, data, timeout=COMMENTS_FIRST_PAGE_TTL)
+    return data
+
+
 # ====================
 # ROTAS DE COMENTÁRIOS
 # ====================
 
 @app.route('/<string:category>/<string:slug>/comments', methods=['GET'])
+@conditional_view(post_comments_validator)
 def get_post_comments_by_slug(category, slug):
-    """Retorna os comentários aprovados de um post específico usando slug"""
+    """
+    Retorna os comentários aprovados de um post específico usando slug,
+    paginados por cursor (?cursor=<next_cursor>&limit=N)
+    """
     try:
         # Buscar post pelo slug
-        post = Post.query.filter_by(slug=slug).first_or_404()
-
-        # Buscar apenas comentários aprovados
-        comments = Comment.query.filter_by(
-            post_id=post.id,
-            is_approved=True
-        ).order_by(Comment.date_posted.desc()).all()
-
-        comments_list = []
-        for comment in comments:
-            # Determinar o nome do autor e foto de perfil
-            if comment.user_id:
-                author_name = comment.user.username
-                profile_image = comment.user.profile_image if hasattr(comment.user, 'profile_image') else None
-                user_id = comment.user_id
-            else:
-                author_name = comment.author_name
-                profile_image = None
-                user_id = None
-
-            comment_data = {
-                'id': comment.id,
-                'author': author_name,
-                'content': comment.content,
-                'date': comment.date_posted.strftime('%d/%m/%Y %H:%M'),
-                'profile_image': profile_image,
-                'user_id': user_id,
-                'is_edited': comment.is_edited if hasattr(comment, 'is_edited') else False
-            }
+        post_id = db.session.execute(db.select(Post.id).where(Post.slug == slug)).scalar()
+        if post_id is None:
+            return jsonify({'success': False, 'message': 'Post não encontrado'}), 404
 
-            # Adicionar data de edição se foi editado
-            if comment.is_edited and hasattr(comment, 'date_edited') and comment.date_edited:
-                comment_data['date_edited'] = comment.date_edited.strftime('%d/%m/%Y %H:%M')
+        cursor = request.args.get('cursor')
+        limit = min(max(request.args.get('limit', COMMENTS_PAGE_SIZE, type=int), 1), COMMENTS_MAX_PAGE_SIZE)
 
-            comments_list.append(comment_data)
+        if not cursor and limit == COMMENTS_PAGE_SIZE:
+            data = get_comments_first_page(post_id)
+        else:
+            decoded = decode_comment_cursor(cursor) if cursor else None
+            if cursor and decoded is None:
+                return jsonify({'success': False, 'message': 'Cursor inválido'}), 400
+            comments, next_cursor = fetch_comments_page(post_id, decoded, limit)
+            data = {'comments': comments, 'next_cursor': next_cursor, 'count': count_approved_comments(post_id)}
 
         return jsonify({
             'success': True,
-            'comments': comments_list,
-            'count': len(comments_list)
+            'comments': data['comments'],
+            'count': data['count'],
+            'next_cursor': data['next_cursor']
         })
 
     except Exception as e:
@@ -2558,6 +5392,7 @@ def create_checkout_session():
             debug_log(f'Stripe Checkout - Plano inválido: {plan_type}')
             return jsonify({'error': 'Plano inválido'}), 400
 
+        stripe = get_stripe()
         checkout_session = stripe.checkout.Session.create(
             line_items=[
                 {
@@ -2589,6 +5424,7 @@ def checkout_success():
 
     try:
         # Retrieve the session from Stripe
+        stripe = get_stripe()
         session = stripe.checkout.Session.retrieve(session_id)
 
         # Verificar se já existe uma transação registrada para esta sessão
@@ -2918,6 +5754,7 @@ def cancel_pix_transaction(billing_id):
 
 
 @app.route('/check-pix-payment/<billing_id>')
+@limiter.limit(POLLING_LIMIT)  # Consultado a cada 5-10s pelo checkout PIX
 @login_required
 def check_pix_payment(billing_id):
     """
@@ -2969,6 +5806,7 @@ def stripe_webhook():
     payload = request.data
     sig_header = request.headers.get('Stripe-Signature')
     webhook_secret = os.environ.get('STRIPE_WEBHOOK_SECRET')
+    stripe = get_stripe()
 
     if not webhook_secret:
         debug_log('AVISO: STRIPE_WEBHOOK_SECRET não configurado! Webhook não pode verificar assinatura.')
@@ -3020,7 +5858,7 @@ def stripe_webhook():
         debug_log(f'Erro no payload do webhook: {str(e)}')
         return jsonify({'error': 'Invalid payload'}), 400
 
-    except SignatureVerificationError as e:
+    except stripe.SignatureVerificationError as e:
         # Assinatura inválida
         debug_log(f'Erro na verificação da assinatura: {str(e)}')
         return jsonify({'error': 'Invalid signature'}), 400
@@ -3266,6 +6104,7 @@ def debug_check_limits():
 
     # Verificar favoritos
     favorites_count = Favorite.query.filter_by(user_id=user.id).count()
+    download_limit = check_user_download_limit(user)
 
     debug_info = {
         'user': {
@@ -3276,9 +6115,9 @@ def debug_check_limits():
         'downloads': {
             'today': downloads_today,
             'this_week': downloads_week,
-            'can_download': check_user_download_limit(user)[0],
-            'remaining': check_user_download_limit(user)[1],
-            'limit': check_user_download_limit(user)[2]
+            'can_download': download_limit[0],
+            'remaining': download_limit[1],
+            'limit': download_limit[2]
         },
         'comments': {
             'today': comments_today,
@@ -3409,18 +6248,36 @@ def posts():
     )
 
     # Lista de IDs de posts favoritados pelo usuário atual
-    favorite_post_ids = []
-    if current_user.is_authenticated:
-        # Forçar refresh da sessão para evitar cache
-        db.session.expire_all()
-        favorite_post_ids = [f.post_id for f in Favorite.query.filter_by(user_id=current_user.id).all()]
-        debug_log(f"POSTS Usuário {current_user.id} tem {len(favorite_post_ids)} favoritos: {favorite_post_ids}")
+    favorite_post_ids = get_favorite_post_ids()
 
     return render_template('posts.html', posts=posts, favorite_post_ids=favorite_post_ids, title='Todos os Posts')
 
 @app.route('/api/posts')
+@conditional_view(api_posts_validator)
 def api_posts():
-    posts = Post.query.order_by(Post.date_posted.desc()).limit(10).all()
+    sort = request.args.get('sort', 'recent')
+    limit = min(max(request.args.get('limit', 10, type=int), 1), 50)
+    category = request.args.get('category')
+
+    if sort == 'trending':
+        rows = db.session.query(Post, PostTrending.score).outerjoin(
+            PostTrending, PostTrending.post_id == Post.id
+        ).filter(Post.is_active == True)
+        if category:
+            rows = rows.filter(Post.category_str == category)
+        rows = rows.order_by(db.func.coalesce(PostTrending.score, 0).desc(), Post.id.desc()).limit(limit).all()
+
+        result = []
+        for post, score in rows:
+            data = post.to_dict()
+            data['trending_score'] = round(trending_score_now(score), 2)
+            result.append(data)
+        return jsonify(result)
+
+    query = Post.query
+    if category:
+        query = query.filter(Post.category_str == category)
+    posts = query.order_by(Post.date_posted.desc()).limit(limit).all()
     return jsonify([post.to_dict() for post in posts])
 
 @app.route('/api/debug/posts')
@@ -3452,11 +6309,13 @@ def api_debug_posts():
 
 
 @app.route('/api/posts/<int:post_id>')
+@conditional_view(api_post_validator)
 def api_post(post_id):
     post = Post.query.get_or_404(post_id)
     return jsonify(post.to_dict())
 
 @app.route('/api/search/suggestions')
+@limiter.limit(TYPEAHEAD_LIMIT)  # Chamado enquanto o usuário digita
 def search_suggestions():
     query = request.args.get('q', '').strip()
     category = request.args.get('category', '').strip()
@@ -3786,6 +6645,7 @@ def admin_update_post(post_id):
         post.image_url = image_url if image_url else 'default.jpg'
         post.featured = featured
         post.is_active = is_active
+        post.date_updated = datetime.utcnow()
 
         db.session.commit()
 
@@ -3983,6 +6843,7 @@ def login():
             return redirect(url_for('login'))
 
         # Sanitizar input de username/email
+        import bleach
         username_email = bleach.clean(username_email, tags=[], strip=True)
 
         # Limitar tamanho do input
@@ -4028,6 +6889,7 @@ def login():
         # Atualizar a data do último login e dados de rastreamento
         user.last_login = datetime.utcnow()
         # Capturar dados de rastreamento (sanitizado) e parseado corretamente
+        from user_agents import parse as parse_ua
         user_agent = parse_ua(request.user_agent.string)
         user.ip_address = request.remote_addr or 'unknown'
         user.browser = f"{user_agent.browser.family} {user_agent.browser.version_string}"
@@ -5094,10 +7956,12 @@ def admin_analytics():
      .filter_by(is_active=True)\
      .group_by(Category.name).all()
 
-    # Posts mais populares (últimos 30 dias)
-    popular_posts = Post.query.filter_by(is_active=True)\
-                             .order_by(Post.views.desc())\
-                             .limit(5).all()
+    # Posts mais populares (em alta, com decaimento no tempo)
+    popular_posts = trending_posts_query().limit(5).all()
+    if not popular_posts:
+        popular_posts = Post.query.filter_by(is_active=True)\
+                                 .order_by(Post.views.desc())\
+                                 .limit(5).all()
 
     # Origem de tráfego baseada em referrers
     traffic_sources = db.session.query(
@@ -6603,6 +9467,394 @@ def admin_tools_import():
                          title="Importar Dados",
                          **sidebar_stats)
 
+
+# ==========================================
+# IMPORTAÇÃO EM MASSA DE POSTS
+# ==========================================
+IMPORT_CHUNK_SIZE = 1000
+IMPORT_MAX_BYTES = 50 * 1024 * 1024  # Limite próprio da importação (o global é 5MB)
+IMPORT_IMAGE_WORKERS = 8
+POST_IMPORT_FIELDS = ('title', 'content', 'slug', 'category', 'download_link', 'tags', 'status',
+                      'author', 'date_posted', 'featured_image', 'featured', 'seo_title', 'seo_description')
+
+
+def iter_import_rows(stream, file_format):
+    """
+    Lê um arquivo de importação linha a linha.
+
+    CSV e JSON Lines são lidos em streaming; JSON comum precisa ser carregado
+    inteiro (lista de objetos ou {"posts": [...]}).
+    """
+    import csv
+    import io
+
+    text_stream = io.TextIOWrapper(stream, encoding='utf-8-sig', newline='')
+    if file_format == 'csv':
+        yield from csv.DictReader(text_stream)
+    elif file_format == 'jsonl':
+        for line in text_stream:
+            if line.strip():
+                yield json.loads(line)
+    elif file_format == 'json':
+        data = json.load(text_stream)
+        if isinstance(data, dict):
+            data = data.get('posts', [])
+        yield from data
+    else:
+        raise ValueError(f'Formato não suportado: {file_format}')
+
+
+def chunked(iterable, size):
+    """Agrupa um iterável em listas de até `size` itens"""
+    chunk = []
+    for item in iterable:
+        chunk.append(item)
+        if len(chunk) >= size:
+            yield chunk
+            chunk = []
+    if chunk:
+        yield chunk
+
+
+def fetch_import_image(image_url):
+    """
+    Baixa uma imagem externa, converte para WebP e salva em static/images/posts.
+    Executado em threads; não acessa o banco.
+
+    Returns:
+        tuple: (caminho salvo ou None, mensagem de erro ou None)
+    """
+    import requests
+    from io import BytesIO
+    from PIL import Image, ImageOps
+
+    try:
+        response = requests.get(image_url, timeout=15)
+        response.raise_for_status()
+        data = response.content
+
+        # Nome pelo hash do conteúdo: a mesma imagem em vários posts vira um só arquivo
+        filename = f"{hashlib.sha256(data).hexdigest()[:32]}.webp"
+        target_dir = os.path.join(app.static_folder, 'images', 'posts')
+        target_path = os.path.join(target_dir, filename)
+
+        if not os.path.exists(target_path):
+            img = Image.open(BytesIO(data))
+            img = ImageOps.exif_transpose(img)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGB')
+            img.thumbnail((1200, 1200), Image.Resampling.LANCZOS)
+
+            os.makedirs(target_dir, exist_ok=True)
+            tmp_path = f"{target_path}.{threading.get_ident()}.tmp"
+            img.save(tmp_path, 'WEBP', quality=82, method=4)
+            os.replace(tmp_path, target_path)
+
+        return f'posts/{filename}', None
+    except Exception as e:
+        return None, str(e)
+
+
+class PostImporter:
+    """
+    Motor de importação em massa de posts.
+
+    Os dados de apoio (slugs existentes, categorias e autores) são carregados
+    uma única vez; cada lote é validado em memória e gravado com executemany.
+    """
+
+    def __init__(self, mapping=None, defaults=None, duplicate_action='skip', ignore_errors=True,
+                 fetch_images=False, author_id=None, chunk_size=IMPORT_CHUNK_SIZE):
+        self.mapping = {field: column for field, column in (mapping or {}).items() if column}
+        self.defaults = {field: value for field, value in (defaults or {}).items() if value not in (None, '')}
+        self.duplicate_action = duplicate_action
+        self.ignore_errors = ignore_errors
+        self.fetch_images = fetch_images
+        self.author_id = author_id
+        self.chunk_size = chunk_size
+        self.totals = {'processed': 0, 'imported': 0, 'updated': 0, 'skipped': 0, 'errors': 0}
+
+        # Slugs já usados (lidos em streaming, só a coluna)
+        self.slugs = set()
+        for (slug,) in db.session.execute(db.select(Post.slug).execution_options(yield_per=5000)):
+            if slug:
+                self.slugs.add(slug)
+
+        # Categoria por nome, slug ou id
+        self.categories = {}
+        for category_id, name, slug in db.session.execute(db.select(Category.id, Category.name, Category.slug)):
+            self.categories[str(category_id)] = category_id
+            self.categories[name.strip().lower()] = category_id
+            if slug:
+                self.categories[slug.lower()] = category_id
+
+        # Autor por username ou email
+        self.authors = {}
+        for user_id, username, email in db.session.execute(
+                db.select(User.id, User.username, User.email).where(User.role.in_(['admin', 'editor']))):
+            self.authors[username.lower()] = user_id
+            self.authors[email.lower()] = user_id
+
+    def value(self, row, field):
+        """Valor de um campo do sistema segundo o mapeamento (ou o valor padrão)"""
+        column = self.mapping.get(field, field)
+        value = row.get(column)
+        if isinstance(value, str):
+            value = value.strip()
+        if value in (None, ''):
+            value = self.defaults.get(field)
+        return value
+
+    @staticmethod
+    def parse_bool(value, default=False):
+        if value in (None, ''):
+            return default
+        return str(value).strip().lower() in ('1', 'true', 'sim', 'yes', 'on', 'active', 'ativo', 'publicado', 'published')
+
+    @staticmethod
+    def parse_date(value):
+        if not value:
+            return None
+        from dateutil import parser as date_parser
+        return date_parser.parse(str(value))
+
+    def allocate_slug(self, base_slug):
+        """Reserva um slug único usando o conjunto em memória"""
+        base_slug = base_slug or 'post'
+        slug = base_slug
+        counter = 1
+        while slug in self.slugs:
+            slug = f"{base_slug}-{counter}"
+            counter += 1
+        self.slugs.add(slug)
+        return slug
+
+    def validate_row(self, row):
+        """
+        Converte uma linha do arquivo em valores de Post.
+
+        Returns:
+            tuple: (dict de colunas ou None, mensagem de erro ou None)
+        """
+        if not isinstance(row, dict):
+            return None, 'Registro inválido'
+
+        title = self.value(row, 'title')
+        content = self.value(row, 'content')
+        download_link = self.value(row, 'download_link')
+        category_value = self.value(row, 'category')
+
+        if not title:
+            return None, 'O título é obrigatório'
+        if not content:
+            return None, 'O conteúdo é obrigatório'
+        if not download_link:
+            return None, 'O link de download é obrigatório'
+        if len(title) > 100:
+            return None, 'O título deve ter no máximo 100 caracteres'
+
+        category_id = self.categories.get(str(category_value).strip().lower()) if category_value else None
+        if not category_id:
+            return None, f'Categoria não encontrada: {category_value or "(vazia)"}'
+
+        try:
+            date_posted = self.parse_date(self.value(row, 'date_posted'))
+        except (ValueError, OverflowError):
+            return None, f'Data inválida: {self.value(row, "date_posted")}'
+
+        author = self.value(row, 'author')
+        status = self.value(row, 'status')
+        values = {
+            'title': title,
+            'content': content,
+            'download_link': download_link[:200],
+            'category_id': category_id,
+            'tags': (self.value(row, 'tags') or None),
+            'seo_title': (self.value(row, 'seo_title') or None),
+            'seo_description': (self.value(row, 'seo_description') or None),
+            'image_url': self.value(row, 'featured_image') or 'post-placeholder.svg',
+            'is_active': self.parse_bool(status, default=True),
+            'featured': self.parse_bool(self.value(row, 'featured')),
+            'author_id': self.authors.get(str(author).lower(), self.author_id) if author else self.author_id,
+            'views': 0,
+            'downloads': 0,
+            'date_posted': date_posted or datetime.utcnow(),
+        }
+        values['slug'] = generate_slug(self.value(row, 'slug') or title)
+        return values, None
+
+    def resolve_images(self, records):
+        """Baixa em paralelo as imagens externas dos registros válidos"""
+        from concurrent.futures import ThreadPoolExecutor
+
+        pending = {}
+        for record in records:
+            image_url = record['image_url']
+            if image_url.startswith(('http://', 'https://')) and 'cloudinary.com' not in image_url:
+                pending.setdefault(image_url, []).append(record)
+
+        errors = []
+        if not pending:
+            return errors
+
+        with ThreadPoolExecutor(max_workers=IMPORT_IMAGE_WORKERS) as executor:
+            for image_url, (path, error) in zip(pending, executor.map(fetch_import_image, pending)):
+                for record in pending[image_url]:
+                    if path:
+                        record['image_url'] = path
+                    else:
+                        record['image_url'] = 'post-placeholder.svg'
+                if error:
+                    errors.append(f'Imagem {image_url}: {error}')
+        return errors
+
+    def import_chunk(self, rows, first_line):
+        """Valida e grava um lote de linhas, retornando o relatório do lote"""
+        report = {'first_line': first_line, 'processed': len(rows), 'imported': 0,
+                  'updated': 0, 'skipped': 0, 'errors': [], 'warnings': []}
+        inserts, updates = [], []
+
+        for offset, row in enumerate(rows):
+            line = first_line + offset
+            try:
+                record, error = self.validate_row(row)
+            except Exception as e:
+                record, error = None, str(e)
+            if error:
+                report['errors'].append({'line': line, 'message': error})
+                continue
+
+            if record['slug'] in self.slugs:
+                if self.duplicate_action == 'skip':
+                    report['skipped'] += 1
+                    continue
+                if self.duplicate_action == 'overwrite':
+                    updates.append(record)
+                    continue
+            record['slug'] = self.allocate_slug(record['slug'])
+            inserts.append(record)
+
+        if report['errors'] and not self.ignore_errors:
+            report['aborted'] = True
+            return report
+
+        if self.fetch_images:
+            report['warnings'].extend(self.resolve_images(inserts + updates))
+
+        try:
+            if inserts:
+                db.session.execute(db.insert(Post), inserts)
+            if updates:
+                from sqlalchemy import bindparam
+                posts_table = Post.__table__
+                update_columns = [column for column in updates[0] if column not in ('slug', 'views', 'downloads', 'date_posted')]
+                statement = posts_table.update().where(posts_table.c.slug == bindparam('b_slug')).values(
+                    {column: bindparam(f'b_{column}') for column in update_columns}
+                )
+                db.session.execute(statement, [
+                    {f'b_{column}': record.get(column) for column in update_columns + ['slug']}
+                    for record in updates
+                ])
+            if inserts or updates:
+                # Inserções em lote não passam pelo flush do ORM: invalidar o cache de páginas aqui
+                db.session.execute(_content_version_statement(), [{'name': 'post'}])
+            db.session.commit()
+            report['imported'] = len(inserts)
+            report['updated'] = len(updates)
+        except Exception as e:
+            db.session.rollback()
+            # Liberar os slugs reservados neste lote
+            for record in inserts:
+                self.slugs.discard(record['slug'])
+            report['errors'].append({'line': first_line, 'message': f'Erro ao gravar lote: {e}'})
+            report['aborted'] = not self.ignore_errors
+
+        return report
+
+    def run(self, rows):
+        """Processa todas as linhas, gerando um relatório por lote"""
+        line = 1
+        for chunk_number, rows_chunk in enumerate(chunked(rows, self.chunk_size), start=1):
+            report = self.import_chunk(rows_chunk, line)
+            report['chunk'] = chunk_number
+            line += len(rows_chunk)
+
+            self.totals['processed'] += report['processed']
+            self.totals['imported'] += report['imported']
+            self.totals['updated'] += report['updated']
+            self.totals['skipped'] += report['skipped']
+            self.totals['errors'] += len(report['errors'])
+            report['totals'] = dict(self.totals)
+            yield report
+
+            if report.get('aborted'):
+                break
+
+
+@app.route("/admin/tools/import/posts", methods=['POST'])
+@login_required
+@admin_required
+def admin_tools_import_posts():
+    """
+    Importa posts de um arquivo CSV, JSON ou JSON Lines.
+
+    A resposta é um stream NDJSON com uma linha por lote processado,
+    para que a página acompanhe o progresso.
+    """
+    request.max_content_length = IMPORT_MAX_BYTES
+
+    file = request.files.get('file')
+    if not file or not file.filename:
+        return jsonify({'success': False, 'message': 'Nenhum arquivo enviado'}), 400
+
+    file_format = file.filename.rsplit('.', 1)[-1].lower() if '.' in file.filename else ''
+    if file_format not in ('csv', 'json', 'jsonl'):
+        return jsonify({'success': False, 'message': 'Formato não suportado. Use CSV, JSON ou JSON Lines.'}), 400
+
+    try:
+        mapping = json.loads(request.form.get('mapping') or '{}')
+        defaults = json.loads(request.form.get('defaults') or '{}')
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Mapeamento inválido'}), 400
+
+    importer = PostImporter(
+        mapping={field: mapping.get(field) for field in POST_IMPORT_FIELDS},
+        defaults={field: defaults.get(field) for field in POST_IMPORT_FIELDS},
+        duplicate_action=request.form.get('duplicate_action', 'skip'),
+        ignore_errors=request.form.get('ignore_errors') == 'true',
+        fetch_images=request.form.get('fetch_images') == 'true',
+        author_id=current_user.id
+    )
+    user_id = current_user.id
+    filename = file.filename
+
+    # O upload é fechado ao fim da view; copiar para um arquivo temporário lido pelo stream
+    import tempfile
+    upload_copy = tempfile.TemporaryFile()
+    shutil.copyfileobj(file.stream, upload_copy)
+    upload_copy.seek(0)
+
+    def generate():
+        started = time.perf_counter()
+        try:
+            for report in importer.run(iter_import_rows(upload_copy, file_format)):
+                yield json.dumps(report, default=str) + '\n'
+        except Exception as e:
+            db.session.rollback()
+            yield json.dumps({'fatal': True, 'message': f'Erro ao ler o arquivo: {e}'}) + '\n'
+        finally:
+            upload_copy.close()
+
+        elapsed = time.perf_counter() - started
+        totals = importer.totals
+        log_admin_activity(user_id, 'import_posts',
+                           f"Importação de posts: {totals['imported']} importados, {totals['updated']} atualizados, "
+                           f"{totals['skipped']} pulados, {totals['errors']} erros",
+                           {**totals, 'file': filename, 'seconds': round(elapsed, 2)})
+        yield json.dumps({'done': True, 'totals': totals, 'seconds': round(elapsed, 2)}) + '\n'
+
+    return app.response_class(stream_with_context(generate()), mimetype='application/x-ndjson')
+
 @app.route("/admin/settings")
 @login_required
 @admin_required
@@ -6691,60 +9943,26 @@ def profile(user_id=None):
     user_comments = Comment.query.filter_by(user_id=user.id).count() if hasattr(user, 'id') else 0
     category_count = Category.query.filter_by(is_active=True).count()  # noqa: F841
 
-    # Buscar favoritos do usuário
+    # Buscar a primeira página de favoritos do usuário (o resto vem da API sob demanda)
     favorite_posts = []
+    favorites_total = 0
+    favorites_next_cursor = None
     if hasattr(user, 'id') and current_user.is_authenticated and current_user.id == user.id:
-        favorites = Favorite.query.filter_by(user_id=user.id).order_by(Favorite.date_added.desc()).all()
-        favorite_posts = [fav.post for fav in favorites if fav.post and fav.post.is_active]
+        favorite_posts, favorites_next_cursor = fetch_favorites_page(user.id)
+        favorites_total = count_user_favorites(user.id) if favorites_next_cursor else len(favorite_posts)
 
     # Buscar histórico de downloads baseado no plano
     download_history = []
     if hasattr(user, 'id') and current_user.is_authenticated and current_user.id == user.id:
         has_access, limit = check_download_history_access(user)
         if has_access:
-            # Buscar apenas o download mais recente de cada post (evita duplicatas)
-            from sqlalchemy import func
-
-            # Subquery para pegar o ID do download mais recente de cada post
-            subquery = db.session.query(
-                Download.post_id,
-                func.max(Download.timestamp).label('max_timestamp')
-            ).filter(
-                Download.user_id == user.id
-            ).group_by(Download.post_id).subquery()
-
-            # Query principal juntando com a subquery
-            query = db.session.query(Download).join(
-                subquery,
-                db.and_(
-                    Download.post_id == subquery.c.post_id,
-                    Download.timestamp == subquery.c.max_timestamp
-                )
-            ).filter(Download.user_id == user.id).order_by(Download.timestamp.desc())
+            # Premium: últimos 5 downloads únicos; VIP: todos
+            download_history = fetch_download_history(user.id, limit)
 
-            if limit:
-                # Premium: últimos 5 downloads únicos
-                downloads = query.limit(limit).all()
-            else:
-                # VIP: todos os downloads únicos
-                downloads = query.all()
-
-            # Carregar posts e categorias para cada download
-            brasilia_tz = pytz.timezone('America/Sao_Paulo')
-            for download in downloads:
-                if download.post:
-                    # Carregar a categoria se não estiver carregada
-                    if download.post.category_id and not hasattr(download.post, '_category_cache'):
-                        # type: ignore - atributo dinâmico para cache de categoria
-                        setattr(download.post, '_category_cache', Category.query.get(download.post.category_id))
-
-                    # Converter timestamp para timezone de Brasília
-                    if download.timestamp:
-                        utc_time = pytz.utc.localize(download.timestamp)
-                        # type: ignore - atributo dinâmico para timestamp em Brasília
-                        setattr(download, '_brasilia_time', utc_time.astimezone(brasilia_tz))
-
-            download_history = downloads
+    # Recomendações com base nos downloads do próprio usuário
+    recommended_posts = []
+    if hasattr(user, 'id') and current_user.is_authenticated and current_user.id == user.id:
+        recommended_posts = get_user_recommendations(user.id)
 
     # Calcular dias como membro
     days_as_member = 0
@@ -6760,42 +9978,35 @@ def profile(user_id=None):
                          category_count=category_count,
                          days_as_member=days_as_member,
                          favorite_posts=favorite_posts,
-                         download_history=download_history)
+                         favorites_total=favorites_total,
+                         favorites_next_cursor=favorites_next_cursor,
+                         download_history=download_history,
+                         recommended_posts=recommended_posts)
 
 # Rota para obter favoritos do usuário (API JSON)
 @app.route('/api/user-favorites', methods=['GET'])
 @login_required
 def get_user_favorites_api():
-    """Retorna os favoritos do usuário em JSON para atualização em tempo real"""
+    """
+    Retorna os favoritos do usuário em JSON para atualização em tempo real,
+    paginados por cursor (?cursor=<next_cursor>&limit=N)
+    """
     try:
         user = current_user
 
-        # Buscar favoritos do usuário
-        favorites = Favorite.query.filter_by(user_id=user.id).order_by(Favorite.date_added.desc()).all()
-
-        posts_data = []
-        for favorite in favorites[:6]:  # Limitar a 6 posts para a página de perfil
-            post = Post.query.get(favorite.post_id)
-            if post and post.is_active:
-                posts_data.append({
-                    'id': post.id,
-                    'title': post.title,
-                    'slug': post.slug,
-                    'content': post.content,
-                    'image_url': post.image_url,
-                    'category_str': post.category_str or 'Geral',
-                    'category_slug': Category.query.get(post.category_id).slug if post.category_id else None,
-                    'download_link': post.download_link,
-                    'date_posted': post.date_posted.strftime('%d/%m/%Y') if post.date_posted else '',
-                    'views': post.views or 0,
-                    'downloads': post.downloads or 0,
-                    'featured': post.featured or False
-                })
+        cursor = request.args.get('cursor')
+        decoded = decode_favorite_cursor(cursor) if cursor else None
+        if cursor and decoded is None:
+            return jsonify({'success': False, 'message': 'Cursor inválido'}), 400
+        limit = min(max(request.args.get('limit', FAVORITES_PAGE_SIZE, type=int), 1), FAVORITES_MAX_PAGE_SIZE)
+
+        rows, next_cursor = fetch_favorites_page(user.id, decoded, limit)
 
         return jsonify({
             'success': True,
-            'posts': posts_data,
-            'total': len(favorites)
+            'posts': [serialize_favorite_row(row) for row in rows],
+            'total': count_user_favorites(user.id),
+            'next_cursor': next_cursor
         })
     except Exception as e:
         print(f"[ERRO] Ao buscar favoritos: {str(e)}")
@@ -6815,52 +10026,7 @@ def get_download_history_api():
         if not has_access:
             return jsonify({'success': False, 'message': 'Acesso negado'}), 403
 
-        from sqlalchemy import func
-
-        # Subquery para pegar o ID do download mais recente de cada post
-        subquery = db.session.query(
-            Download.post_id,
-            func.max(Download.timestamp).label('max_timestamp')
-        ).filter(
-            Download.user_id == user.id
-        ).group_by(Download.post_id).subquery()
-
-        # Query principal
-        query = db.session.query(Download).join(
-            subquery,
-            db.and_(
-                Download.post_id == subquery.c.post_id,
-                Download.timestamp == subquery.c.max_timestamp
-            )
-        ).filter(Download.user_id == user.id).order_by(Download.timestamp.desc())
-
-        if limit:
-            downloads = query.limit(limit).all()
-        else:
-            downloads = query.all()
-
-        # Converter para JSON
-        brasilia_tz = pytz.timezone('America/Sao_Paulo')
-        downloads_data = []
-
-        for download in downloads:
-            if download.post:
-                category = Category.query.get(download.post.category_id) if download.post.category_id else None
-
-                # Converter timestamp
-                utc_time = pytz.utc.localize(download.timestamp)
-                brasilia_time = utc_time.astimezone(brasilia_tz)
-
-                downloads_data.append({
-                    'id': download.id,
-                    'post_id': download.post.id,
-                    'post_title': download.post.title,
-                    'post_slug': download.post.slug,
-                    'post_image': download.post.image_url,
-                    'category_name': category.name if category else None,
-                    'category_slug': category.slug if category else None,
-                    'timestamp': brasilia_time.strftime('%d/%m/%Y às %H:%M')
-                })
+        downloads_data = fetch_download_history(user.id, limit)
 
         return jsonify({'success': True, 'downloads': downloads_data})
     except Exception as e:
@@ -6872,8 +10038,8 @@ def get_download_history_api():
 def clear_download_history():
     """Limpa o histórico de downloads do usuário"""
     try:
-        # Deletar todos os downloads do usuário
-        Download.query.filter_by(user_id=current_user.id).delete()
+        # O log de downloads é mantido (contadores e recomendações); só o histórico é limpo
+        UserDownloadLatest.query.filter_by(user_id=current_user.id).delete()
         db.session.commit()
         return jsonify({'success': True, 'message': 'Histórico limpo com sucesso!'})
     except Exception as e:
@@ -6886,7 +10052,7 @@ def clear_download_history():
 def remove_download(download_id):
     """Remove um download específico do histórico"""
     try:
-        download = Download.query.filter_by(id=download_id, user_id=current_user.id).first()
+        download = UserDownloadLatest.query.filter_by(last_download_id=download_id, user_id=current_user.id).first()
         if not download:
             return jsonify({'success': False, 'message': 'Download não encontrado'}), 404
 
@@ -6905,15 +10071,26 @@ def clear_all_favorites():
     try:
         # Deletar todos os favoritos do usuário
         Favorite.query.filter_by(user_id=current_user.id).delete()
+        bump_favorites_version(current_user.id)
         db.session.commit()
         return jsonify({'success': True, 'message': 'Todos os favoritos foram removidos!'})
     except Exception as e:
         db.session.rollback()
         return jsonify({'success': False, 'message': f'Erro ao limpar favoritos: {str(e)}'}), 500
 
+def download_limit_validator():
+    """ETag de /check-download-limit a partir do current_user já carregado (sem consultas)"""
+    user = current_user
+    state = (user.id, user.plan, user.role, user.can_download, user.daily_downloads, user.download_reset_date,
+             user.weekly_downloads, user.week_reset_date, user.custom_daily_limit, user.custom_weekly_limit,
+             quota_windows.resets()[0])
+    return state, None
+
 # Rota para verificar limite de downloads
 @app.route('/check-download-limit', methods=['GET'])
+@limiter.limit(POLLING_LIMIT)  # Consultado antes de cada download
 @login_required
+@conditional_view(download_limit_validator)
 def check_download_limit_route():
     """Verifica se o usuário pode fazer download"""
     can_download, remaining, limit, reset_time, period = check_user_download_limit(current_user)
@@ -6978,6 +10155,7 @@ def validate_image_file(file):
         return False, 'O arquivo está vazio.'
 
     # Validar que é realmente uma imagem usando Pillow
+    from PIL import Image
     try:
         img = Image.open(file)
         img.verify()  # Verifica se é uma imagem válida
@@ -7000,10 +10178,182 @@ def validate_image_file(file):
 
     return True, None
 
+# ==========================================
+# DEDUPLICAÇÃO DE IMAGENS ENVIADAS
+# ==========================================
+PHASH_MAX_DISTANCE = 3  # Bits diferentes tolerados para considerar quase-duplicata
+
+
+def compute_perceptual_hash(img):
+    """Calcula o dHash (64 bits) de uma imagem do Pillow"""
+    from PIL import Image
+    gray = img.convert('L').resize((9, 8), Image.Resampling.LANCZOS)
+    pixels = list(gray.getdata())
+    value = 0
+    for row in range(8):
+        for col in range(8):
+            left = pixels[row * 9 + col]
+            right = pixels[row * 9 + col + 1]
+            value = (value << 1) | (1 if left > right else 0)
+    return value
+
+
+def phash_bands(value):
+    """Divide o dHash em 4 faixas de 16 bits"""
+    return [(value >> shift) & 0xFFFF for shift in (48, 32, 16, 0)]
+
+
+def find_registered_image(content_hash, folder='profiles'):
+    """
+    Procura uma imagem já enviada com exatamente o mesmo conteúdo.
+
+    Returns:
+        ImageAsset ou None
+    """
+    return ImageAsset.query.filter_by(content_hash=content_hash, folder=folder).first()
+
+
+def find_similar_images(perceptual_hash, folder='profiles', limit=5):
+    """
+    Procura imagens quase idênticas (dHash a até PHASH_MAX_DISTANCE bits).
+    Serve só para relatório: recortes e reencodes diferentes não são reaproveitados.
+
+    Returns:
+        list: [(ImageAsset, distância)] do mais parecido para o menos parecido
+    """
+    bands = phash_bands(perceptual_hash)
+    candidates = ImageAsset.query.filter(
+        ImageAsset.folder == folder,
+        db.or_(
+            ImageAsset.phash_band0 == bands[0],
+            ImageAsset.phash_band1 == bands[1],
+            ImageAsset.phash_band2 == bands[2],
+            ImageAsset.phash_band3 == bands[3]
+        )
+    ).limit(50).all()
+
+    similar = []
+    for candidate in candidates:
+        if not candidate.phash:
+            continue
+        distance = bin(int(candidate.phash, 16) ^ perceptual_hash).count('1')
+        if distance <= PHASH_MAX_DISTANCE:
+            similar.append((candidate, distance))
+    similar.sort(key=lambda item: item[1])
+    return similar[:limit]
+
+
+def registered_image_exists(url, local_dir=None):
+    """
+    Confere se a imagem registrada ainda existe antes de reaproveitá-la.
+    Para o Cloudinary consulta a Admin API (só nos acertos do registro).
+
+    Returns:
+        bool ou None: None quando não foi possível verificar
+    """
+    if url.startswith(('http://', 'https://')):
+        public_id = cloudinary_public_id(url)
+        if not public_id:
+            return None
+        cloudinary = get_cloudinary()
+        try:
+            cloudinary.api.resource(public_id)
+            return True
+        except cloudinary.exceptions.NotFound:
+            return False
+        except Exception as e:
+            print(f"Erro ao verificar imagem {public_id} no Cloudinary: {e}")
+            return None
+
+    if local_dir is None:
+        return None
+    return os.path.isfile(os.path.join(local_dir, url))
+
+
+def reuse_registered_image(content_hash, perceptual_hash, folder, local_dir=None):
+    """
+    Retorna a URL de uma imagem idêntica já enviada (ou None) e contabiliza o reuso.
+    Registros cujo arquivo não existe mais são removidos; quase-duplicatas só
+    aparecem no log.
+    """
+    try:
+        asset = find_registered_image(content_hash, folder)
+        if not asset and perceptual_hash is not None:
+            for similar, distance in find_similar_images(perceptual_hash, folder):
+                debug_log(f"Imagem parecida já enviada ({distance} bits de diferença): {similar.url}")
+    except Exception as e:
+        print(f"Erro ao consultar registro de imagens: {e}")
+        return None
+
+    if not asset:
+        return None
+
+    exists = registered_image_exists(asset.url, local_dir)
+    if exists is False:
+        debug_log(f"Imagem registrada {asset.url} não existe mais, removendo do registro")
+        ImageAsset.query.filter_by(url=asset.url).delete(synchronize_session=False)
+        return None
+    if exists is None:
+        return None
+
+    asset.reuse_count = (asset.reuse_count or 0) + 1
+    debug_log(f"Imagem duplicada detectada, reutilizando {asset.url}")
+    return asset.url
+
+
+def register_image(content_hash, perceptual_hash, url, folder, file_size=None, size=None):
+    """Adiciona uma imagem ao registro (o commit fica a cargo de quem salva a referência)"""
+    bands = phash_bands(perceptual_hash) if perceptual_hash is not None else [None] * 4
+    asset = ImageAsset(
+        content_hash=content_hash,
+        phash=f'{perceptual_hash:016x}' if perceptual_hash is not None else None,
+        phash_band0=bands[0],
+        phash_band1=bands[1],
+        phash_band2=bands[2],
+        phash_band3=bands[3],
+        url=url,
+        folder=folder,
+        file_size=file_size,
+        width=size[0] if size else None,
+        height=size[1] if size else None
+    )
+    db.session.add(asset)
+    return asset
+
+
+def count_image_references(image_url):
+    """Conta quantos posts e usuários apontam para a mesma imagem"""
+    if not image_url:
+        return 0
+    post_refs = Post.query.filter(db.or_(Post.image_url == image_url, Post.thumbnail == image_url)).count()
+    user_refs = User.query.filter(User.profile_image == image_url).count()
+    return post_refs + user_refs
+
+
+def release_shared_image(image_url):
+    """
+    Verifica se uma imagem pode ser apagada antes de trocá-la ou remover seu dono.
+    Imagens deduplicadas podem ser usadas por vários registros; nesse caso, mantém o arquivo.
+
+    Returns:
+        bool: True se o arquivo pode ser apagado
+    """
+    try:
+        if count_image_references(image_url) > 1:
+            debug_log(f"Imagem {image_url} ainda está em uso, mantendo arquivo")
+            return False
+        ImageAsset.query.filter_by(url=image_url).delete()
+    except Exception as e:
+        print(f"Erro ao verificar referências da imagem {image_url}: {e}")
+    return True
+
+
 def upload_to_cloudinary(file, folder='profiles'):
     """
     Faz upload de imagem para o Cloudinary
 
+    Se uma imagem idêntica já foi enviada (e ainda existe), reutiliza a URL existente.
+
     Args:
         file: Objeto de arquivo do Flask
         folder: Pasta no Cloudinary (profiles, posts, etc.)
@@ -7012,9 +10362,20 @@ def upload_to_cloudinary(file, folder='profiles'):
         tuple: (success: bool, url_or_error: str)
     """
     try:
+        # Hash do conteúdo original para deduplicação
+        raw_data = file.stream.read()
+        file.stream.seek(0)
+        content_hash = hashlib.sha256(raw_data).hexdigest()
+
         # Processar a imagem antes do upload
+        from PIL import Image
         img = Image.open(file.stream)
 
+        perceptual_hash = compute_perceptual_hash(img)
+        existing_url = reuse_registered_image(content_hash, perceptual_hash, folder)
+        if existing_url:
+            return True, existing_url
+
         # Remover dados EXIF (segurança)
         img_data = list(img.getdata())
         img_without_exif = Image.new(img.mode, img.size)
@@ -7032,6 +10393,7 @@ def upload_to_cloudinary(file, folder='profiles'):
         buffer.seek(0)
 
         # Upload para Cloudinary
+        cloudinary = get_cloudinary()
         result = cloudinary.uploader.upload(
             buffer,
             folder=f'mundodainformatica/{folder}',
@@ -7044,12 +10406,32 @@ def upload_to_cloudinary(file, folder='profiles'):
             ]
         )
 
+        register_image(content_hash, perceptual_hash, result['secure_url'], folder,
+                       file_size=len(raw_data), size=img.size)
+
         return True, result['secure_url']
 
     except Exception as e:
         print(f"Erro ao fazer upload para Cloudinary: {e}")
         return False, str(e)
 
+def cloudinary_public_id(image_url):
+    """
+    Extrai o public_id de uma URL do Cloudinary
+
+    URL formato: https://res.cloudinary.com/cloud_name/image/upload/[transformações/]v123/pasta/sub/public_id.jpg
+    Retorna 'pasta/sub/public_id' ou None se não for uma URL do Cloudinary.
+    """
+    if not image_url or 'cloudinary.com' not in image_url or '/upload/' not in image_url:
+        return None
+
+    segments = image_url.split('?', 1)[0].split('/upload/', 1)[1].split('/')
+    # Descartar transformações (w_320,c_limit...) e a versão (v123)
+    while len(segments) > 1 and (',' in segments[0] or re.match(r'^([a-z]{1,2}_[^/]+|v\d+)$', segments[0])):
+        segments.pop(0)
+    return '/'.join(segments).rsplit('.', 1)[0] or None
+
+
 def delete_from_cloudinary(image_url):
     """
     Deleta imagem do Cloudinary
@@ -7058,15 +10440,12 @@ def delete_from_cloudinary(image_url):
         image_url: URL da imagem no Cloudinary
     """
     try:
-        # Extrair public_id da URL
-        # URL formato: https://res.cloudinary.com/cloud_name/image/upload/v123/folder/public_id.jpg
-        if 'cloudinary.com' in image_url:
-            parts = image_url.split('/')
-            # Pegar folder/public_id (últimas 2 partes antes da extensão)
-            public_id_with_ext = '/'.join(parts[-2:])
-            public_id = public_id_with_ext.rsplit('.', 1)[0]
-
-            cloudinary.uploader.destroy(public_id)
+        if 'cloudinary.com' in image_url and release_shared_image(image_url):
+            public_id = cloudinary_public_id(image_url)
+            if not public_id:
+                return
+
+            get_cloudinary().uploader.destroy(public_id)
             print(f"Imagem deletada do Cloudinary: {public_id}")
     except Exception as e:
         print(f"Erro ao deletar do Cloudinary: {e}")
@@ -7186,16 +10565,31 @@ def admin_update_profile_image():
         filepath = os.path.join(upload_path, filename)
 
         try:
-            # Deletar imagem antiga se existir
-            if current_user.profile_image:
-                delete_old_image(current_user.profile_image)
+            # Hash do conteúdo para reaproveitar imagens já enviadas
+            raw_data = file.stream.read()
+            file.stream.seek(0)
+            content_hash = hashlib.sha256(raw_data).hexdigest()
 
-            # Redimensione e salve a imagem para otimização
             # Usar o stream do FileStorage para evitar warning do Pylance
+            from PIL import Image
             img = Image.open(file.stream)
-            img = img.convert('RGB')  # Converte para RGB (remove alfa se existir)
-            img.thumbnail((300, 300))  # Redimensiona mantendo proporção
-            img.save(filepath, optimize=True, quality=85)
+            perceptual_hash = compute_perceptual_hash(img)
+            existing_filename = reuse_registered_image(content_hash, perceptual_hash, 'local_profiles',
+                                                       local_dir=upload_path)
+
+            # Deletar imagem antiga se existir
+            if current_user.profile_image and current_user.profile_image != existing_filename:
+                delete_old_image(current_user.profile_image)
+
+            if existing_filename:
+                filename = existing_filename
+            else:
+                # Redimensione e salve a imagem para otimização
+                img = img.convert('RGB')  # Converte para RGB (remove alfa se existir)
+                img.thumbnail((300, 300))  # Redimensiona mantendo proporção
+                img.save(filepath, optimize=True, quality=85)
+                register_image(content_hash, perceptual_hash, filename, 'local_profiles',
+                               file_size=len(raw_data), size=img.size)
 
             # Atualiza o perfil do usuário com apenas o nome do arquivo
             current_user.profile_image = filename
@@ -7369,81 +10763,131 @@ def check_download_history_access(user):
     return False, None
 
 
-def check_user_download_limit(user):
-    """Verifica se o usuário atingiu o limite de downloads (diários para Free, semanais para Premium)"""
+# ==========================================
+# COTA DE DOWNLOADS
+# ==========================================
+# plano -> (período, limite padrão); admin/editor e VIP são ilimitados
+DOWNLOAD_QUOTAS = {
+    'premium': ('weekly', 15),  # Reset domingo 00:00 (Brasília)
+    'free': ('daily', 1),       # Reset meia-noite (Brasília)
+}
 
-    # Verificar se o usuário tem permissão para fazer downloads
-    if hasattr(user, 'can_download') and not user.can_download:
-        return False, 0, 0, None, 'blocked'
 
-    if user.role == 'admin' or user.role == 'editor':
-        return True, float('inf'), float('inf'), None, 'unlimited'  # Sem limites
+class QuotaWindows:
+    """
+    Próximos resets diário e semanal (UTC, sem tzinfo), calculados com pytz
+    apenas uma vez por dia em vez de a cada verificação.
+    """
 
-    brasilia_tz = pytz.timezone('America/Sao_Paulo')
-    now = datetime.utcnow()
-    now_brasilia = pytz.utc.localize(now).astimezone(brasilia_tz)
+    def __init__(self, tz=BRAZIL_TZ):
+        self.tz = tz
+        self._lock = threading.Lock()
+        self._daily_reset = None
+        self._weekly_reset = None
 
-    # VIP: ilimitado
-    if user.plan == 'vip':
-        return True, float('inf'), float('inf'), None, 'unlimited'
+    def resets(self, now=None):
+        """Retorna (próxima meia-noite, próximo domingo 00:00) em UTC"""
+        now = now or datetime.utcnow()
+        with self._lock:
+            if self._daily_reset is None or now >= self._daily_reset or now < self._daily_reset - timedelta(days=1):
+                self._daily_reset, self._weekly_reset = self._compute(now)
+            return self._daily_reset, self._weekly_reset
 
-    # PREMIUM: 15 downloads semanais (reset domingo 00:00 Brasília) - ou limite personalizado
-    elif user.plan == 'premium':
-        # Usar limite personalizado se definido, caso contrário usar padrão
-        limit = user.custom_weekly_limit if hasattr(user, 'custom_weekly_limit') and user.custom_weekly_limit else 15
+    def _compute(self, now):
+        today = pytz.utc.localize(now).astimezone(self.tz).date()
 
-        # Calcular próximo domingo às 00:00 (horário Brasília)
-        days_until_sunday = (6 - now_brasilia.weekday()) % 7  # 0=segunda, 6=domingo
-        if days_until_sunday == 0 and now_brasilia.hour >= 0:
-            days_until_sunday = 7  # Já é domingo, próximo reset é em 7 dias
+        def local_midnight_utc(day):
+            midnight = self.tz.localize(datetime.combine(day, datetime.min.time()))
+            return midnight.astimezone(pytz.utc).replace(tzinfo=None)
 
-        next_sunday = (now_brasilia + timedelta(days=days_until_sunday)).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        reset_time = next_sunday.astimezone(pytz.utc).replace(tzinfo=None)
+        # Domingo é weekday 6; se hoje já é domingo, o próximo reset é em 7 dias
+        days_until_sunday = (6 - today.weekday()) % 7 or 7
+        return (local_midnight_utc(today + timedelta(days=1)),
+                local_midnight_utc(today + timedelta(days=days_until_sunday)))
 
-        # Resetar contador se passou da data de reset
-        if user.week_reset_date:
-            if now >= user.week_reset_date:
-                user.weekly_downloads = 0
-                user.week_reset_date = reset_time
-                db.session.commit()
-        else:
-            user.week_reset_date = reset_time
-            db.session.commit()
 
-        current_downloads = user.weekly_downloads or 0
-        remaining = max(0, limit - current_downloads)
-        can_download = current_downloads < limit
+quota_windows = QuotaWindows()
 
-        return can_download, remaining, limit, reset_time, 'weekly'
 
-    # FREE: 1 download diário (reset meia-noite Brasília) - ou limite personalizado
-    else:
-        # Usar limite personalizado se definido, caso contrário usar padrão
-        limit = user.custom_daily_limit if hasattr(user, 'custom_daily_limit') and user.custom_daily_limit else 1
+def get_download_quota(user, now=None):
+    """
+    Regras de cota do usuário.
 
-        # Calcular próxima meia-noite (horário Brasília)
-        next_midnight = (now_brasilia + timedelta(days=1)).replace(
-            hour=0, minute=0, second=0, microsecond=0
-        )
-        reset_time = next_midnight.astimezone(pytz.utc).replace(tzinfo=None)
+    Returns:
+        tuple: (período, limite, coluna do contador, coluna do reset, próximo reset)
+        ou None para usuários sem limite
+    """
+    if user.role in ('admin', 'editor') or user.plan == 'vip':
+        return None
 
-        # Resetar contador se passou da data de reset
-        if user.download_reset_date:
-            if now >= user.download_reset_date:
-                user.daily_downloads = 0
-                user.download_reset_date = reset_time
-                db.session.commit()
-        else:
-            user.download_reset_date = reset_time
-            db.session.commit()
+    period, default_limit = DOWNLOAD_QUOTAS.get(user.plan, DOWNLOAD_QUOTAS['free'])
+    daily_reset, weekly_reset = quota_windows.resets(now)
+    if period == 'weekly':
+        limit = user.custom_weekly_limit or default_limit
+        return period, limit, 'weekly_downloads', 'week_reset_date', weekly_reset
+
+    limit = user.custom_daily_limit or default_limit
+    return period, limit, 'daily_downloads', 'download_reset_date', daily_reset
+
+
+def check_user_download_limit(user):
+    """
+    Verifica se o usuário atingiu o limite de downloads (diários para Free, semanais para Premium).
+    Somente leitura: um contador cuja janela já expirou conta como zero (o reset é
+    gravado por consume_download_quota no próximo download).
+    """
+
+    # Verificar se o usuário tem permissão para fazer downloads
+    if hasattr(user, 'can_download') and not user.can_download:
+        return False, 0, 0, None, 'blocked'
+
+    quota = get_download_quota(user)
+    if quota is None:
+        return True, float('inf'), float('inf'), None, 'unlimited'  # Sem limites
+
+    period, limit, counter_column, reset_column, reset_time = quota
+    stored_reset = getattr(user, reset_column)
+    current_downloads = 0
+    if stored_reset is None or datetime.utcnow() < stored_reset:
+        current_downloads = getattr(user, counter_column) or 0
+
+    remaining = max(0, limit - current_downloads)
+    return current_downloads < limit, remaining, limit, reset_time, period
+
+
+def consume_download_quota(user, now=None):
+    """
+    Reserva um download da cota com um único UPDATE condicional
+    (... WHERE usados < limite), seguro contra cliques simultâneos em várias
+    abas ou workers. A troca de janela (reset) acontece no mesmo comando.
+    Não faz commit: a reserva é confirmada junto com o registro do download.
+
+    Returns:
+        bool: True se o download foi liberado
+    """
+    if hasattr(user, 'can_download') and not user.can_download:
+        return False
 
-        current_downloads = user.daily_downloads or 0
-        remaining = max(0, limit - current_downloads)
-        can_download = current_downloads < limit
+    now = now or datetime.utcnow()
+    quota = get_download_quota(user, now)
+    if quota is None:
+        return True
 
-        return can_download, remaining, limit, reset_time, 'daily'
+    _, limit, counter_column, reset_column, reset_time = quota
+    users = User.__table__
+    counter = users.c[counter_column]
+    reset_date = users.c[reset_column]
+    window_expired = reset_date <= now
+
+    statement = users.update().where(
+        users.c.id == user.id,
+        db.or_(window_expired, db.func.coalesce(counter, 0) < limit)
+    ).values({
+        counter_column: db.case((window_expired, 1), else_=db.func.coalesce(counter, 0) + 1),
+        reset_column: db.case((db.or_(reset_date.is_(None), window_expired), reset_time), else_=reset_date),
+        'last_updated': users.c.last_updated,
+    })
+    return db.session.execute(statement).rowcount == 1
 
 
 def check_support_priority(user):
@@ -7537,11 +10981,6 @@ def add_favorite(post_id):
         db.session.commit()
         db.session.refresh(favorite)
 
-        # Invalidar cache
-        cache_key = f'fav_{current_user.id}_{post_id}'
-        _favorite_check_cache[cache_key] = True
-        _favorite_check_timestamps[cache_key] = __import__('time').time()
-
         print(f"[FAVORITOS] Favorito adicionado com sucesso: ID={favorite.id}")
         return jsonify({
             'success': True,
@@ -7592,11 +11031,6 @@ def remove_favorite(post_id):
             db.session.delete(still_exists)
             db.session.commit()
 
-        # Invalidar cache
-        cache_key = f'fav_{current_user.id}_{post_id}'
-        _favorite_check_cache[cache_key] = False
-        _favorite_check_timestamps[cache_key] = __import__('time').time()
-
         return jsonify({
             'success': True,
             'message': 'Post removido dos favoritos',
@@ -7611,52 +11045,54 @@ def remove_favorite(post_id):
             'message': f'Erro ao remover favorito: {str(e)}'
         }), 500
 
-# Cache global para check-favorite com timestamp
-_favorite_check_cache = {}
-_favorite_check_timestamps = {}
+FAVORITE_STATUS_MAX_IDS = 200
+
 
 @app.route('/api/check-favorite/<int:post_id>', methods=['GET'])
+@limiter.limit(POLLING_LIMIT)  # Consultado por card de post
 @login_required
 def check_favorite(post_id):
-    """Verifica se um post está nos favoritos do usuário com rate limiting"""
+    """Verifica se um post está nos favoritos do usuário"""
     try:
-        import time
-        cache_key = f'fav_{current_user.id}_{post_id}'
-        current_time = time.time()
-
-        # Verificar se existe cache válido (menos de 30 segundos)
-        if cache_key in _favorite_check_timestamps:
-            time_diff = current_time - _favorite_check_timestamps[cache_key]
-            if time_diff < 30:  # 30 segundos de cache
-                if cache_key in _favorite_check_cache:
-                    response = jsonify({'is_favorited': _favorite_check_cache[cache_key]})
-                    response.headers['X-From-Cache'] = 'true'
-                    response.headers['Cache-Control'] = 'public, max-age=30'
-                    return response
-
-        # Buscar no banco
-        db.session.expire_all()
-        is_favorited = Favorite.query.filter_by(
-            user_id=current_user.id,
-            post_id=post_id
-        ).first() is not None
+        response = jsonify({'is_favorited': post_id in favorite_set_cache.get(current_user)})
+        response.headers['Cache-Control'] = 'private, no-cache'
+        return response
+
+    except Exception:
+        return jsonify({'is_favorited': False}), 500
+
 
-        # Atualizar cache
-        _favorite_check_cache[cache_key] = is_favorited
-        _favorite_check_timestamps[cache_key] = current_time
+@app.route('/api/check-favorites', methods=['GET', 'POST'])
+@limiter.limit(POLLING_LIMIT)  # Consultado a cada listagem de posts
+@login_required
+def check_favorites():
+    """
+    Verifica vários posts de uma vez: ?ids=1,2,3 (GET) ou {"ids": [1, 2, 3]} (POST).
+    Retorna apenas os IDs que estão nos favoritos do usuário.
+    """
+    if request.method == 'POST':
+        payload = request.get_json(silent=True)
+        raw_ids = payload.get('ids', []) if isinstance(payload, dict) else None
+    else:
+        raw_ids = request.args.get('ids', '').split(',')
+    if not isinstance(raw_ids, list):
+        return jsonify({'favorited': [], 'message': 'Envie {"ids": [...]} com uma lista de IDs'}), 400
 
-        # Limpar cache antigo (mais de 60 segundos)
-        keys_to_remove = [k for k, v in _favorite_check_timestamps.items() if current_time - v > 60]
-        for k in keys_to_remove:
-            _favorite_check_cache.pop(k, None)
-            _favorite_check_timestamps.pop(k, None)
+    post_ids = []
+    for raw_id in raw_ids[:FAVORITE_STATUS_MAX_IDS]:
+        try:
+            post_ids.append(int(raw_id))
+        except (TypeError, ValueError):
+            continue
 
-        response = jsonify({'is_favorited': is_favorited})
-        response.headers['Cache-Control'] = 'public, max-age=30'
+    try:
+        favorites = favorite_set_cache.get(current_user)
+        response = jsonify({'favorited': [post_id for post_id in post_ids if post_id in favorites]})
+        response.headers['Cache-Control'] = 'private, no-cache'
         return response
 
     except Exception:
-        return jsonify({'is_favorited': False}), 500
+        return jsonify({'favorited': [], 'message': 'Erro ao verificar favoritos'}), 500
 
 @app.route('/admin/update-preferences', methods=['POST'])
 @login_required
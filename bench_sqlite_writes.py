@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Script para medir vazão e latência das escritas no SQLite
+Execute localmente (usa um banco SQLite temporário, nunca o banco real):
+
+    python bench_sqlite_writes.py
+    python bench_sqlite_writes.py --threads 32 --writes 5000
+
+Roda a mesma carga duas vezes, cada uma em um processo novo: antes (cada
+thread faz commit pela sessão, como as rotas) e depois (modo escritor único,
+SQLITE_SINGLE_WRITER=true, com as escritas em grupo pelo db_write). Cada
+escrita é uma transação pequena (last_login de um usuário) e o script imprime
+escritas/s, latências p50/p95/p99 e erros como "database is locked".
+"""
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+
+MODES = {
+    'direct': 'Antes (commit pela sessão)',
+    'writer': 'Depois (escritor único)',
+}
+
+
+def percentile(values, fraction):
+    """Percentil de uma lista já ordenada"""
+    if not values:
+        return 0.0
+    index = min(len(values) - 1, int(round(fraction * (len(values) - 1))))
+    return values[index]
+
+
+def run_load(mode, threads, writes):
+    """Executa a carga no processo atual (o modo já vem do ambiente) e retorna as métricas"""
+    from datetime import datetime
+    from app import app, db, User, db_write, touch_last_login
+
+    with app.app_context():
+        db.create_all()
+        users = [User(username=f'bench_{i}', email=f'bench_{i}@example.com') for i in range(threads)]
+        for user in users:
+            user.set_password('bench')
+        db.session.add_all(users)
+        db.session.commit()
+        user_ids = [user.id for user in users]
+
+    latencies = []
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(threads)
+    per_thread = [writes // threads + (1 if i < writes % threads else 0) for i in range(threads)]
+
+    def worker(user_id, count):
+        local = []
+        barrier.wait()
+        for _ in range(count):
+            started = time.perf_counter()
+            try:
+                if mode == 'direct':
+                    with app.app_context():
+                        user = db.session.get(User, user_id)
+                        user.last_login = datetime.utcnow()
+                        db.session.commit()
+                else:
+                    db_write(touch_last_login, user_id, datetime.utcnow()).result()
+            except Exception as e:
+                with lock:
+                    errors.append(str(e).splitlines()[0])
+                continue
+            local.append(time.perf_counter() - started)
+        with lock:
+            latencies.extend(local)
+
+    pool = [threading.Thread(target=worker, args=(user_id, count)) for user_id, count in zip(user_ids, per_thread)]
+    started = time.perf_counter()
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    elapsed = time.perf_counter() - started
+
+    latencies.sort()
+    return {
+        'writes': len(latencies),
+        'errors': len(errors),
+        'sample_errors': sorted(set(errors))[:3],
+        'elapsed': elapsed,
+        'throughput': len(latencies) / elapsed if elapsed > 0 else 0,
+        'p50': percentile(latencies, 0.50) * 1000,
+        'p95': percentile(latencies, 0.95) * 1000,
+        'p99': percentile(latencies, 0.99) * 1000,
+        'max': (latencies[-1] if latencies else 0) * 1000,
+    }
+
+
+def run_mode(mode, threads, writes):
+    """Executa um modo em um processo novo, com banco e configuração próprios"""
+    temp_dir = tempfile.mkdtemp(prefix=f'sqlite_bench_{mode}_')
+    env = dict(os.environ)
+    env['DATABASE_URL'] = f"sqlite:///{os.path.join(temp_dir, 'bench.db')}"
+    env['TELEMETRY_DATABASE_URL'] = f"sqlite:///{os.path.join(temp_dir, 'telemetry.db')}"
+    env['SQLITE_SINGLE_WRITER'] = 'true' if mode == 'writer' else 'false'
+
+    command = [sys.executable, os.path.abspath(__file__), '--run', mode,
+               '--threads', str(threads), '--writes', str(writes)]
+    completed = subprocess.run(command, env=env, capture_output=True, text=True)
+    if completed.returncode != 0:
+        raise RuntimeError(f"modo {mode} falhou:\n{completed.stderr or completed.stdout}")
+    # A última linha da saída é o JSON com as métricas (o app imprime mensagens ao iniciar)
+    return json.loads(completed.stdout.strip().splitlines()[-1])
+
+
+def bench_sqlite_writes(threads=16, writes=2000):
+    """Compara os dois modos e retorna as métricas de cada um"""
+    print(f"🧪 {writes} escritas em {threads} threads por modo")
+
+    results = {}
+    for mode, label in MODES.items():
+        metrics = run_mode(mode, threads, writes)
+        results[mode] = metrics
+        print(f"\n   {label}")
+        print(f"      {metrics['writes']} gravadas em {metrics['elapsed']:.2f}s | "
+              f"{metrics['throughput']:.0f} escritas/s | {metrics['errors']} erros")
+        print(f"      Latência: p50 {metrics['p50']:.1f} ms | p95 {metrics['p95']:.1f} ms | "
+              f"p99 {metrics['p99']:.1f} ms | máx {metrics['max']:.1f} ms")
+        for error in metrics['sample_errors']:
+            print(f"      ⚠️  {error}")
+
+    before, after = results['direct'], results['writer']
+    if before['throughput']:
+        print(f"\n📊 Vazão: {after['throughput'] / before['throughput']:.1f}x | "
+              f"p99: {before['p99']:.1f} ms → {after['p99']:.1f} ms")
+    return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mede vazão e latência das escritas no SQLite')
+    parser.add_argument('--threads', type=int, default=16, help='Threads simultâneas')
+    parser.add_argument('--writes', type=int, default=2000, help='Escritas por modo')
+    parser.add_argument('--run', choices=sorted(MODES), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    try:
+        if args.run:
+            print(json.dumps(run_load(args.run, args.threads, args.writes)))
+        else:
+            bench_sqlite_writes(args.threads, args.writes)
+    except Exception as e:
+        print(f"❌ Erro ao medir as escritas: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,197 @@
+#!/usr/bin/env python3
+"""
+Script para medir o custo de inicialização do app
+Execute localmente (Linux; usa um banco SQLite temporário, nunca o banco real):
+
+    python bench_startup.py                   # import + memória dos workers
+    python bench_startup.py --workers 4 --runs 10
+    python bench_startup.py --skip-gunicorn   # só o tempo de import
+
+Mede o tempo de `import app` em processos novos (e os módulos mais pesados do
+import, via -X importtime) e sobe o gunicorn duas vezes, sem preload e com o
+gunicorn.conf.py do projeto (preload + gc.freeze), informando RSS, PSS e memória
+privada (USS) do master e de cada worker. O PSS divide as páginas compartilhadas
+entre os processos, então a soma dos PSS é a memória real ocupada.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import urllib.request
+
+PROJECT_DIR = os.path.dirname(os.path.abspath(__file__))
+IMPORT_BUDGET = 1.0  # Segundos: acima disso o import do app está pesado demais
+
+
+def bench_env(temp_dir):
+    """Ambiente com bancos temporários para os processos medidos"""
+    env = dict(os.environ)
+    env['DATABASE_URL'] = f"sqlite:///{os.path.join(temp_dir, 'site.db')}"
+    env['TELEMETRY_DATABASE_URL'] = f"sqlite:///{os.path.join(temp_dir, 'telemetry.db')}"
+    env['RATELIMIT_STORAGE_URI'] = f"sqlite:///{os.path.join(temp_dir, 'ratelimit.db')}"
+    return env
+
+
+def measure_import(env, runs):
+    """Tempo de `import app` em processos novos (o primeiro aquece o __pycache__)"""
+    code = "import time; t = time.perf_counter(); import app; print(time.perf_counter() - t)"
+    times = []
+    for _ in range(runs + 1):
+        completed = subprocess.run([sys.executable, '-c', code], cwd=PROJECT_DIR, env=env,
+                                   capture_output=True, text=True, check=True)
+        times.append(float(completed.stdout.strip().splitlines()[-1]))
+    return times[1:]
+
+
+def heaviest_imports(env, top=10):
+    """Módulos importados diretamente pelo app, ordenados pelo tempo acumulado"""
+    completed = subprocess.run([sys.executable, '-X', 'importtime', '-c', 'import app'], cwd=PROJECT_DIR,
+                               env=env, capture_output=True, text=True, check=True)
+    modules = []
+    for line in completed.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line.split('|')
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        if depth == 1:  # Imports de primeiro nível (feitos pelo app.py)
+            modules.append((int(cumulative) / 1000, name.strip()))
+    return sorted(modules, reverse=True)[:top]
+
+
+def memory_of(pid):
+    """RSS, PSS e USS (memória privada) de um processo, em MB"""
+    values = {}
+    with open(f'/proc/{pid}/smaps_rollup') as f:
+        for line in f:
+            parts = line.split()
+            if len(parts) >= 2 and parts[0].endswith(':'):
+                values[parts[0][:-1]] = int(parts[1]) / 1024
+    private = values.get('Private_Clean', 0) + values.get('Private_Dirty', 0)
+    return values.get('Rss', 0), values.get('Pss', 0), private
+
+
+def children_of(pid):
+    with open(f'/proc/{pid}/task/{pid}/children') as f:
+        return [int(child) for child in f.read().split()]
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_until_stable(master_pid, workers, timeout=60):
+    """Espera os workers subirem e a memória total parar de crescer"""
+    deadline = time.monotonic() + timeout
+    last_total = None
+    while time.monotonic() < deadline:
+        time.sleep(0.5)
+        pids = children_of(master_pid)
+        if len(pids) < workers:
+            continue
+        total = sum(memory_of(pid)[0] for pid in pids)
+        if last_total and abs(total - last_total) < 0.5:
+            return pids
+        last_total = total
+    raise RuntimeError('os workers do gunicorn não estabilizaram a tempo')
+
+
+def measure_gunicorn(env, workers, requests_count, use_project_config):
+    """Sobe o gunicorn, faz algumas requisições e mede a memória de cada processo"""
+    port = free_port()
+    config = os.path.join(PROJECT_DIR, 'gunicorn.conf.py') if use_project_config else os.devnull
+    command = [sys.executable, '-m', 'gunicorn', 'app:app', '-c', config,
+               '--bind', f'127.0.0.1:{port}', '--workers', str(workers), '--log-level', 'warning']
+    started = time.perf_counter()
+    process = subprocess.Popen(command, cwd=PROJECT_DIR, env=env,
+                               stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    try:
+        ready_at = None
+        for _ in range(600):
+            try:
+                urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=5).read()
+                ready_at = time.perf_counter() - started
+                break
+            except Exception:
+                time.sleep(0.1)
+        if ready_at is None:
+            raise RuntimeError('o gunicorn não respondeu')
+
+        for _ in range(requests_count):
+            urllib.request.urlopen(f'http://127.0.0.1:{port}/', timeout=30).read()
+
+        worker_pids = wait_until_stable(process.pid, workers)
+        return {
+            'ready': ready_at,
+            'master': memory_of(process.pid),
+            'workers': [memory_of(pid) for pid in worker_pids],
+        }
+    finally:
+        process.terminate()
+        process.wait(timeout=30)
+
+
+def print_memory(label, result):
+    print(f"\n   {label} (primeira resposta em {result['ready']:.2f}s)")
+    rss, pss, uss = result['master']
+    print(f"      master:   RSS {rss:6.1f} MB | PSS {pss:6.1f} MB | USS {uss:6.1f} MB")
+    for index, (rss, pss, uss) in enumerate(result['workers'], 1):
+        print(f"      worker {index}: RSS {rss:6.1f} MB | PSS {pss:6.1f} MB | USS {uss:6.1f} MB")
+    total_pss = result['master'][1] + sum(pss for _, pss, _ in result['workers'])
+    print(f"      Total (soma dos PSS): {total_pss:.1f} MB")
+    return total_pss
+
+
+def bench_startup(workers=2, runs=5, requests_count=20, skip_gunicorn=False):
+    temp_dir = tempfile.mkdtemp(prefix='startup_bench_')
+    env = bench_env(temp_dir)
+
+    # Criar as tabelas antes (os workers não fazem isso no import)
+    subprocess.run([sys.executable, '-c', 'from app import app, db, initialize_db\n'
+                    'with app.app_context():\n    db.create_all()\n    initialize_db()'],
+                   cwd=PROJECT_DIR, env=env, capture_output=True, check=True)
+
+    times = measure_import(env, runs)
+    median = statistics.median(times)
+    marker = '✓' if median <= IMPORT_BUDGET else '✗'
+    print(f"⏱️  import app: mediana {median * 1000:.0f} ms | mín {min(times) * 1000:.0f} ms | "
+          f"máx {max(times) * 1000:.0f} ms ({runs} execuções)")
+    print(f"   {marker} orçamento de import: {IMPORT_BUDGET * 1000:.0f} ms")
+
+    print("\n📦 Imports mais pesados (tempo acumulado)")
+    for elapsed, name in heaviest_imports(env):
+        print(f"   {elapsed:7.1f} ms  {name}")
+
+    if skip_gunicorn:
+        return median <= IMPORT_BUDGET
+
+    print(f"\n🧠 Memória com {workers} workers, após {requests_count} requisições")
+    without = print_memory('Sem preload', measure_gunicorn(env, workers, requests_count, False))
+    with_preload = print_memory('Preload + gc.freeze (gunicorn.conf.py)',
+                                measure_gunicorn(env, workers, requests_count, True))
+    print(f"\n📊 Memória total: {without:.1f} MB → {with_preload:.1f} MB")
+    return median <= IMPORT_BUDGET
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Mede o tempo de import e a memória dos workers')
+    parser.add_argument('--workers', type=int, default=2, help='Workers do gunicorn')
+    parser.add_argument('--runs', type=int, default=5, help='Execuções para medir o import')
+    parser.add_argument('--requests', type=int, default=20, help='Requisições antes de medir a memória')
+    parser.add_argument('--skip-gunicorn', action='store_true', help='Mede apenas o tempo de import')
+    args = parser.parse_args()
+
+    try:
+        if not bench_startup(args.workers, args.runs, args.requests, args.skip_gunicorn):
+            sys.exit(1)
+    except Exception as e:
+        print(f"❌ Erro ao medir a inicialização: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+"""
+Script para gerar os bundles de CSS e JS do site
+Execute no build (antes de subir o gunicorn) ou localmente:
+
+    python build_assets.py
+    python build_assets.py --keep-old   # não remove bundles de builds anteriores
+
+Para cada bundle de ASSET_BUNDLES (public, admin, auth) concatena e minifica os
+arquivos, grava o resultado com o hash do conteúdo no nome (static/gen/
+public.3f2a9c1b.css), escreve as versões .gz e .br ao lado e atualiza o
+static/gen/manifest.json lido pelos templates. Como o nome muda sempre que o
+conteúdo muda, os bundles são servidos com cache imutável de 1 ano.
+"""
+
+import argparse
+import gzip
+import json
+import os
+import sys
+import time
+
+
+def compress_file(path):
+    """Grava path.gz e path.br (nível máximo: o custo é só no build) e retorna os tamanhos"""
+    import brotli
+
+    with open(path, 'rb') as f:
+        data = f.read()
+    gz_data = gzip.compress(data, compresslevel=9, mtime=0)  # mtime fixo: mesmo conteúdo, mesmo .gz
+    br_data = brotli.compress(data, quality=11)
+    for suffix, compressed in (('.gz', gz_data), ('.br', br_data)):
+        with open(path + suffix, 'wb') as f:
+            f.write(compressed)
+    return len(data), len(gz_data), len(br_data)
+
+
+def remove_old_bundles(output_dir, current_files):
+    """Remove bundles (e seus .gz/.br) de builds anteriores"""
+    keep = {'manifest.json'}
+    for name in current_files:
+        keep.update({name, f'{name}.gz', f'{name}.br'})
+    removed = 0
+    for name in os.listdir(output_dir):
+        path = os.path.join(output_dir, name)
+        if name not in keep and os.path.isfile(path):
+            os.remove(path)
+            removed += 1
+    return removed
+
+
+def build_assets(keep_old=False):
+    """Gera todos os bundles e retorna True se deu tudo certo"""
+    from app import app, assets, ASSET_BUNDLES, ASSET_OUTPUT_DIR
+
+    output_dir = os.path.join(app.static_folder, ASSET_OUTPUT_DIR)
+    os.makedirs(output_dir, exist_ok=True)
+
+    print(f"📦 Gerando {len(ASSET_BUNDLES)} bundles em {output_dir}")
+    started = time.perf_counter()
+    current_files = []
+    totals = [0, 0, 0, 0]  # fontes, minificado, gzip, brotli
+    with app.test_request_context():
+        for name, files in ASSET_BUNDLES.items():
+            bundle = assets[name]
+            bundle.build(force=True)
+            url = bundle.urls()[0]
+            filename = url.rsplit('/', 1)[-1].split('?', 1)[0]
+            current_files.append(filename)
+
+            source_size = sum(os.path.getsize(os.path.join(app.static_folder, item)) for item in files)
+            size, gz_size, br_size = compress_file(os.path.join(output_dir, filename))
+            for index, value in enumerate((source_size, size, gz_size, br_size)):
+                totals[index] += value
+            print(f"   ✓ {name}: {len(files)} arquivos → {filename} | {source_size / 1024:.1f} KB → "
+                  f"{size / 1024:.1f} KB (gzip {gz_size / 1024:.1f} KB, br {br_size / 1024:.1f} KB)")
+
+    manifest_path = os.path.join(output_dir, 'manifest.json')
+    with open(manifest_path) as f:
+        manifest = json.load(f)
+    print(f"📝 Manifest: {len(manifest)} bundles em {manifest_path}")
+
+    if not keep_old:
+        removed = remove_old_bundles(output_dir, current_files)
+        if removed:
+            print(f"🗑️  {removed} arquivos de builds anteriores removidos")
+
+    print(f"\n📊 Total: {totals[0] / 1024:.1f} KB de fontes → {totals[1] / 1024:.1f} KB minificados, "
+          f"{totals[2] / 1024:.1f} KB com gzip, {totals[3] / 1024:.1f} KB com brotli "
+          f"({time.perf_counter() - started:.2f}s)")
+    return True
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Gera os bundles de CSS/JS com hash e versões pré-comprimidas')
+    parser.add_argument('--keep-old', action='store_true', help='Mantém os bundles de builds anteriores')
+    args = parser.parse_args()
+
+    try:
+        if not build_assets(args.keep_old):
+            sys.exit(1)
+    except Exception as e:
+        print(f"❌ Erro ao gerar os bundles: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Script para atualizar as recomendações "quem baixou também baixou"
+Execute no Shell do Render, localmente ou em um cron job:
+
+    python build_recommendations.py             # processa os downloads novos
+    python build_recommendations.py --rebuild   # zera o checkpoint e reprocessa tudo
+
+O processamento é incremental: o id do último download processado fica salvo
+na tabela job_checkpoints, então cada execução só lê os downloads novos. O app
+já processa os downloads novos logo após consolidá-los; o script serve para
+reprocessar tudo (--rebuild) ou alcançar um backlog grande.
+"""
+
+import argparse
+import sys
+import time
+
+from app import (app, db, CoDownloadPair, CoDownloadNeighbor, JobCheckpoint,
+                 CO_DOWNLOAD_CHECKPOINT, update_co_download_index)
+
+
+def build_recommendations(rebuild=False, batch_size=5000):
+    """Processa os downloads pendentes em lotes até alcançar o último registro"""
+    with app.app_context():
+        if rebuild:
+            print("🔄 Apagando matriz de co-ocorrência e checkpoint...")
+            CoDownloadPair.query.delete()
+            CoDownloadNeighbor.query.delete()
+            JobCheckpoint.set_last_id(CO_DOWNLOAD_CHECKPOINT, 0)
+            db.session.commit()
+
+        started = time.perf_counter()
+        total_downloads = 0
+        total_posts = 0
+        while True:
+            processed, refreshed = update_co_download_index(batch_size)
+            if not processed:
+                break
+            total_downloads += processed
+            total_posts += refreshed
+            print(f"   Lote: {processed} downloads, {refreshed} posts recalculados "
+                  f"(checkpoint {JobCheckpoint.get_last_id(CO_DOWNLOAD_CHECKPOINT)})")
+        elapsed = time.perf_counter() - started
+
+        print(f"✅ {total_downloads} downloads processados em {elapsed:.2f}s "
+              f"({CoDownloadPair.query.count()} pares, {CoDownloadNeighbor.query.count()} recomendações)")
+        return total_downloads
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Atualiza as recomendações por co-download')
+    parser.add_argument('--rebuild', action='store_true', help='Reprocessa todos os downloads')
+    parser.add_argument('--batch-size', type=int, default=5000, help='Downloads por lote')
+    args = parser.parse_args()
+
+    try:
+        build_recommendations(args.rebuild, args.batch_size)
+    except Exception as e:
+        print(f"❌ Erro ao atualizar recomendações: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
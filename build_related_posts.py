@@ -0,0 +1,62 @@
+#!/usr/bin/env python3
+"""
+Script para calcular a tabela de posts relacionados (similaridade TF-IDF)
+Execute no Shell do Render ou localmente:
+
+    python build_related_posts.py             # recalcula posts novos ou ainda sem vizinhos
+    python build_related_posts.py --full      # reconstrói a tabela e o modelo TF-IDF
+    python build_related_posts.py --post 12   # recalcula um post (e quem é afetado por ele)
+
+Edições feitas pelo painel já disparam o recálculo incremental automaticamente,
+a partir do modelo gravado em instance/related_tfidf.npz (sem ele, os workers web
+não recalculam nada). Este script serve para a carga inicial, para posts criados
+fora do ORM (ex: importação em massa) e, com --full, para recalibrar de tempos em
+tempos o vocabulário e o IDF, que o recálculo incremental mantém fixos.
+"""
+
+import argparse
+import sys
+import time
+
+from app import app, db, Post, RelatedPost, refresh_related_posts
+
+
+def build_related_posts(full=False, post_ids=None):
+    """Executa o recálculo e mostra o tempo gasto"""
+    with app.app_context():
+        if not full and not post_ids:
+            # Posts ativos que ainda não têm vizinhos calculados
+            post_ids = db.session.execute(
+                db.select(Post.id)
+                .outerjoin(RelatedPost, RelatedPost.post_id == Post.id)
+                .where(Post.is_active == True, RelatedPost.id.is_(None))
+            ).scalars().all()
+            if not post_ids:
+                print("✓ Todos os posts já têm relacionados calculados")
+                return 0
+
+        started = time.perf_counter()
+        refreshed = refresh_related_posts(None if full else post_ids)
+        elapsed = time.perf_counter() - started
+
+        total_rows = RelatedPost.query.count()
+        print(f"✅ {refreshed} posts recalculados em {elapsed:.2f}s ({total_rows} relações na tabela)")
+        return refreshed
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Calcula os posts relacionados por similaridade de conteúdo')
+    parser.add_argument('--full', action='store_true', help='Reconstrói a tabela e o modelo TF-IDF')
+    parser.add_argument('--post', type=int, action='append', dest='post_ids', help='Id de post a recalcular')
+    args = parser.parse_args()
+
+    try:
+        build_related_posts(args.full, args.post_ids)
+    except ImportError:
+        print("❌ NumPy não está instalado (pip install -r requirements.txt)")
+        sys.exit(1)
+    except Exception as e:
+        print(f"❌ Erro ao calcular posts relacionados: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
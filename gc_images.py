@@ -0,0 +1,310 @@
+#!/usr/bin/env python3
+"""
+Script para remover imagens órfãs (sem referência no banco)
+Execute no Shell do Render ou localmente:
+
+    python gc_images.py --dry-run             # apenas lista o que seria removido
+    python gc_images.py                       # move os órfãos para a quarentena
+    python gc_images.py --delete              # apaga os órfãos definitivamente
+    python gc_images.py --cloudinary          # também verifica o Cloudinary
+
+Por padrão os arquivos órfãos são movidos para instance/image_quarantine/<data>/,
+mantendo a estrutura de pastas, para que possam ser restaurados se necessário.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import time
+from datetime import datetime
+
+from app import app, db, Post, User, ImageAsset, cloudinary_public_id, get_cloudinary
+
+# Pastas (relativas a static/) que recebem uploads
+UPLOAD_DIRS = ['images/posts', 'uploads/profiles']
+# Imagens padrão que nunca devem ser removidas
+PROTECTED_IMAGES = {'default.jpg', 'default_profile.jpg', 'admin-avatar.jpg', 'post-placeholder.svg'}
+
+CLOUDINARY_PREFIX = 'mundodainformatica/'
+CLOUDINARY_BATCH_SIZE = 100  # Limite da API do Cloudinary para delete_resources
+
+QUARANTINE_ROOT = os.path.join(app.instance_path, 'image_quarantine')
+STREAM_BATCH_SIZE = 1000  # Linhas lidas por vez do banco
+
+
+def static_candidates(image_path):
+    """Caminhos relativos a static/ que um valor salvo no banco pode representar"""
+    image_path = image_path.strip().lstrip('/')
+    if image_path.startswith('static/'):
+        image_path = image_path[7:]
+
+    if image_path.startswith(('images/', 'uploads/')):
+        return [image_path]
+    if image_path.startswith('posts/'):
+        return [f'images/{image_path}']
+    # Apenas o nome do arquivo (perfil local ou imagem de post antiga)
+    return [f'uploads/profiles/{image_path}', f'images/posts/{image_path}', f'images/{image_path}']
+
+
+def collect_references():
+    """
+    Percorre Post.image_url, Post.thumbnail e User.profile_image em lotes
+    (sem carregar objetos ORM) e monta os conjuntos de referências.
+
+    Returns:
+        tuple: (caminhos locais relativos a static/, public_ids do Cloudinary)
+    """
+    local_refs = set()
+    cloudinary_refs = set()
+    queries = [
+        db.select(Post.image_url, Post.thumbnail),
+        db.select(User.profile_image),
+    ]
+
+    for query in queries:
+        result = db.session.execute(query.execution_options(yield_per=STREAM_BATCH_SIZE))
+        for row in result:
+            for value in row:
+                if not value:
+                    continue
+                if value.startswith(('http://', 'https://')):
+                    public_id = cloudinary_public_id(value)
+                    if public_id:
+                        cloudinary_refs.add(public_id)
+                    continue
+                local_refs.update(static_candidates(value))
+
+    return local_refs, cloudinary_refs
+
+
+def find_local_orphans(static_root, local_refs, min_age):
+    """Lista (caminho relativo, tamanho) dos arquivos sem referência"""
+    cutoff = time.time() - min_age
+    orphans = []
+
+    for upload_dir in UPLOAD_DIRS:
+        base_dir = os.path.join(static_root, upload_dir)
+        for root, _, files in os.walk(base_dir):
+            for name in sorted(files):
+                full_path = os.path.join(root, name)
+                rel_path = os.path.relpath(full_path, static_root).replace(os.sep, '/')
+
+                if name in PROTECTED_IMAGES or name.startswith('.') or rel_path in local_refs:
+                    continue
+
+                stat = os.stat(full_path)
+                # Arquivos recentes podem pertencer a um upload ainda não salvo no banco
+                if stat.st_mtime > cutoff:
+                    continue
+
+                orphans.append((rel_path, stat.st_size))
+
+    return orphans
+
+
+def remove_local_orphans(static_root, orphans, delete=False, batch_size=200):
+    """Move para a quarentena (ou apaga) os órfãos em lotes"""
+    quarantine_dir = os.path.join(QUARANTINE_ROOT, datetime.now().strftime('%Y%m%d%H%M%S'))
+    removed = []
+
+    for start in range(0, len(orphans), batch_size):
+        batch = orphans[start:start + batch_size]
+        batch_removed = []
+        for rel_path, size in batch:
+            full_path = os.path.join(static_root, rel_path)
+            try:
+                if delete:
+                    os.remove(full_path)
+                else:
+                    target = os.path.join(quarantine_dir, rel_path)
+                    os.makedirs(os.path.dirname(target), exist_ok=True)
+                    shutil.move(full_path, target)
+                batch_removed.append((rel_path, size))
+            except OSError as e:
+                print(f"   ⚠️  Não foi possível remover {rel_path}: {e}")
+
+        # Remover do registro de imagens (deduplicação) os arquivos que saíram do disco
+        removed.extend(batch_removed)
+        filenames = [os.path.basename(rel_path) for rel_path, _ in batch_removed]
+        try:
+            ImageAsset.query.filter(ImageAsset.url.in_(filenames)).delete(synchronize_session=False)
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            print(f"   ⚠️  Erro ao limpar registro de imagens: {e}")
+
+        print(f"   Lote {start // batch_size + 1}: {len(batch)} arquivos processados")
+
+    return removed, quarantine_dir
+
+
+def find_cloudinary_orphans(cloudinary_refs, min_age):
+    """Lista (public_id, bytes) dos recursos do Cloudinary sem referência"""
+    cloudinary = get_cloudinary()
+    orphans = []
+    next_cursor = None
+    cutoff = datetime.utcnow().timestamp() - min_age
+
+    while True:
+        params = {'type': 'upload', 'prefix': CLOUDINARY_PREFIX, 'max_results': 500}
+        if next_cursor:
+            params['next_cursor'] = next_cursor
+        response = cloudinary.api.resources(**params)
+
+        for resource in response.get('resources', []):
+            public_id = resource['public_id']
+            if public_id in cloudinary_refs or public_id.startswith(f'{CLOUDINARY_PREFIX}quarantine/'):
+                continue
+            created_at = resource.get('created_at')
+            if created_at:
+                created = datetime.strptime(created_at, '%Y-%m-%dT%H:%M:%SZ')
+                if created.timestamp() > cutoff:
+                    continue
+            orphans.append((public_id, resource.get('bytes', 0)))
+
+        next_cursor = response.get('next_cursor')
+        if not next_cursor:
+            return orphans
+
+
+def forget_cloudinary_assets(public_ids):
+    """Remove do registro de imagens (deduplicação) as URLs dos recursos removidos do Cloudinary"""
+    public_ids = set(public_ids)
+    if not public_ids:
+        return 0
+    try:
+        rows = db.session.execute(
+            db.select(ImageAsset.id, ImageAsset.url).where(ImageAsset.url.like('http%'))
+        )
+        asset_ids = [asset_id for asset_id, url in rows if cloudinary_public_id(url) in public_ids]
+        if asset_ids:
+            ImageAsset.query.filter(ImageAsset.id.in_(asset_ids)).delete(synchronize_session=False)
+        db.session.commit()
+        return len(asset_ids)
+    except Exception as e:
+        db.session.rollback()
+        print(f"   ⚠️  Erro ao limpar registro de imagens: {e}")
+        return 0
+
+
+def remove_cloudinary_orphans(orphans, delete=False):
+    """Move para a pasta de quarentena (ou apaga) os recursos órfãos do Cloudinary"""
+    cloudinary = get_cloudinary()
+    removed = []
+
+    for start in range(0, len(orphans), CLOUDINARY_BATCH_SIZE):
+        batch = orphans[start:start + CLOUDINARY_BATCH_SIZE]
+        batch_removed = []
+        failed = False
+        try:
+            if delete:
+                response = cloudinary.api.delete_resources([public_id for public_id, _ in batch])
+                deleted = response.get('deleted', {})
+                batch_removed.extend(item for item in batch if deleted.get(item[0]) == 'deleted')
+            else:
+                for public_id, size in batch:
+                    target = f"{CLOUDINARY_PREFIX}quarantine/{public_id[len(CLOUDINARY_PREFIX):]}"
+                    cloudinary.uploader.rename(public_id, target)
+                    batch_removed.append((public_id, size))
+        except Exception as e:
+            print(f"   ⚠️  Erro no lote {start // CLOUDINARY_BATCH_SIZE + 1} do Cloudinary: {e}")
+            failed = True
+
+        # A URL antiga deixa de existir: não pode mais ser reaproveitada pela deduplicação
+        removed.extend(batch_removed)
+        forget_cloudinary_assets(public_id for public_id, _ in batch_removed)
+        if failed:
+            continue
+
+        print(f"   Lote {start // CLOUDINARY_BATCH_SIZE + 1}: {len(batch)} recursos processados")
+
+    return removed
+
+
+def format_bytes(size):
+    """Formata um tamanho em bytes"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(size) < 1024.0:
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} TB"
+
+
+def gc_images(dry_run=False, delete=False, include_cloudinary=False, min_age_hours=24, batch_size=200):
+    """Encontra e remove imagens órfãs, retornando o total de bytes recuperados"""
+    static_root = app.static_folder
+    min_age = min_age_hours * 3600
+
+    with app.app_context():
+        started = time.perf_counter()
+        local_refs, cloudinary_refs = collect_references()
+        print(f"🔎 Referências no banco: {len(local_refs)} caminhos locais, {len(cloudinary_refs)} no Cloudinary")
+
+        orphans = find_local_orphans(static_root, local_refs, min_age)
+        orphan_bytes = sum(size for _, size in orphans)
+        print(f"🗑️  {len(orphans)} arquivos órfãos no disco ({format_bytes(orphan_bytes)})")
+        for rel_path, size in orphans:
+            print(f"   • {rel_path} ({format_bytes(size)})")
+
+        cloud_orphans = []
+        if include_cloudinary:
+            try:
+                cloud_orphans = find_cloudinary_orphans(cloudinary_refs, min_age)
+            except Exception as e:
+                print(f"❌ Erro ao listar recursos do Cloudinary: {e}")
+            cloud_bytes = sum(size for _, size in cloud_orphans)
+            print(f"☁️  {len(cloud_orphans)} recursos órfãos no Cloudinary ({format_bytes(cloud_bytes)})")
+            for public_id, size in cloud_orphans:
+                print(f"   • {public_id} ({format_bytes(size)})")
+
+        if dry_run:
+            print("\n💡 DRY RUN: nada foi alterado")
+            return {'orphans': len(orphans) + len(cloud_orphans), 'reclaimed_bytes': 0}
+
+        action = 'Apagando' if delete else 'Movendo para a quarentena'
+        removed, quarantine_dir = [], None
+        if orphans:
+            print(f"\n{action} arquivos locais...")
+            removed, quarantine_dir = remove_local_orphans(static_root, orphans, delete, batch_size)
+
+        cloud_removed = []
+        if cloud_orphans:
+            print(f"\n{action} recursos do Cloudinary...")
+            cloud_removed = remove_cloudinary_orphans(cloud_orphans, delete)
+
+        local_reclaimed = sum(size for _, size in removed)
+        cloud_reclaimed = sum(size for _, size in cloud_removed)
+        elapsed = time.perf_counter() - started
+
+        print("\n📊 Resumo")
+        print(f"   Disco: {len(removed)} arquivos, {format_bytes(local_reclaimed)} recuperados")
+        if include_cloudinary:
+            print(f"   Cloudinary: {len(cloud_removed)} recursos, {format_bytes(cloud_reclaimed)} recuperados")
+        if removed and not delete:
+            print(f"   Quarentena: {quarantine_dir}")
+        print(f"   Tempo: {elapsed:.2f}s")
+
+        return {
+            'orphans': len(orphans) + len(cloud_orphans),
+            'removed': len(removed) + len(cloud_removed),
+            'reclaimed_bytes': local_reclaimed + cloud_reclaimed,
+        }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Remove imagens sem referência no banco')
+    parser.add_argument('--dry-run', action='store_true', help='Apenas lista os órfãos')
+    parser.add_argument('--delete', action='store_true', help='Apaga em vez de mover para a quarentena')
+    parser.add_argument('--cloudinary', action='store_true', help='Também verifica os recursos do Cloudinary')
+    parser.add_argument('--min-age', type=float, default=24, help='Ignora arquivos mais novos que N horas (padrão: 24)')
+    parser.add_argument('--batch-size', type=int, default=200, help='Arquivos por lote')
+    args = parser.parse_args()
+
+    try:
+        gc_images(args.dry_run, args.delete, args.cloudinary, args.min_age, args.batch_size)
+    except Exception as e:
+        print(f"❌ Erro ao remover imagens órfãs: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
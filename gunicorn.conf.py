@@ -0,0 +1,21 @@
+"""
+Configuração do gunicorn (lida automaticamente de ./gunicorn.conf.py)
+
+O app é importado uma única vez no master (preload_app) e os workers nascem por
+fork, compartilhando com o master as páginas de memória do código, dos modelos e
+das rotas. gc.freeze() tira esses objetos do alcance do coletor de lixo: sem ele,
+a primeira coleta em cada worker escreve nos cabeçalhos dos objetos e o
+copy-on-write duplica as páginas em todos os workers.
+
+Meça com: python bench_startup.py
+"""
+
+import gc
+
+preload_app = True
+
+
+def when_ready(server):
+    # Master pronto (app já importado), antes do fork dos workers
+    gc.collect()
+    gc.freeze()
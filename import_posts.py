@@ -0,0 +1,76 @@
+#!/usr/bin/env python3
+"""
+Script para importar posts em massa (CSV, JSON ou JSON Lines)
+Execute no Shell do Render ou localmente:
+
+    python import_posts.py posts.csv
+    python import_posts.py posts.jsonl --duplicates overwrite --fetch-images
+
+Usa o mesmo motor da página /admin/tools/import, sem o limite de tamanho do upload.
+As colunas do arquivo devem ter os nomes dos campos (title, content, category,
+download_link, tags, status, author, date_posted, featured_image, ...).
+"""
+
+import argparse
+import os
+import sys
+import time
+
+from app import app, User, PostImporter, iter_import_rows
+
+
+def import_posts(path, duplicate_action='skip', fetch_images=False, author=None, chunk_size=1000):
+    """Importa o arquivo e imprime o relatório de cada lote"""
+    file_format = os.path.splitext(path)[1].lstrip('.').lower()
+
+    with app.app_context():
+        author_id = None
+        if author:
+            user = User.query.filter((User.username == author) | (User.email == author)).first()
+            if not user:
+                print(f"❌ Autor não encontrado: {author}")
+                return None
+            author_id = user.id
+
+        importer = PostImporter(duplicate_action=duplicate_action, ignore_errors=True,
+                                fetch_images=fetch_images, author_id=author_id, chunk_size=chunk_size)
+
+        started = time.perf_counter()
+        with open(path, 'rb') as f:
+            for report in importer.run(iter_import_rows(f, file_format)):
+                last_line = report['first_line'] + report['processed'] - 1
+                print(f"   Lote {report['chunk']} (linhas {report['first_line']}-{last_line}): "
+                      f"{report['imported']} importados, {report['updated']} atualizados, "
+                      f"{report['skipped']} pulados, {len(report['errors'])} erros")
+                for error in report['errors'][:5]:
+                    print(f"      ✗ Linha {error['line']}: {error['message']}")
+                for warning in report['warnings'][:5]:
+                    print(f"      ⚠️  {warning}")
+        elapsed = time.perf_counter() - started
+
+        totals = importer.totals
+        print("\n📊 Resumo")
+        print(f"   Processados: {totals['processed']} | Importados: {totals['imported']} | "
+              f"Atualizados: {totals['updated']} | Pulados: {totals['skipped']} | Erros: {totals['errors']}")
+        if elapsed > 0:
+            print(f"   Tempo: {elapsed:.2f}s | {totals['processed'] / elapsed:.0f} registros/s")
+        return totals
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Importa posts de um arquivo CSV/JSON')
+    parser.add_argument('path', help='Arquivo .csv, .json ou .jsonl')
+    parser.add_argument('--duplicates', choices=['skip', 'overwrite', 'keep'], default='skip',
+                        help='O que fazer com posts que já existem (mesmo slug)')
+    parser.add_argument('--fetch-images', action='store_true', help='Baixa e otimiza imagens externas')
+    parser.add_argument('--author', help='Username ou email do autor padrão')
+    parser.add_argument('--chunk-size', type=int, default=1000, help='Registros por lote')
+    args = parser.parse_args()
+
+    try:
+        import_posts(args.path, args.duplicates, args.fetch_images, args.author, args.chunk_size)
+    except Exception as e:
+        print(f"❌ Erro ao importar posts: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
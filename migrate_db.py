@@ -1,8 +1,12 @@
 import sqlite3
 import os
+import re
 
 # Path to the database
 db_path = os.path.join('instance', 'site.db')
+# Tabelas de telemetria (visitor_logs, post_stats, admin_activities) ficam em outro arquivo
+telemetry_path = os.path.join('instance', 'telemetry.db')
+TELEMETRY_TABLES = ['visitor_logs', 'post_stats', 'admin_activities']
 
 def migrate():
     if not os.path.exists(db_path):
@@ -10,6 +14,8 @@ def migrate():
         return
 
     conn = sqlite3.connect(db_path)
+    # ATTACH não pode rodar dentro de uma transação: anexar antes das migrações
+    conn.execute("ATTACH DATABASE ? AS telemetry", (telemetry_path,))
     cursor = conn.cursor()
 
     try:
@@ -56,6 +62,12 @@ def migrate():
             migrations_applied = True
             print("✓ week_reset_date column added")
 
+        if 'favorites_version' not in columns:
+            print("Adding favorites_version column...")
+            cursor.execute("ALTER TABLE user ADD COLUMN favorites_version INTEGER NOT NULL DEFAULT 0")
+            migrations_applied = True
+            print("✓ favorites_version column added")
+
         # Verificar se tabela transactions existe
         cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='transactions'")
         transactions_table_exists = cursor.fetchone() is not None
@@ -135,6 +147,252 @@ def migrate():
                 migrations_applied = True
                 print("✓ transactions table recreated with correct constraints")
 
+        # Registro de imagens enviadas (deduplicação de uploads)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='image_registry'")
+        if not cursor.fetchone():
+            print("Creating image_registry table...")
+            cursor.execute("""
+                CREATE TABLE image_registry (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    content_hash VARCHAR(64) NOT NULL,
+                    phash VARCHAR(16) NULL,
+                    phash_band0 INTEGER NULL,
+                    phash_band1 INTEGER NULL,
+                    phash_band2 INTEGER NULL,
+                    phash_band3 INTEGER NULL,
+                    url VARCHAR(500) NOT NULL,
+                    folder VARCHAR(50) NOT NULL DEFAULT 'profiles',
+                    file_size INTEGER NULL,
+                    width INTEGER NULL,
+                    height INTEGER NULL,
+                    reuse_count INTEGER DEFAULT 0,
+                    created_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            for column in ('content_hash', 'phash_band0', 'phash_band1', 'phash_band2', 'phash_band3', 'url'):
+                cursor.execute(f"CREATE INDEX ix_image_registry_{column} ON image_registry ({column})")
+            migrations_applied = True
+            print("✓ image_registry table created")
+
+        # Posts relacionados pré-calculados (build_related_posts.py)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='related_posts'")
+        if not cursor.fetchone():
+            print("Creating related_posts table...")
+            cursor.execute("""
+                CREATE TABLE related_posts (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    post_id INTEGER NOT NULL,
+                    related_post_id INTEGER NOT NULL,
+                    rank INTEGER NOT NULL,
+                    score FLOAT NOT NULL,
+                    computed_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (post_id) REFERENCES posts (id),
+                    FOREIGN KEY (related_post_id) REFERENCES posts (id)
+                )
+            """)
+            cursor.execute("CREATE INDEX ix_related_posts_post_rank ON related_posts (post_id, rank)")
+            cursor.execute("CREATE INDEX ix_related_posts_related_post_id ON related_posts (related_post_id)")
+            migrations_applied = True
+            print("✓ related_posts table created")
+
+        # Recomendações por co-download (build_recommendations.py)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='co_download_pairs'")
+        if not cursor.fetchone():
+            print("Creating co-download recommendation tables...")
+            cursor.execute("""
+                CREATE TABLE co_download_pairs (
+                    post_a INTEGER NOT NULL,
+                    post_b INTEGER NOT NULL,
+                    count INTEGER NOT NULL DEFAULT 0,
+                    PRIMARY KEY (post_a, post_b)
+                )
+            """)
+            cursor.execute("""
+                CREATE TABLE co_download_neighbors (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    post_id INTEGER NOT NULL,
+                    neighbor_post_id INTEGER NOT NULL,
+                    rank INTEGER NOT NULL,
+                    score FLOAT NOT NULL,
+                    users INTEGER NOT NULL
+                )
+            """)
+            cursor.execute("CREATE INDEX ix_co_download_neighbors_post_rank ON co_download_neighbors (post_id, rank)")
+            migrations_applied = True
+            print("✓ co_download_pairs and co_download_neighbors tables created")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='job_checkpoints'")
+        if not cursor.fetchone():
+            print("Creating job_checkpoints table...")
+            cursor.execute("""
+                CREATE TABLE job_checkpoints (
+                    name VARCHAR(50) PRIMARY KEY,
+                    last_id INTEGER NOT NULL DEFAULT 0,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            migrations_applied = True
+            print("✓ job_checkpoints table created")
+
+        # Pontuação "em alta" dos posts
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='post_trending'")
+        if not cursor.fetchone():
+            print("Creating post_trending table...")
+            cursor.execute("""
+                CREATE TABLE post_trending (
+                    post_id INTEGER PRIMARY KEY,
+                    base FLOAT NOT NULL DEFAULT 0,
+                    score FLOAT NOT NULL DEFAULT 0,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP,
+                    FOREIGN KEY (post_id) REFERENCES posts (id)
+                )
+            """)
+            cursor.execute("CREATE INDEX ix_post_trending_score ON post_trending (score)")
+            migrations_applied = True
+            print("✓ post_trending table created")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='ix_post_stats_date'")
+        if not cursor.fetchone():
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='post_stats'")
+            if cursor.fetchone():
+                cursor.execute("CREATE INDEX ix_post_stats_date ON post_stats (date)")
+                migrations_applied = True
+                print("✓ post_stats.date index created")
+
+        # Versões do conteúdo (invalidação do cache de páginas)
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='content_versions'")
+        if not cursor.fetchone():
+            print("Creating content_versions table...")
+            cursor.execute("""
+                CREATE TABLE content_versions (
+                    name VARCHAR(30) PRIMARY KEY,
+                    version INTEGER NOT NULL DEFAULT 0
+                )
+            """)
+            migrations_applied = True
+            print("✓ content_versions table created")
+
+        cursor.execute("PRAGMA table_info(content_versions)")
+        if 'updated_at' not in [info[1] for info in cursor.fetchall()]:
+            print("Adding content_versions.updated_at column...")
+            cursor.execute("ALTER TABLE content_versions ADD COLUMN updated_at DATETIME")
+            migrations_applied = True
+            print("✓ content_versions.updated_at column added")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='ix_comments_post_approved_date'")
+        if not cursor.fetchone():
+            cursor.execute("CREATE INDEX ix_comments_post_approved_date ON comments (post_id, is_approved, date_posted, id)")
+            migrations_applied = True
+            print("✓ comments pagination index created")
+
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='index' AND name='ix_favorites_user_date'")
+        if not cursor.fetchone():
+            cursor.execute("CREATE INDEX ix_favorites_user_date ON favorites (user_id, date_added, id)")
+            migrations_applied = True
+            print("✓ favorites pagination index created")
+
+        # Log de downloads: dados da requisição e checkpoint dos contadores derivados
+        cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='download'")
+        if cursor.fetchone():
+            cursor.execute("PRAGMA table_info(download)")
+            download_columns = [info[1] for info in cursor.fetchall()]
+            if 'ip_address' not in download_columns:
+                print("Adding download.ip_address column...")
+                cursor.execute("ALTER TABLE download ADD COLUMN ip_address VARCHAR(45)")
+                migrations_applied = True
+                print("✓ download.ip_address column added")
+            if 'user_agent' not in download_columns:
+                print("Adding download.user_agent column...")
+                cursor.execute("ALTER TABLE download ADD COLUMN user_agent VARCHAR(500)")
+                migrations_applied = True
+                print("✓ download.user_agent column added")
+
+            # Downloads existentes já foram contados em posts/post_stats/admin_activities
+            cursor.execute("SELECT 1 FROM job_checkpoints WHERE name = 'download_rollup'")
+            if not cursor.fetchone():
+                cursor.execute("""
+                    INSERT INTO job_checkpoints (name, last_id, updated_at)
+                    SELECT 'download_rollup', COALESCE(MAX(id), 0), CURRENT_TIMESTAMP FROM download
+                """)
+                migrations_applied = True
+                print("✓ download_rollup checkpoint created")
+
+            # Histórico: último download de cada post, preenchido a partir do log
+            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='user_download_latest'")
+            if not cursor.fetchone():
+                print("Creating user_download_latest table...")
+                cursor.execute("""
+                    CREATE TABLE user_download_latest (
+                        user_id INTEGER NOT NULL,
+                        post_id INTEGER NOT NULL,
+                        last_at DATETIME NOT NULL,
+                        count INTEGER NOT NULL DEFAULT 1,
+                        last_download_id INTEGER NOT NULL,
+                        PRIMARY KEY (user_id, post_id),
+                        FOREIGN KEY (user_id) REFERENCES user (id),
+                        FOREIGN KEY (post_id) REFERENCES posts (id)
+                    )
+                """)
+                cursor.execute("CREATE INDEX ix_user_download_latest_user_last_at ON user_download_latest (user_id, last_at)")
+                cursor.execute("""
+                    INSERT INTO user_download_latest (user_id, post_id, last_at, count, last_download_id)
+                    SELECT user_id, post_id, MAX(timestamp), COUNT(*), MAX(id)
+                    FROM download
+                    WHERE timestamp IS NOT NULL
+                    GROUP BY user_id, post_id
+                """)
+                migrations_applied = True
+                print(f"✓ user_download_latest table created ({cursor.rowcount} entries)")
+
+        # Mover as tabelas de telemetria para o banco próprio (mesma transação)
+        for table in TELEMETRY_TABLES:
+            cursor.execute("SELECT sql FROM main.sqlite_master WHERE type='table' AND name=?", (table,))
+            row = cursor.fetchone()
+            if not row:
+                continue
+
+            print(f"Moving {table} to telemetry database...")
+            cursor.execute("SELECT name FROM telemetry.sqlite_master WHERE type='table' AND name=?", (table,))
+            if not cursor.fetchone():
+                cursor.execute(re.sub(r'^CREATE TABLE\s+"?' + table + '"?', f'CREATE TABLE telemetry.{table}', row[0]))
+
+            cursor.execute(f"PRAGMA main.table_info({table})")
+            main_columns = [info[1] for info in cursor.fetchall()]
+            cursor.execute(f"PRAGMA telemetry.table_info({table})")
+            telemetry_columns = {info[1] for info in cursor.fetchall()}
+            cursor.execute(f"SELECT COUNT(*) FROM telemetry.{table}")
+            # Se o app já criou a tabela e gravou linhas novas, os ids antigos são renumerados
+            keep_ids = cursor.fetchone()[0] == 0
+            columns = ', '.join(c for c in main_columns if c in telemetry_columns and (keep_ids or c != 'id'))
+            cursor.execute(f"INSERT INTO telemetry.{table} ({columns}) SELECT {columns} FROM main.{table} ORDER BY id")
+            moved = cursor.rowcount
+
+            cursor.execute("SELECT sql FROM main.sqlite_master WHERE type='index' AND tbl_name=? AND sql IS NOT NULL", (table,))
+            for (index_sql,) in cursor.fetchall():
+                cursor.execute(re.sub(r'^CREATE (UNIQUE )?INDEX\s+"?(\w+)"?', r'CREATE \1INDEX IF NOT EXISTS telemetry.\2', index_sql))
+
+            cursor.execute(f"DROP TABLE main.{table}")
+            migrations_applied = True
+            print(f"✓ {table} moved to telemetry database ({moved} rows)")
+
+        cursor.execute("SELECT name FROM telemetry.sqlite_master WHERE type='table' AND name='telemetry_checkpoints'")
+        if not cursor.fetchone():
+            print("Creating telemetry_checkpoints table...")
+            cursor.execute("""
+                CREATE TABLE telemetry.telemetry_checkpoints (
+                    name VARCHAR(50) PRIMARY KEY,
+                    last_id INTEGER NOT NULL DEFAULT 0,
+                    updated_at DATETIME DEFAULT CURRENT_TIMESTAMP
+                )
+            """)
+            # Mesmo ponto de partida do checkpoint dos contadores do banco principal
+            cursor.execute("""
+                INSERT INTO telemetry.telemetry_checkpoints (name, last_id, updated_at)
+                SELECT name, last_id, CURRENT_TIMESTAMP FROM main.job_checkpoints WHERE name = 'download_rollup'
+            """)
+            migrations_applied = True
+            print("✓ telemetry_checkpoints table created")
+
         if migrations_applied:
             conn.commit()
             print("\n✅ All migrations completed successfully!")
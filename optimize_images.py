@@ -0,0 +1,355 @@
+#!/usr/bin/env python3
+"""
+Script para converter a biblioteca de imagens locais para WebP/AVIF
+Execute no Shell do Render ou localmente:
+
+    python optimize_images.py                 # converte para WebP
+    python optimize_images.py --format avif   # converte para AVIF
+    python optimize_images.py --dry-run       # apenas lista o que seria feito
+
+As imagens são processadas em paralelo (um processo por núcleo). Um manifesto
+em instance/image_manifest.json guarda o que já foi otimizado, então execuções
+seguintes só processam arquivos novos ou alterados.
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+from PIL import Image, ImageOps
+from sqlalchemy import bindparam
+
+from app import app, db, Post, User, bump_content_version
+
+# Pastas (relativas a static/) que serão percorridas
+IMAGE_DIRS = ['images', 'uploads/profiles']
+SOURCE_EXTENSIONS = {'.jpg', '.jpeg', '.png', '.gif', '.bmp', '.tif', '.tiff'}
+OUTPUT_FORMATS = {
+    'webp': ('WEBP', '.webp', {'quality': 80, 'method': 6}),
+    'avif': ('AVIF', '.avif', {'quality': 60, 'speed': 6}),
+}
+
+MANIFEST_PATH = os.path.join(app.instance_path, 'image_manifest.json')
+BATCH_SIZE = 500  # Atualizações de referências por transação
+
+
+def load_manifest():
+    """Carrega o manifesto de imagens já processadas"""
+    if not os.path.exists(MANIFEST_PATH):
+        return {}
+    try:
+        with open(MANIFEST_PATH, 'r', encoding='utf-8') as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        print("⚠️  Manifesto inválido, todas as imagens serão reprocessadas")
+        return {}
+
+
+def save_manifest(manifest):
+    """Grava o manifesto de forma atômica"""
+    os.makedirs(os.path.dirname(MANIFEST_PATH), exist_ok=True)
+    tmp_path = f"{MANIFEST_PATH}.tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    os.replace(tmp_path, MANIFEST_PATH)
+
+
+def collect_images(static_root, manifest):
+    """Percorre as pastas de imagens e retorna (a processar, ignoradas)"""
+    outputs = {entry.get('output') for entry in manifest.values() if entry.get('output')}
+    pending = []
+    skipped = 0
+
+    for image_dir in IMAGE_DIRS:
+        base_dir = os.path.join(static_root, image_dir)
+        for root, _, files in os.walk(base_dir):
+            for name in sorted(files):
+                full_path = os.path.join(root, name)
+                rel_path = os.path.relpath(full_path, static_root).replace(os.sep, '/')
+
+                if os.path.splitext(name)[1].lower() not in SOURCE_EXTENSIONS or rel_path in outputs:
+                    continue
+
+                stat = os.stat(full_path)
+                entry = manifest.get(rel_path)
+                if entry and entry.get('mtime') == int(stat.st_mtime) and entry.get('size') == stat.st_size:
+                    skipped += 1
+                    continue
+
+                pending.append((rel_path, full_path))
+
+    return pending, skipped
+
+
+def assign_outputs(pending, manifest, static_root, extension):
+    """
+    Define o arquivo de saída de cada imagem, sem sobrescrever outro arquivo:
+    foo.jpg e foo.png viram foo.webp e foo-png.webp.
+
+    Returns:
+        list: [(caminho relativo, caminho completo, saída relativa)]
+    """
+    pending_sources = {rel_path for rel_path, _ in pending}
+    taken = {entry.get('output') for source, entry in manifest.items()
+             if entry.get('output') and source not in pending_sources}
+    jobs = []
+
+    for rel_path, full_path in pending:
+        stem, source_extension = os.path.splitext(rel_path)
+        previous = (manifest.get(rel_path) or {}).get('output')
+        candidates = [f'{stem}{extension}', f'{stem}-{source_extension[1:].lower()}{extension}']
+        candidates += [f'{stem}-{source_extension[1:].lower()}-{n}{extension}' for n in range(2, 100)]
+
+        for output in candidates:
+            on_disk = os.path.exists(os.path.join(static_root, output))
+            if output not in taken and (not on_disk or output == previous):
+                break
+        else:
+            output = None
+
+        if output:
+            taken.add(output)
+            if output != candidates[0]:
+                print(f"   ⚠️  {candidates[0]} já existe, {rel_path} será salvo como {output}")
+        jobs.append((rel_path, full_path, output))
+
+    return jobs
+
+
+def convert_image(job):
+    """
+    Converte uma imagem (executado nos processos do pool).
+
+    Returns:
+        dict: resultado com status 'converted', 'kept' (saída não ficou menor) ou 'failed'
+    """
+    rel_path, full_path, output, static_root, fmt, max_size, dry_run = job
+    pil_format, extension, options = OUTPUT_FORMATS[fmt]
+
+    stat = os.stat(full_path)
+    result = {
+        'source': rel_path,
+        'output': output,
+        'mtime': int(stat.st_mtime),
+        'size': stat.st_size,
+        'output_size': 0,
+    }
+    if output is None:
+        result['status'] = 'failed'
+        result['error'] = 'nenhum nome de saída livre'
+        return result
+    output_path = os.path.join(static_root, output)
+
+    try:
+        with Image.open(full_path) as img:
+            img = ImageOps.exif_transpose(img)
+            if max_size and max(img.size) > max_size:
+                img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+            if img.mode not in ('RGB', 'RGBA'):
+                img = img.convert('RGBA' if 'transparency' in img.info or img.mode in ('LA', 'PA') else 'RGB')
+
+            from io import BytesIO
+            buffer = BytesIO()
+            img.save(buffer, format=pil_format, **options)
+            data = buffer.getvalue()
+    except Exception as e:
+        result['status'] = 'failed'
+        result['error'] = str(e)
+        return result
+
+    # Só vale a pena trocar se a nova versão for menor
+    if len(data) >= stat.st_size:
+        result['status'] = 'kept'
+        result['output'] = None
+        return result
+
+    if not dry_run:
+        tmp_path = f"{output_path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(data)
+        os.replace(tmp_path, output_path)
+
+    result['status'] = 'converted'
+    result['output_size'] = len(data)
+    return result
+
+
+def reference_variants(rel_path):
+    """Formas como um arquivo pode estar salvo no banco (Post.image_url / User.profile_image)"""
+    variants = [rel_path, f'static/{rel_path}']
+    if rel_path.startswith('images/'):
+        variants.append(rel_path[len('images/'):])  # ex: posts/abc.jpg ou asus_rog.jpg
+    if rel_path.startswith('uploads/profiles/'):
+        variants.append(rel_path[len('uploads/profiles/'):])  # apenas o nome do arquivo
+    return variants
+
+
+def rewrite_references(converted):
+    """
+    Atualiza as referências no banco em transações de até BATCH_SIZE linhas.
+    As variantes de uma mesma imagem ficam sempre no mesmo lote.
+
+    Returns:
+        tuple: (referências atualizadas, origens cujo lote foi gravado, lotes com erro)
+    """
+    posts_table = Post.__table__
+    users_table = User.__table__
+    post_update = posts_table.update().where(
+        posts_table.c.image_url == bindparam('old_path')
+    ).values(image_url=bindparam('new_path'))
+    user_update = users_table.update().where(
+        users_table.c.profile_image == bindparam('old_path')
+    ).values(profile_image=bindparam('new_path'))
+
+    batches = []
+    batch, sources = [], []
+    for result in converted:
+        for old, new in zip(reference_variants(result['source']), reference_variants(result['output'])):
+            batch.append({'old_path': old, 'new_path': new})
+        sources.append(result['source'])
+        if len(batch) >= BATCH_SIZE:
+            batches.append((batch, sources))
+            batch, sources = [], []
+    if batch:
+        batches.append((batch, sources))
+
+    updated = 0
+    committed = set()
+    errors = 0
+    for number, (batch, sources) in enumerate(batches, 1):
+        try:
+            batch_updated = db.session.execute(post_update, batch).rowcount or 0
+            batch_updated += db.session.execute(user_update, batch).rowcount or 0
+            db.session.commit()
+        except Exception as e:
+            db.session.rollback()
+            errors += 1
+            print(f"❌ Erro ao atualizar referências (lote {number}): {e}")
+            continue
+        updated += batch_updated
+        committed.update(sources)
+    return updated, committed, errors
+
+
+def format_bytes(size):
+    """Formata um tamanho em bytes"""
+    for unit in ['B', 'KB', 'MB', 'GB']:
+        if abs(size) < 1024.0:
+            return f"{size:.1f} {unit}"
+        size /= 1024.0
+    return f"{size:.1f} TB"
+
+
+def optimize_images(fmt='webp', max_size=1920, workers=None, dry_run=False, remove_originals=False):
+    """Converte as imagens pendentes e atualiza o banco"""
+    static_root = app.static_folder
+    manifest = load_manifest()
+    pending, skipped = collect_images(static_root, manifest)
+    workers = workers or os.cpu_count() or 1
+
+    print(f"🖼️  {len(pending)} imagens para processar, {skipped} já otimizadas (manifesto)")
+    print(f"   Formato: {fmt.upper()} | Processos: {workers}{' | DRY RUN' if dry_run else ''}")
+
+    started = time.perf_counter()
+    extension = OUTPUT_FORMATS[fmt][1]
+    jobs = [(rel_path, full_path, output, static_root, fmt, max_size, dry_run)
+            for rel_path, full_path, output in assign_outputs(pending, manifest, static_root, extension)]
+    results = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            for result in executor.map(convert_image, jobs, chunksize=8):
+                results.append(result)
+                if result['status'] == 'failed':
+                    print(f"   ✗ {result['source']}: {result['error']}")
+                else:
+                    marker = '✓' if result['status'] == 'converted' else '='
+                    print(f"   {marker} {result['source']}")
+    elapsed = time.perf_counter() - started
+
+    converted = [r for r in results if r['status'] == 'converted']
+    failed = [r for r in results if r['status'] == 'failed']
+    bytes_read = sum(r['size'] for r in results)
+
+    references_updated = 0
+    reference_errors = 0
+    if not dry_run:
+        with app.app_context():
+            references_updated, committed, reference_errors = rewrite_references(converted)
+            if references_updated:
+                # UPDATE fora do ORM: invalidar páginas e comentários em cache com os caminhos antigos
+                bump_content_version('post', 'comment')
+
+        # Lote não gravado: o banco ainda aponta para o original. A saída é descartada e
+        # a imagem fica fora do manifesto para ser reprocessada na próxima execução
+        for result in converted:
+            if result['source'] not in committed:
+                try:
+                    os.remove(os.path.join(static_root, result['output']))
+                except OSError:
+                    pass
+        results = [r for r in results if r['status'] != 'converted' or r['source'] in committed]
+        converted = [r for r in converted if r['source'] in committed]
+
+        for result in results:
+            manifest[result['source']] = {
+                'mtime': result['mtime'],
+                'size': result['size'],
+                'status': result['status'],
+                'output': result.get('output'),
+                'output_size': result['output_size'],
+            }
+        save_manifest(manifest)
+
+        if remove_originals:
+            for result in converted:
+                try:
+                    os.remove(os.path.join(static_root, result['source']))
+                except OSError as e:
+                    print(f"   ⚠️  Não foi possível remover {result['source']}: {e}")
+
+    bytes_before = sum(r['size'] for r in converted)
+    bytes_after = sum(r['output_size'] for r in converted)
+
+    print("\n📊 Resumo")
+    print(f"   Convertidas: {len(converted)} | Mantidas: {len(results) - len(converted) - len(failed)} | "
+          f"Falhas: {len(failed)} | Ignoradas: {skipped}")
+    print(f"   Tamanho: {format_bytes(bytes_before)} → {format_bytes(bytes_after)} "
+          f"(economia de {format_bytes(bytes_before - bytes_after)})")
+    print(f"   Referências atualizadas no banco: {references_updated}")
+    if reference_errors:
+        print(f"   ❌ {reference_errors} lotes de referências não foram gravados (imagens serão reprocessadas)")
+    if elapsed > 0 and results:
+        print(f"   Tempo: {elapsed:.2f}s | {len(results) / elapsed:.1f} imagens/s | "
+              f"{format_bytes(bytes_read / elapsed)}/s")
+
+    return {
+        'converted': len(converted),
+        'failed': len(failed),
+        'skipped': skipped,
+        'bytes_saved': bytes_before - bytes_after,
+        'references_updated': references_updated,
+        'reference_errors': reference_errors,
+    }
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Converte imagens locais para WebP/AVIF')
+    parser.add_argument('--format', choices=sorted(OUTPUT_FORMATS), default='webp')
+    parser.add_argument('--max-size', type=int, default=1920, help='Maior dimensão permitida (0 = sem limite)')
+    parser.add_argument('--workers', type=int, default=None, help='Número de processos (padrão: um por núcleo)')
+    parser.add_argument('--dry-run', action='store_true', help='Não grava arquivos nem altera o banco')
+    parser.add_argument('--remove-originals', action='store_true', help='Remove os arquivos originais convertidos')
+    args = parser.parse_args()
+
+    try:
+        summary = optimize_images(args.format, args.max_size, args.workers, args.dry_run, args.remove_originals)
+        if summary['reference_errors']:
+            sys.exit(1)
+    except Exception as e:
+        print(f"❌ Erro ao otimizar imagens: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
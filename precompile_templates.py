@@ -0,0 +1,81 @@
+#!/usr/bin/env python3
+"""
+Script para pré-compilar os templates Jinja no cache de bytecode
+Execute no build (depois do migrate_db.py) ou localmente:
+
+    python precompile_templates.py
+    python precompile_templates.py --clear   # apaga o cache antes de compilar
+
+Compila todos os templates do app (inclusive os de blueprints/extensões) e
+grava o bytecode em TEMPLATE_CACHE_DIR (padrão: instance/jinja_cache, no disco
+persistente). Os workers do gunicorn passam a carregar os templates já
+compilados em vez de recompilar o base.html e os templates do admin nas
+primeiras requisições. Cada arquivo do cache guarda o hash do fonte: um
+template editado depois da pré-compilação é recompilado na primeira renderização.
+"""
+
+import argparse
+import sys
+import time
+
+TEMPLATE_EXTENSIONS = ('html', 'xml', 'txt')
+
+
+def precompile_templates(clear=False, top=5):
+    """Compila todos os templates e retorna True se nenhum falhou"""
+    from app import app
+    from jinja2 import TemplateError
+
+    env = app.jinja_env
+    cache = env.bytecode_cache
+    if cache is None:
+        print("⚠️  Cache de bytecode desativado (TEMPLATE_BYTECODE_CACHE=false), nada a fazer")
+        return True
+
+    print(f"📁 Cache de bytecode: {app.config['TEMPLATE_CACHE_DIR']}")
+    if clear:
+        cache.clear()
+        print("🗑️  Cache anterior removido")
+
+    compiled = []
+    reused = 0
+    errors = []
+    started = time.perf_counter()
+    for name in sorted(env.list_templates(extensions=TEMPLATE_EXTENSIONS)):
+        try:
+            source, filename, _ = env.loader.get_source(env, name)
+            # Bytecode válido (mesmo hash do fonte e mesma versão do Jinja/Python)?
+            if cache.get_bucket(env, name, filename, source).code is not None:
+                reused += 1
+                continue
+            template_started = time.perf_counter()
+            env.get_template(name)  # Compila e grava no cache
+            compiled.append((time.perf_counter() - template_started, name))
+        except TemplateError as e:
+            errors.append((name, e))
+    elapsed = time.perf_counter() - started
+
+    print(f"✅ {len(compiled)} templates compilados, {reused} já estavam no cache "
+          f"({elapsed:.2f}s)")
+    for template_elapsed, name in sorted(compiled, reverse=True)[:top]:
+        print(f"   {template_elapsed * 1000:7.1f} ms  {name}")
+    for name, error in errors:
+        print(f"   ⚠️  {name}: {error}")
+
+    return not errors
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Pré-compila os templates Jinja no cache de bytecode')
+    parser.add_argument('--clear', action='store_true', help='Apaga o cache antes de compilar')
+    args = parser.parse_args()
+
+    try:
+        if not precompile_templates(args.clear):
+            print("❌ Alguns templates não compilaram")
+            sys.exit(1)
+    except Exception as e:
+        print(f"❌ Erro ao pré-compilar os templates: {e}")
+        import traceback
+        traceback.print_exc()
+        sys.exit(1)
@@ -15,6 +15,10 @@ document.addEventListener('DOMContentLoaded', function() {
     // Armazenar IDs dos comentários já exibidos para evitar re-renderização
     let currentCommentIds = new Set();
 
+    // Cursor da próxima página de comentários (null = não há mais)
+    let nextCursor = null;
+    let loadMoreButton = null;
+
     // Verificar se é admin
     const isAdmin = document.body.dataset.isAdmin === 'true';
 
@@ -63,14 +67,14 @@ document.addEventListener('DOMContentLoaded', function() {
     }
 
     /**
-     * Carrega os comentários do servidor
+     * Monta a URL da API de comentários do post
      */
-    function loadComments() {
+    function getCommentsUrl() {
         // Obter categoria e slug dos atributos data
         const postElement = document.querySelector('[data-post-id]');
         if (!postElement) {
             console.error('Elemento do post não encontrado');
-            return;
+            return null;
         }
 
         const category = postElement.getAttribute('data-category');
@@ -78,15 +82,30 @@ document.addEventListener('DOMContentLoaded', function() {
 
         if (!category || !slug) {
             console.error('Categoria ou slug não encontrados');
-            return;
+            return null;
         }
 
-        fetch(`/${category}/${slug}/comments`)
+        return `/${category}/${slug}/comments`;
+    }
+
+    /**
+     * Carrega a primeira página de comentários do servidor
+     */
+    function loadComments() {
+        const url = getCommentsUrl();
+        if (!url) return;
+
+        fetch(url)
             .then(response => response.json())
             .then(data => {
                 if (data.success) {
-                    displayComments(data.comments);
+                    // Não voltar o cursor se o usuário já carregou páginas mais antigas
+                    if (nextCursor === null || !data.next_cursor || compareCursors(nextCursor, data.next_cursor) > 0) {
+                        nextCursor = data.next_cursor;
+                    }
+                    displayComments(data.comments, !data.next_cursor);
                     updateCommentsCount(data.count);
+                    updateLoadMoreButton();
                 }
             })
             .catch(error => {
@@ -94,20 +113,89 @@ document.addEventListener('DOMContentLoaded', function() {
             });
     }
 
+    /**
+     * Carrega a próxima página (comentários mais antigos) no fim da lista
+     */
+    function loadMoreComments() {
+        const url = getCommentsUrl();
+        if (!url || !nextCursor) return;
+
+        loadMoreButton.disabled = true;
+        loadMoreButton.innerHTML = '<i class="fas fa-spinner fa-spin"></i> Carregando...';
+
+        fetch(`${url}?cursor=${encodeURIComponent(nextCursor)}`)
+            .then(response => response.json())
+            .then(data => {
+                if (data.success) {
+                    data.comments.forEach(comment => {
+                        if (!currentCommentIds.has(comment.id)) {
+                            commentsList.insertBefore(createCommentElement(comment), loadMoreButton);
+                            currentCommentIds.add(comment.id);
+                        }
+                    });
+                    nextCursor = data.next_cursor;
+                    updateCommentsCount(data.count);
+                }
+            })
+            .catch(error => {
+                console.error('Erro ao carregar mais comentários:', error);
+            })
+            .finally(() => {
+                loadMoreButton.disabled = false;
+                updateLoadMoreButton();
+            });
+    }
+
+    /**
+     * Mostra o botão "Carregar mais" apenas quando há próxima página
+     */
+    function updateLoadMoreButton() {
+        if (!commentsList) return;
+
+        if (!loadMoreButton) {
+            loadMoreButton = document.createElement('button');
+            loadMoreButton.type = 'button';
+            loadMoreButton.className = 'btn-load-more-comments';
+            loadMoreButton.addEventListener('click', loadMoreComments);
+        }
+
+        loadMoreButton.innerHTML = '<i class="fas fa-chevron-down"></i> Carregar mais comentários';
+        if (nextCursor) {
+            commentsList.appendChild(loadMoreButton);
+        } else {
+            loadMoreButton.remove();
+        }
+    }
+
+    /**
+     * Compara dois cursores "AAAAMMDDHHMMSSffffff-id" (negativo = mais antigo)
+     */
+    function compareCursors(a, b) {
+        const [dateA, idA] = a.split('-');
+        const [dateB, idB] = b.split('-');
+        if (dateA !== dateB) return dateA < dateB ? -1 : 1;
+        return parseInt(idA) - parseInt(idB);
+    }
+
     /**
      * Exibe os comentários na lista (sem piscar)
+     * @param {Array} comments - primeira página (mais novos primeiro)
+     * @param {boolean} complete - true se a página contém todos os comentários
      */
-    function displayComments(comments) {
+    function displayComments(comments, complete) {
         if (!commentsList) return;
 
         // Criar Set com IDs dos novos comentários
         const newCommentIds = new Set(comments.map(c => c.id));
+        const oldestCursor = comments.length ? comments[comments.length - 1].cursor : null;
 
-        // Remover comentários que não existem mais
+        // Remover comentários que não existem mais (apenas os que estariam nesta página;
+        // os mais antigos podem ter apenas saído da primeira página)
         const existingComments = commentsList.querySelectorAll('.comment-item:not([data-comment-template])');
         existingComments.forEach(commentEl => {
             const commentId = parseInt(commentEl.dataset.commentId);
-            if (!newCommentIds.has(commentId)) {
+            const inPageRange = complete || !oldestCursor || compareCursors(commentEl.dataset.cursor, oldestCursor) >= 0;
+            if (!newCommentIds.has(commentId) && inPageRange) {
                 commentEl.remove();
                 currentCommentIds.delete(commentId);
             }
@@ -134,16 +222,16 @@ document.addEventListener('DOMContentLoaded', function() {
             return;
         }
 
-        // Adicionar apenas comentários novos (evita piscar)
+        // Adicionar apenas comentários novos (evita piscar), mantendo a ordem da página
+        const firstComment = commentsList.querySelector('.comment-item:not([data-comment-template])');
         comments.forEach(comment => {
             if (!currentCommentIds.has(comment.id)) {
                 const commentElement = createCommentElement(comment);
-                // Inserir no início da lista
-                const firstComment = commentsList.querySelector('.comment-item:not([data-comment-template])');
-                if (firstComment) {
+                if (firstComment && compareCursors(comment.cursor, firstComment.dataset.cursor) > 0) {
+                    // Mais novo que os já exibidos: entra antes deles
                     commentsList.insertBefore(commentElement, firstComment);
                 } else {
-                    commentsList.appendChild(commentElement);
+                    commentsList.insertBefore(commentElement, loadMoreButton && loadMoreButton.parentNode ? loadMoreButton : null);
                 }
                 currentCommentIds.add(comment.id);
             }
@@ -155,6 +243,7 @@ document.addEventListener('DOMContentLoaded', function() {
         const div = document.createElement('div');
         div.className = 'comment-item animate-fade-in';
         div.dataset.commentId = comment.id;
+        div.dataset.cursor = comment.cursor;
 
         // Avatar: foto de perfil se existir, ícone caso contrário
         let avatarHTML;
@@ -130,39 +130,74 @@ window.FavoriteManager = class FavoriteManager {
      * Busca o estado atual de um favorito no servidor (com rate limiting)
      */
     async getStatus(postId) {
-        try {
-            // Rate limiting local - evita múltiplas chamadas
-            const now = Date.now();
-            const cacheKey = `status_${postId}`;
-
-            if (this._statusCache && this._statusCache[cacheKey]) {
-                const cached = this._statusCache[cacheKey];
-                if (now - cached.timestamp < 30000) { // 30 segundos
-                    console.log(`[FAVORITOS] Usando cache para post ${postId}`);
-                    return cached.value;
-                }
+        // Rate limiting local - evita múltiplas chamadas
+        const cacheKey = `status_${postId}`;
+        if (this._statusCache && this._statusCache[cacheKey]) {
+            const cached = this._statusCache[cacheKey];
+            if (Date.now() - cached.timestamp < 30000) { // 30 segundos
+                console.log(`[FAVORITOS] Usando cache para post ${postId}`);
+                return cached.value;
             }
+        }
 
-            const response = await fetch(`/api/check-favorite/${postId}`, {
-                cache: 'force-cache',
-                headers: { 'Cache-Control': 'max-age=2' }
+        const statuses = await this.getStatuses([postId]);
+        return statuses ? statuses.get(postId) : null;
+    }
+
+    /**
+     * Busca o estado de vários posts em uma única requisição
+     * @returns {Map<number, boolean>|null} estado por post (null em caso de erro)
+     */
+    async getStatuses(postIds) {
+        const ids = Array.from(new Set(postIds.map(id => parseInt(id)).filter(Boolean)));
+        if (ids.length === 0) return new Map();
+
+        try {
+            const response = await fetch('/api/check-favorites', {
+                method: 'POST',
+                headers: { 'Content-Type': 'application/json' },
+                body: JSON.stringify({ ids: ids }),
+                cache: 'no-cache'
             });
             if (!response.ok) throw new Error('Erro na requisição');
             const data = await response.json();
 
-            // Salvar em cache local
+            const favorited = new Set(data.favorited);
+            const statuses = new Map();
+            const now = Date.now();
             if (!this._statusCache) this._statusCache = {};
-            this._statusCache[cacheKey] = {
-                value: data.is_favorited,
-                timestamp: now
-            };
 
-            return data.is_favorited;
+            ids.forEach(id => {
+                statuses.set(id, favorited.has(id));
+                // Salvar em cache local
+                this._statusCache[`status_${id}`] = {
+                    value: favorited.has(id),
+                    timestamp: now
+                };
+            });
+
+            return statuses;
         } catch (error) {
             return null;
         }
     }
 
+    /**
+     * Sincroniza todos os botões da página com uma única requisição
+     */
+    async syncAll() {
+        const buttons = document.querySelectorAll('button[data-post-id]');
+        const postIds = Array.from(buttons, btn => btn.dataset.postId);
+
+        const statuses = await this.getStatuses(postIds);
+        if (!statuses) return;
+
+        buttons.forEach(btn => {
+            const status = statuses.get(parseInt(btn.dataset.postId));
+            if (status !== undefined) this.updateButtonUI(btn, status);
+        });
+    }
+
     /**
      * Atualiza a aparência de um botão com base no estado
      */
@@ -384,7 +419,7 @@ window.FavoriteManager = class FavoriteManager {
         // Garante que o modal existe
         this.createConfirmModal();
 
-        // NÃO faz syncButtons() no init para evitar rate limit
+        // NÃO faz syncButtons() por botão no init para evitar rate limit
         // Os botões já vem com o estado correto do servidor (HTML renderizado)
         // Apenas inicializa o cache com o estado atual dos botões
         const buttons = document.querySelectorAll('button[data-post-id]');
@@ -405,7 +440,13 @@ window.FavoriteManager = class FavoriteManager {
             }
         });
 
-        console.log(`[FAVORITOS] Inicializado com ${uniquePostIds.size} posts (sem requisições)`);
+        console.log(`[FAVORITOS] Inicializado com ${uniquePostIds.size} posts`);
+
+        // Conteúdo carregado dinamicamente ou restaurado do histórico pode estar
+        // desatualizado: confere todos os botões em uma única requisição
+        if (document.body.dataset.userId && uniquePostIds.size > 0) {
+            this.syncAll();
+        }
     }
 
     /**
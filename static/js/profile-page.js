@@ -275,6 +275,71 @@ function updateSidebar(user) {
     }
 }
 
+// Escapa texto para inserir em HTML
+function escapeHtml(text) {
+    const div = document.createElement('div');
+    div.textContent = text;
+    return div.innerHTML;
+}
+
+// Monta o HTML do card de um favorito (dados de /api/user-favorites)
+function renderFavoriteCard(post) {
+    // Resumo já vem em texto puro e cortado pelo servidor
+    const excerptText = escapeHtml(post.excerpt || '');
+
+    return `
+        <div class="col-md-6 col-lg-4 mb-4 favorite-post-item">
+            <div class="post-card" style="position: relative;">
+                <button onclick="removeFavorite(${post.id})" class="favorite-remove-badge" title="Remover dos favoritos">
+                    <i class="fas fa-times"></i>
+                </button>
+                <div class="category-badge-left">
+                    <i class="fas fa-tag"></i> ${post.category_str}
+                </div>
+                <div class="post-image">
+                    ${post.image_url ?
+            `<img src="/static/images/${post.image_url}" alt="${post.title}" class="img-fluid">` :
+            `<div class="post-placeholder"><i class="fas fa-file-alt"></i></div>`
+        }
+                    ${post.featured ? '<div class="featured-badge"><i class="fas fa-star"></i></div>' : ''}
+                </div>
+                <div class="post-content">
+                    <h3 class="post-title">
+                        <a href="/post/${post.id}">${post.title}</a>
+                    </h3>
+                    <p class="post-excerpt">${excerptText}</p>
+                    <div class="post-meta">
+                        <span class="post-date">
+                            <i class="fas fa-calendar"></i>
+                            ${post.date_posted}
+                        </span>
+                        <span class="post-views">
+                            <i class="fas fa-eye"></i>
+                            ${post.views}
+                        </span>
+                        ${post.downloads ? `
+                            <span class="post-downloads">
+                                <i class="fas fa-download"></i>
+                                ${post.downloads}
+                            </span>
+                        ` : ''}
+                    </div>
+                    <div class="post-actions">
+                        <a href="/post/${post.id}" class="btn btn-primary">
+                            <i class="fas fa-eye"></i> Ver Post
+                        </a>
+                        ${post.download_link ? `
+                            <a href="/download/${post.id}" class="btn btn-success">
+                                <i class="fas fa-download"></i> Download
+                            </a>
+                        ` : ''}
+                    </div>
+                </div>
+            </div>
+        </div>
+    `;
+}
+
 // Função para recarregar apenas a seção de favoritos
 async function reloadFavoritesSection() {
     try {
@@ -310,63 +375,7 @@ async function reloadFavoritesSection() {
         }
 
         // Reconstrói o HTML dos favoritos
-        let postsHTML = '';
-        data.posts.forEach(post => {
-            const excerpt = post.content.replace(/<[^>]*>/g, '').substring(0, 150);
-            const excerptText = excerpt.length > 150 ? excerpt + '...' : excerpt;
-
-            postsHTML += `
-                <div class="col-md-6 col-lg-4 mb-4">
-                    <div class="post-card" style="position: relative;">
-                        <button onclick="removeFavorite(${post.id})" class="favorite-remove-badge" title="Remover dos favoritos">
-                            <i class="fas fa-times"></i>
-                        </button>
-                        <div class="category-badge-left">
-                            <i class="fas fa-tag"></i> ${post.category_str}
-                        </div>
-                        <div class="post-image">
-                            ${post.image_url ?
-                    `<img src="/static/images/${post.image_url}" alt="${post.title}" class="img-fluid">` :
-                    `<div class="post-placeholder"><i class="fas fa-file-alt"></i></div>`
-                }
-                            ${post.featured ? '<div class="featured-badge"><i class="fas fa-star"></i></div>' : ''}
-                        </div>
-                        <div class="post-content">
-                            <h3 class="post-title">
-                                <a href="/post/${post.id}">${post.title}</a>
-                            </h3>
-                            <p class="post-excerpt">${excerptText}</p>
-                            <div class="post-meta">
-                                <span class="post-date">
-                                    <i class="fas fa-calendar"></i>
-                                    ${post.date_posted}
-                                </span>
-                                <span class="post-views">
-                                    <i class="fas fa-eye"></i>
-                                    ${post.views}
-                                </span>
-                                ${post.downloads ? `
-                                    <span class="post-downloads">
-                                        <i class="fas fa-download"></i>
-                                        ${post.downloads}
-                                    </span>
-                                ` : ''}
-                            </div>
-                            <div class="post-actions">
-                                <a href="/post/${post.id}" class="btn btn-primary">
-                                    <i class="fas fa-eye"></i> Ver Post
-                                </a>
-                                ${post.download_link ? `
-                                    <a href="/download/${post.id}" class="btn btn-success">
-                                        <i class="fas fa-download"></i> Download
-                                    </a>
-                                ` : ''}
-                            </div>
-                        </div>
-                    </div>
-                </div>
-            `;
-        });
+        const postsHTML = data.posts.map(renderFavoriteCard).join('');
 
         // Atualiza o HTML da seção
         favoritesSection.innerHTML = `
@@ -389,9 +398,13 @@ async function reloadFavoritesSection() {
                     ${postsHTML}
                 </div>
             </div>
-            ${data.total > 6 ? `
-                <div class="profile-card-footer">
-                    <p class="text-muted">E mais ${data.total - 6} favorito(s)</p>
+            ${data.next_cursor ? `
+                <div class="profile-card-footer" style="text-align: center; padding: 1.5rem;">
+                    <button type="button" class="btn btn-gradient primary" data-next-cursor="${data.next_cursor}"
+                        onclick="loadMoreFavorites(this)">
+                        <i class="fas fa-chevron-down"></i>
+                        <span class="toggle-text">Carregar mais favoritos (${data.total - data.posts.length} restantes)</span>
+                    </button>
                 </div>
             ` : ''}
         `;
@@ -867,35 +880,43 @@ function initializeProfilePage() {
 }
 
 // Toggle para expandir/colapsar favoritos - GLOBAL
-window.toggleAllFavorites = function(button) {
-    const extraFavorites = document.querySelectorAll('.extra-favorites');
-    const isExpanded = button.classList.contains('expanded');
+window.loadMoreFavorites = async function(button) {
+    const cursor = button.dataset.nextCursor;
+    const container = document.getElementById('favorites-container');
+    if (!cursor || !container) return;
+
     const icon = button.querySelector('i');
     const text = button.querySelector('.toggle-text');
-    const totalFavorites = document.querySelectorAll('.favorite-post-item').length;
+    button.disabled = true;
+    icon.className = 'fas fa-spinner fa-spin';
 
-    if (isExpanded) {
-        // Colapsar
-        extraFavorites.forEach(item => {
-            item.style.display = 'none';
-        });
-        button.classList.remove('expanded');
-        icon.className = 'fas fa-chevron-down';
-        text.textContent = `Ver todos os ${totalFavorites} favoritos`;
+    try {
+        const response = await fetch(`/api/user-favorites?cursor=${encodeURIComponent(cursor)}`);
+        const data = await response.json();
+        if (!data.success) {
+            throw new Error(data.message || 'Erro ao carregar favoritos');
+        }
 
-        // Scroll suave para a seção de favoritos
-        const favSection = document.getElementById('favorites-section');
-        if (favSection) {
-            favSection.scrollIntoView({ behavior: 'smooth', block: 'start' });
+        container.insertAdjacentHTML('beforeend', data.posts.map(renderFavoriteCard).join(''));
+        if (typeof window.setupDownloadButtons === 'function') {
+            window.setupDownloadButtons();
         }
-    } else {
-        // Expandir
-        extraFavorites.forEach(item => {
-            item.style.display = 'flex';
-        });
-        button.classList.add('expanded');
-        icon.className = 'fas fa-chevron-up';
-        text.textContent = 'Ver menos';
+
+        if (data.next_cursor) {
+            const loaded = container.querySelectorAll('.favorite-post-item').length;
+            button.dataset.nextCursor = data.next_cursor;
+            text.textContent = `Carregar mais favoritos (${Math.max(data.total - loaded, 0)} restantes)`;
+        } else {
+            button.closest('.profile-card-footer').remove();
+        }
+    } catch (error) {
+        console.error('Erro ao carregar mais favoritos:', error);
+        if (window.favoriteManager) {
+            window.favoriteManager.showToast('Erro ao carregar favoritos', 'error');
+        }
+    } finally {
+        button.disabled = false;
+        icon.className = 'fas fa-chevron-down';
     }
 };
 
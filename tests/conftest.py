@@ -0,0 +1,39 @@
+"""
+Configuração dos testes: o app é importado com bancos e caches em um diretório
+temporário (nunca o banco real em instance/).
+
+    python -m pytest -q
+"""
+
+import os
+import sys
+import tempfile
+
+import pytest
+
+TEST_DIR = tempfile.mkdtemp(prefix='mundo_tests_')
+os.environ['DATABASE_URL'] = f"sqlite:///{os.path.join(TEST_DIR, 'site.db')}"
+os.environ['TELEMETRY_DATABASE_URL'] = f"sqlite:///{os.path.join(TEST_DIR, 'telemetry.db')}"
+os.environ['RATELIMIT_STORAGE_URI'] = f"sqlite:///{os.path.join(TEST_DIR, 'ratelimit.db')}"
+os.environ['TEMPLATE_CACHE_DIR'] = os.path.join(TEST_DIR, 'jinja_cache')
+os.environ['RELATED_MODEL_PATH'] = os.path.join(TEST_DIR, 'related_tfidf.npz')
+os.environ.setdefault('AUDIT_LOG_ASYNC', 'false')
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import app as app_module  # noqa: E402
+
+
+@pytest.fixture(scope='session')
+def mod():
+    """Módulo app com as tabelas criadas"""
+    with app_module.app.app_context():
+        app_module.db.create_all()
+        app_module.initialize_db()
+    return app_module
+
+
+@pytest.fixture
+def client(mod):
+    mod.app.config['PAGE_CACHE_ENABLED'] = False
+    return mod.app.test_client()
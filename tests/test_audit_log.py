@@ -0,0 +1,47 @@
+from datetime import datetime
+
+
+def make_event(user_id, action, metadata):
+    return {
+        'user_id': user_id,
+        'action': action,
+        'description': None,
+        'metadata': metadata,
+        'ip_address': '127.0.0.1',
+        'user_agent': 'pytest',
+        'created_at': datetime.utcnow(),
+    }
+
+
+def test_mixed_metadata_batch_is_written(mod):
+    """Lote com e sem metadata (o executemany exige as mesmas colunas em todas as linhas)"""
+    events = [
+        make_event(1, 'mixed_batch', {'k': 1}),
+        make_event(1, 'mixed_batch', None),
+        make_event(1, 'mixed_batch', {'k': 2}),
+    ]
+    mod.audit_log_writer._write(events)
+
+    with mod.app.app_context():
+        rows = mod.db.session.execute(
+            mod.db.select(mod.AdminActivity.activity_metadata)
+            .where(mod.AdminActivity.action == 'mixed_batch')
+            .order_by(mod.AdminActivity.id)
+        ).scalars().all()
+    assert rows == ['{"k": 1}', None, '{"k": 2}']
+
+
+def test_event_is_dropped_when_queue_refills_during_flush(mod, monkeypatch):
+    """Outra thread encheu a fila entre o flush e o novo put: a requisição não pode falhar"""
+    import os
+
+    writer = mod.AuditLogWriter(maxsize=1)
+    writer.thread_pid = os.getpid()  # Sem a thread de fundo
+    writer.queue.put_nowait(make_event(1, 'queued', None))
+    monkeypatch.setattr(mod, 'AUDIT_PUT_TIMEOUT', 0.01)
+    monkeypatch.setattr(writer, 'flush', lambda: None)
+
+    writer.log(make_event(1, 'dropped', None))
+
+    assert writer.dropped == 1
+    assert writer.queue.get_nowait()['action'] == 'queued'
@@ -0,0 +1,33 @@
+def test_cached_comments_follow_author_profile_changes(mod, client):
+    with mod.app.app_context():
+        user = mod.User(username='autor_antigo', email='autor@example.com', password_hash='x')
+        post = mod.Post(title='Comentários', content='<p>x</p>', slug='comentarios-autor', category_str='BIOS',
+                        download_link='https://example.com/f', is_active=True)
+        mod.db.session.add_all([user, post])
+        mod.db.session.commit()
+        mod.db.session.add(mod.Comment(content='Ótimo arquivo', post_id=post.id, user_id=user.id, is_approved=True))
+        mod.db.session.commit()
+        user_id = user.id
+
+    url = '/bios/comentarios-autor/comments'
+    response = client.get(url)
+    etag = response.headers['ETag']
+    assert response.get_json()['comments'][0]['author'] == 'autor_antigo'
+
+    with mod.app.app_context():
+        user = mod.db.session.get(mod.User, user_id)
+        user.username = 'autor_novo'
+        user.profile_image = 'novo.jpg'
+        mod.db.session.commit()
+
+    response = client.get(url, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    comment = response.get_json()['comments'][0]
+    assert (comment['author'], comment['profile_image']) == ('autor_novo', 'novo.jpg')
+
+    # Alterações que não aparecem nos comentários não invalidam o cache
+    etag = response.headers['ETag']
+    with mod.app.app_context():
+        mod.db.session.get(mod.User, user_id).bio = 'Técnico'
+        mod.db.session.commit()
+    assert client.get(url, headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,61 @@
+import threading
+
+import pytest
+
+THREADS = 8
+ATTEMPTS = 30
+
+
+def hammer(mod, user_id):
+    """Dispara ATTEMPTS reservas de cota em THREADS threads simultâneas"""
+    granted = []
+    errors = []
+    lock = threading.Lock()
+    barrier = threading.Barrier(THREADS)
+
+    def worker(count):
+        barrier.wait()
+        for _ in range(count):
+            with mod.app.app_context():
+                try:
+                    user = mod.db.session.get(mod.User, user_id)
+                    ok = mod.consume_download_quota(user)
+                    mod.db.session.commit()
+                except Exception as e:
+                    mod.db.session.rollback()
+                    with lock:
+                        errors.append(str(e))
+                    continue
+                with lock:
+                    granted.append(ok)
+
+    per_thread = [ATTEMPTS // THREADS + (1 if i < ATTEMPTS % THREADS else 0) for i in range(THREADS)]
+    pool = [threading.Thread(target=worker, args=(count,)) for count in per_thread]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return sum(granted), errors
+
+
+@pytest.mark.parametrize('username, plan, limits, expected', [
+    ('quota_free', 'free', {}, 1),
+    ('quota_free_custom', 'free', {'custom_daily_limit': 5}, 5),
+    ('quota_premium', 'premium', {}, 15),
+])
+def test_concurrent_downloads_respect_the_quota(mod, username, plan, limits, expected):
+    with mod.app.app_context():
+        user = mod.User(username=username, email=f'{username}@example.com', plan=plan, **limits)
+        user.set_password('quota-test')
+        mod.db.session.add(user)
+        mod.db.session.commit()
+        user_id = user.id
+
+    granted, errors = hammer(mod, user_id)
+
+    with mod.app.app_context():
+        user = mod.db.session.get(mod.User, user_id)
+        stored = user.weekly_downloads if plan == 'premium' else user.daily_downloads
+    assert errors == []
+    assert granted == expected
+    assert stored == expected
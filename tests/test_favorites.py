@@ -0,0 +1,37 @@
+def test_favorite_excerpt_is_plain_text(mod):
+    with mod.app.app_context():
+        user = mod.User(username='fav_excerpt', email='fav_excerpt@example.com', password_hash='x')
+        content = '<p>' + 'Driver &amp; BIOS ' * 5 + '</p>' + '<img src="data:image/png;base64,' + 'A' * 5000 + '">'
+        post = mod.Post(title='Favorito', content=content, slug='favorito-excerpt',
+                        download_link='https://example.com/f', is_active=True)
+        mod.db.session.add_all([user, post])
+        mod.db.session.commit()
+        mod.db.session.add(mod.Favorite(user_id=user.id, post_id=post.id))
+        mod.db.session.commit()
+
+        cards, _ = mod.fetch_favorites_page(user.id)
+        assert cards[0].excerpt == ('Driver & BIOS ' * 5).strip()
+        assert mod.serialize_favorite_row(cards[0])['excerpt'] == cards[0].excerpt
+
+    assert mod.html_excerpt('<p>abc</p><a href="/x', 10) == 'abc'
+    assert mod.html_excerpt('<p>a &amp; b &nbs', 10) == 'a & b'
+    assert mod.html_excerpt('<b>' + 'x' * 200 + '</b>', 150) == 'x' * 150 + '...'
+
+
+def test_check_favorites_rejects_malformed_ids(mod, client):
+    with mod.app.app_context():
+        user = mod.User(username='fav_check', email='fav_check@example.com', password_hash='x')
+        mod.db.session.add(user)
+        mod.db.session.commit()
+        user_id = user.id
+    with client.session_transaction() as session:
+        session['_user_id'] = str(user_id)
+        session['_fresh'] = True
+
+    for payload in ({'ids': 5}, {'ids': {'a': 1}}, {'ids': 'abc'}, [1, 2], 7):
+        response = client.post('/api/check-favorites', json=payload)
+        assert response.status_code == 400
+        assert response.get_json()['favorited'] == []
+
+    assert client.post('/api/check-favorites', json={'ids': [1, 'x', None]}).status_code == 200
+    assert client.get('/api/check-favorites?ids=1,2').status_code == 200
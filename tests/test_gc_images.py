@@ -0,0 +1,32 @@
+from types import SimpleNamespace
+
+import gc_images
+
+CLOUD_URL = 'https://res.cloudinary.com/demo/image/upload/v1/mundodainformatica/posts/{}.jpg'
+
+
+def fake_cloudinary(renamed):
+    uploader = SimpleNamespace(rename=lambda public_id, target: renamed.append((public_id, target)))
+    api = SimpleNamespace(delete_resources=lambda ids: {'deleted': {public_id: 'deleted' for public_id in ids}})
+    return SimpleNamespace(uploader=uploader, api=api)
+
+
+def test_removed_cloudinary_assets_leave_the_registry(mod, monkeypatch):
+    renamed = []
+    monkeypatch.setattr(gc_images, 'get_cloudinary', lambda: fake_cloudinary(renamed))
+
+    with mod.app.app_context():
+        for name in ('orfa', 'apagada', 'viva'):
+            mod.db.session.add(mod.ImageAsset(content_hash=name * 8, url=CLOUD_URL.format(name), folder='posts'))
+        mod.db.session.commit()
+
+        removed = gc_images.remove_cloudinary_orphans([('mundodainformatica/posts/orfa', 10)])
+        assert removed == [('mundodainformatica/posts/orfa', 10)]
+        assert renamed == [('mundodainformatica/posts/orfa', 'mundodainformatica/quarantine/posts/orfa')]
+
+        gc_images.remove_cloudinary_orphans([('mundodainformatica/posts/apagada', 20)], delete=True)
+
+        urls = {asset.url for asset in mod.ImageAsset.query.all()}
+        assert CLOUD_URL.format('viva') in urls
+        assert CLOUD_URL.format('orfa') not in urls
+        assert CLOUD_URL.format('apagada') not in urls
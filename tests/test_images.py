@@ -0,0 +1,85 @@
+import os
+from types import SimpleNamespace
+
+from PIL import Image
+
+
+def make_image(path, size=(800, 600)):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    Image.new('RGB', size, (200, 30, 30)).save(path, 'JPEG')
+
+
+def test_resized_image_follows_symlinked_roots(mod, client, tmp_path, monkeypatch):
+    """static/uploads e static/images são links para o disco persistente no Render"""
+    static_dir = tmp_path / 'static'
+    disk = tmp_path / 'data'
+    make_image(str(disk / 'uploads' / 'profiles' / 'x.jpg'))
+    make_image(str(disk / 'images' / 'posts' / 'p.jpg'))
+    make_image(str(tmp_path / 'outside.jpg'))
+    static_dir.mkdir()
+    os.symlink(disk / 'uploads', static_dir / 'uploads')
+    os.symlink(disk / 'images', static_dir / 'images')
+    # Link dentro da pasta permitida apontando para fora dela continua bloqueado
+    os.symlink(tmp_path / 'outside.jpg', disk / 'uploads' / 'escape.jpg')
+
+    monkeypatch.setattr(mod.app, 'static_folder', str(static_dir))
+    monkeypatch.setattr(mod, 'image_cache', mod.ImageDiskCache(str(tmp_path / 'cache'), 10 * 1024 * 1024))
+
+    response = client.get('/img/uploads/profiles/x.jpg?w=320')
+    assert response.status_code == 200
+    assert response.mimetype == 'image/webp'
+    assert client.get('/img/images/posts/p.jpg?w=320').status_code == 200
+
+    assert client.get('/img/uploads/escape.jpg?w=320').status_code == 404
+    assert client.get('/img/uploads/../outside.jpg?w=320').status_code == 404
+    assert client.get('/img/uploads/profiles/missing.jpg').status_code == 404
+
+    with mod.app.test_request_context():
+        srcset = mod.build_image_srcset('x.jpg', 'profiles')
+    assert srcset.startswith('/img/uploads/profiles/x.jpg')
+
+
+def test_resized_image_serves_only_emitted_variants(mod, client, tmp_path, monkeypatch):
+    """Cada combinação nova de fmt/q seria um encode (e um arquivo no cache) a mais"""
+    make_image(str(tmp_path / 'static' / 'images' / 'posts' / 'v.jpg'))
+    monkeypatch.setattr(mod.app, 'static_folder', str(tmp_path / 'static'))
+    monkeypatch.setattr(mod, 'image_cache', mod.ImageDiskCache(str(tmp_path / 'cache'), 10 * 1024 * 1024))
+
+    with mod.app.test_request_context():
+        url = mod.resized_image_url('posts/v.jpg', 'posts', 320)
+        assert mod.resized_image_url('posts/v.jpg', 'posts', 320, fmt='avif') is None
+    assert client.get(url).status_code == 200
+    assert client.get('/img/images/posts/v.jpg?w=320&q=80').status_code == 200
+
+    for query in ('fmt=avif', 'fmt=png', 'fmt=jpeg', 'q=45', 'q=90', 'fmt=webp&q=85'):
+        assert client.get(f'/img/images/posts/v.jpg?w=320&{query}').status_code == 404
+    assert len(os.listdir(tmp_path / 'cache')) == 1
+
+
+def test_registry_reuses_only_existing_exact_matches(mod, tmp_path, monkeypatch):
+    import cloudinary.exceptions
+
+    (tmp_path / 'viva.jpg').write_bytes(b'jpg')
+    cloud_url = 'https://res.cloudinary.com/demo/image/upload/v1/mundodainformatica/posts/sumiu.jpg'
+
+    def missing_resource(public_id):
+        raise cloudinary.exceptions.NotFound(public_id)
+
+    monkeypatch.setattr(mod, 'get_cloudinary', lambda: SimpleNamespace(
+        api=SimpleNamespace(resource=missing_resource), exceptions=cloudinary.exceptions))
+
+    with mod.app.app_context():
+        mod.register_image('a' * 64, 0x0F0F0F0F0F0F0F0F, 'viva.jpg', 'registry_test')
+        mod.register_image('b' * 64, 0x00FF00FF00FF00FF, 'apagada.jpg', 'registry_test')
+        mod.register_image('c' * 64, None, cloud_url, 'registry_test')
+        mod.db.session.commit()
+
+        assert mod.reuse_registered_image('a' * 64, 0x0F0F0F0F0F0F0F0F, 'registry_test', str(tmp_path)) == 'viva.jpg'
+        # Quase-duplicata (1 bit de diferença no dHash) não é reaproveitada
+        assert mod.reuse_registered_image('d' * 64, 0x0F0F0F0F0F0F0F0E, 'registry_test', str(tmp_path)) is None
+        assert [distance for _, distance in mod.find_similar_images(0x0F0F0F0F0F0F0F0E, 'registry_test')] == [1]
+
+        assert mod.reuse_registered_image('b' * 64, None, 'registry_test', str(tmp_path)) is None
+        assert mod.reuse_registered_image('c' * 64, None, 'registry_test') is None
+        mod.db.session.commit()
+        assert {asset.url for asset in mod.ImageAsset.query.filter_by(folder='registry_test')} == {'viva.jpg'}
@@ -0,0 +1,74 @@
+import json
+import os
+
+from PIL import Image
+
+import optimize_images
+
+
+def make_images(static_dir, names):
+    posts_dir = static_dir / 'images' / 'posts'
+    posts_dir.mkdir(parents=True, exist_ok=True)
+    for name in names:
+        # Gradiente: o WebP sai menor que o original
+        img = Image.linear_gradient('L').resize((400, 300)).convert('RGB')
+        img.save(posts_dir / name, quality=95) if name.endswith('.jpg') else img.save(posts_dir / name)
+
+
+def add_posts(mod, image_urls):
+    with mod.app.app_context():
+        posts = [mod.Post(title=f'Otimizar {url}', content='<p>x</p>', slug=f'otimizar-{i}-{url.replace("/", "-")}',
+                          download_link='https://example.com/f', image_url=url) for i, url in enumerate(image_urls)]
+        mod.db.session.add_all(posts)
+        mod.db.session.commit()
+        return [post.id for post in posts]
+
+
+def image_urls(mod, post_ids):
+    with mod.app.app_context():
+        return [mod.db.session.get(mod.Post, post_id).image_url for post_id in post_ids]
+
+
+def setup_static(mod, tmp_path, monkeypatch):
+    static_dir = tmp_path / 'static'
+    monkeypatch.setattr(mod.app, 'static_folder', str(static_dir))
+    monkeypatch.setattr(optimize_images, 'MANIFEST_PATH', str(tmp_path / 'manifest.json'))
+    return static_dir
+
+
+def test_colliding_outputs_get_distinct_names(mod, tmp_path, monkeypatch):
+    static_dir = setup_static(mod, tmp_path, monkeypatch)
+    make_images(static_dir, ['foo.jpg', 'foo.png'])
+    post_ids = add_posts(mod, ['posts/foo.jpg', 'posts/foo.png'])
+
+    summary = optimize_images.optimize_images(workers=1, remove_originals=True)
+
+    assert summary['converted'] == 2 and summary['reference_errors'] == 0
+    assert image_urls(mod, post_ids) == ['posts/foo.webp', 'posts/foo-png.webp']
+    assert sorted(os.listdir(static_dir / 'images' / 'posts')) == ['foo-png.webp', 'foo.webp']
+
+
+def test_failed_reference_batch_keeps_originals(mod, tmp_path, monkeypatch):
+    static_dir = setup_static(mod, tmp_path, monkeypatch)
+    make_images(static_dir, ['a.jpg', 'b.jpg'])
+    post_ids = add_posts(mod, ['posts/a.jpg', 'posts/b.jpg'])
+
+    monkeypatch.setattr(optimize_images, 'BATCH_SIZE', 1)
+    real_commit = mod.db.session.commit
+    calls = []
+
+    def failing_first_commit():
+        calls.append(1)
+        if len(calls) == 1:
+            raise RuntimeError('database is locked')
+        real_commit()
+
+    monkeypatch.setattr(mod.db.session, 'commit', failing_first_commit)
+    summary = optimize_images.optimize_images(workers=1, remove_originals=True)
+    monkeypatch.undo()
+
+    assert summary['reference_errors'] == 1 and summary['converted'] == 1
+    assert image_urls(mod, post_ids) == ['posts/a.jpg', 'posts/b.webp']
+    assert sorted(os.listdir(static_dir / 'images' / 'posts')) == ['a.jpg', 'b.webp']
+    with open(tmp_path / 'manifest.json') as f:
+        assert list(json.load(f)) == ['images/posts/b.jpg']
@@ -0,0 +1,43 @@
+import re
+
+
+def create_posts(mod):
+    with mod.app.app_context():
+        posts = [mod.Post(title=f'Trending {i}', content='<p>x</p>', category_str='BIOS', slug=f'trending-{i}', download_link='https://example.com/f',
+                          is_active=True) for i in range(2)]
+        mod.db.session.add_all(posts)
+        mod.db.session.commit()
+        for post, score in zip(posts, (2.0, 1.0)):
+            mod.db.session.add(mod.PostTrending(post_id=post.id, base=score, score=score))
+        mod.db.session.commit()
+        return [post.id for post in posts]
+
+
+def test_etag_follows_trending_order(mod, client):
+    """A ordem "em alta" não passa por content_versions: o ETag precisa mudar com ela"""
+    mod.app.config['PAGE_CACHE_ENABLED'] = True
+    mod.page_cache.clear()
+    first_id, second_id = create_posts(mod)
+
+    response = client.get('/?sort=trending')
+    etag = response.headers['ETag']
+    assert response.status_code == 200
+    assert client.get('/?sort=trending', headers={'If-None-Match': etag}).status_code == 304
+
+    # Atualização do trending (sem alterar content_versions) e expiração da entrada
+    with mod.app.app_context():
+        for post_id, score in ((first_id, 1.0), (second_id, 3.0)):
+            mod.db.session.get(mod.PostTrending, post_id).score = score
+        mod.db.session.commit()
+    mod.page_cache.clear()
+
+    response = client.get('/?sort=trending', headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+    titles = re.findall(r'Trending (\d)', response.get_data(as_text=True))
+    assert titles and titles[0] == '1'
+
+    # Sem cache de páginas os validadores também saem do HTML renderizado
+    mod.app.config['PAGE_CACHE_ENABLED'] = False
+    etag = client.get('/?sort=trending').headers['ETag']
+    assert client.get('/?sort=trending', headers={'If-None-Match': etag}).status_code == 304
@@ -0,0 +1,36 @@
+def test_failed_view_flush_is_retried(mod, monkeypatch):
+    with mod.app.app_context():
+        post = mod.Post(title='Visualizações', content='<p>x</p>', slug='visualizacoes',
+                        download_link='https://example.com/f', views=0)
+        mod.db.session.add(post)
+        mod.db.session.commit()
+        post_id = post.id
+
+    buffer = mod.PostViewBuffer(flush_interval=3600)
+    for _ in range(3):
+        buffer.add(post_id)
+    buffer.timer.cancel()
+    buffer.timer = None
+
+    real_commit = mod.db.session.commit
+
+    def locked_commit():
+        raise RuntimeError('database is locked')
+
+    monkeypatch.setattr(mod.db.session, 'commit', locked_commit)
+    buffer.flush()
+    monkeypatch.setattr(mod.db.session, 'commit', real_commit)
+
+    # As visualizações voltam para o buffer e uma nova gravação fica agendada
+    assert buffer.counts == {post_id: 3}
+    assert buffer.timer is not None
+    buffer.timer.cancel()
+    buffer.timer = None
+
+    buffer.add(post_id)
+    buffer.timer.cancel()
+    buffer.flush()
+    assert buffer.counts == {}
+    with mod.app.app_context():
+        assert mod.db.session.get(mod.Post, post_id).views == 4
+        assert mod.PostStats.query.filter_by(post_id=post_id).one().views == 4
@@ -0,0 +1,17 @@
+import uuid
+
+
+def test_spoofed_forwarded_for_does_not_reset_the_bucket(mod, client):
+    """O Render acrescenta o IP real ao fim do X-Forwarded-For; o primeiro endereço é do cliente"""
+    mod.limiter.reset()
+
+    def suggest(real_ip):
+        spoofed = str(uuid.uuid4())
+        return client.get('/api/search/suggestions?q=zqxjkv',
+                          headers={'X-Forwarded-For': f'{spoofed}, {real_ip}'})
+
+    statuses = [suggest('203.0.113.9').status_code for _ in range(61)]
+    assert statuses[:60] == [200] * 60
+    assert statuses[60] == 429
+    assert suggest('203.0.113.10').status_code == 200
+    mod.limiter.reset()
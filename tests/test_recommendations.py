@@ -0,0 +1,24 @@
+def test_download_rollup_updates_co_download_neighbors(mod):
+    with mod.app.app_context():
+        posts = [mod.Post(title=f'Co-download {i}', content='<p>x</p>', slug=f'co-download-{i}',
+                          download_link='https://example.com/f', is_active=True) for i in range(3)]
+        users = [mod.User(username=f'codl{i}', email=f'codl{i}@example.com', password_hash='x') for i in range(2)]
+        mod.db.session.add_all(posts + users)
+        mod.db.session.commit()
+        a, b, c = (post.id for post in posts)
+
+        for user, post_id in ((users[0], a), (users[0], b), (users[1], a), (users[1], b), (users[1], c)):
+            mod.db.session.add(mod.Download(user_id=user.id, post_id=post_id))
+        mod.db.session.commit()
+
+    mod._run_download_rollup()
+
+    with mod.app.app_context():
+        neighbors = mod.CoDownloadNeighbor.query.filter_by(post_id=a).order_by(mod.CoDownloadNeighbor.rank).all()
+        assert [neighbor.neighbor_post_id for neighbor in neighbors][:2] == [b, c]
+        pair = mod.db.session.get(mod.CoDownloadPair, (min(a, b), max(a, b)))
+        assert pair.count == 2
+
+        # Lote já processado: nada a somar de novo
+        assert mod.update_co_download_index() == (0, 0)
+        assert mod.db.session.get(mod.CoDownloadPair, (min(a, b), max(a, b))).count == 2
@@ -0,0 +1,70 @@
+import os
+
+import numpy as np
+
+
+WORDS = ['bios', 'notebook', 'dell', 'placa', 'driver', 'video', 'audio', 'esquema', 'fonte', 'monitor']
+
+
+def to_dense(matrix):
+    dense = np.zeros((matrix.n_rows, matrix.n_features), dtype=np.float32)
+    for row in range(matrix.n_rows):
+        start, end = matrix.indptr[row], matrix.indptr[row + 1]
+        dense[row, matrix.indices[start:end]] = matrix.data[start:end]
+    return dense
+
+
+def test_sparse_tfidf_matches_dense(mod, monkeypatch):
+    with mod.app.app_context():
+        for i in range(12):
+            words = ' '.join(WORDS[(i + j) % len(WORDS)] for j in range(4))
+            mod.db.session.add(mod.Post(title=f'Relacionado {words}', content=f'<p>{words} {words}</p>',
+                                        tags=WORDS[i % 3], category_str='BIOS', slug=f'relacionado-{i}',
+                                        download_link='https://example.com/f', is_active=True))
+        mod.db.session.commit()
+        own_id = mod.Post.query.filter_by(slug='relacionado-0').one().id
+
+        model = mod.build_related_tfidf()
+        matrix = model['matrix']
+        dense = to_dense(matrix)
+
+        norms = np.linalg.norm(dense, axis=1)
+        # Posts sem nenhum termo do vocabulário ficam com a linha zerada
+        np.testing.assert_allclose(norms[norms > 0], 1, rtol=1e-5)
+        rows = np.arange(matrix.n_rows)
+        np.testing.assert_allclose(matrix.scores(rows), dense @ dense.T, atol=1e-5)
+
+        # Blocos pequenos: mesmo resultado somando os produtos em várias partes
+        monkeypatch.setattr(mod, 'RELATED_SCORE_CHUNK', 7)
+        np.testing.assert_allclose(matrix.scores(rows[::-1]), (dense @ dense.T)[::-1], atol=1e-5)
+
+        assert mod.refresh_related_posts() == len(model['post_ids'])
+        assert mod.refresh_related_posts([own_id]) >= 1
+        assert mod.RelatedPost.query.filter_by(post_id=own_id).count() > 0
+
+
+def test_incremental_update_matches_saved_model(mod, monkeypatch):
+    with mod.app.app_context():
+        mod.refresh_related_posts()
+        mod._related_model_cache.clear()
+        saved = mod.load_related_model(mod.read_checkpoint(mod.JobCheckpoint, mod.RELATED_MODEL_CHECKPOINT))
+        assert saved is not None
+
+        # Reprocessar posts sem mudança de conteúdo reproduz os mesmos vetores
+        updated = mod.update_related_model(saved, saved['post_ids'][:5])
+        assert sorted(updated['post_ids']) == sorted(saved['post_ids'])
+        order = [updated['post_ids'].index(post_id) for post_id in saved['post_ids']]
+        np.testing.assert_allclose(to_dense(updated['matrix'])[order], to_dense(saved['matrix']), atol=1e-6)
+
+        # O recálculo incremental não volta a tokenizar o catálogo inteiro
+        def full_rebuild():
+            raise AssertionError('reconstrução completa no recálculo incremental')
+
+        monkeypatch.setattr(mod, 'build_related_tfidf', full_rebuild)
+        own_id = mod.Post.query.filter_by(slug='relacionado-1').one().id
+        assert mod.refresh_related_posts([own_id], rebuild_missing=False) >= 1
+
+        # Sem modelo gravado, o worker não reconstrói nada
+        os.remove(mod.app.config['RELATED_MODEL_PATH'])
+        mod._related_model_cache.clear()
+        assert mod.refresh_related_posts([own_id], rebuild_missing=False) == 0
@@ -0,0 +1,18 @@
+def test_posts_without_trending_rows_are_listed(mod, client):
+    with mod.app.app_context():
+        posts = [mod.Post(title=f'Sem trending {i}', content='<p>x</p>', category_str='Novidades', slug=f'sem-trending-{i}',
+                          download_link='https://example.com/f', is_active=True) for i in range(3)]
+        mod.db.session.add_all(posts)
+        mod.db.session.commit()
+        mod.db.session.add(mod.PostTrending(post_id=posts[0].id, base=1.0, score=1.0))
+        mod.db.session.commit()
+        ids = [post.id for post in posts]
+
+        listed = [post.id for post in mod.trending_posts_query('Novidades').all()]
+        # Pontuados primeiro; os demais (pontuação 0) do mais novo para o mais antigo
+        assert listed == [ids[0], ids[2], ids[1]]
+        assert mod.trending_posts_query('Novidades').paginate(page=1, per_page=12).total == 3
+
+    data = client.get('/api/posts?sort=trending&category=Novidades').get_json()
+    assert [post['id'] for post in data] == [ids[0], ids[2], ids[1]]
+    assert [post['trending_score'] for post in data][1:] == [0.0, 0.0]